@@ -0,0 +1,26 @@
+"""
+Gunicorn Settings for FUB to Sierra CSV Converter
+Picked up automatically from the working directory; command-line flags
+(as in railway.toml) still take precedence.
+"""
+
+import gc
+
+# Import the app once in the master and fork workers from it: modules,
+# compiled regexes and column tables are shared copy-on-write instead of
+# being rebuilt by every worker on each (re)deploy
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything allocated while importing into the permanent GC
+    # generation, so collections in the workers don't touch (and copy) it
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} objects for copy-on-write sharing")
+
+
+def post_fork(server, worker):
+    # Threads do not survive the fork, so each worker starts its own webhook
+    # processor; it also picks up events left pending by earlier workers
+    from web_app.app import webhook_processor
+    webhook_processor.start()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Admission Control for FUB to Sierra CSV Converter
+Bounds the work in flight so a burst of large uploads queues or is turned
+away instead of exhausting memory. Each conversion reserves its cost
+(upload bytes and estimated rows) against a per-process budget and, through
+a lock-protected state file shared by all worker processes, a global one.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the per-process budget applies
+    fcntl = None
+
+# Seconds between checks of the shared state while queued
+POLL_INTERVAL = 0.25
+
+
+class AdmissionRejected(Exception):
+    """Raised when a conversion does not fit the budget before the queue timeout."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _fits(in_flight, cost, limits):
+    """True if cost fits beside in_flight. Work is always admitted when nothing is running."""
+    count, used_bytes, used_rows = in_flight
+    max_bytes, max_rows = limits
+    if count == 0:
+        return True
+    return ((max_bytes is None or used_bytes + cost[0] <= max_bytes)
+            and (max_rows is None or used_rows + cost[1] <= max_rows))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedBudget:
+    """
+    Reservations of all worker processes, stored as JSON in state_path
+    ({token: [pid, bytes, rows]}) and only read or written under flock.
+    Entries of processes that died without releasing are dropped.
+    """
+
+    def __init__(self, state_path, max_bytes=None, max_rows=None):
+        self.state_path = Path(state_path)
+        self.limits = (max_bytes, max_rows)
+
+    def _update(self, change):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    entries = json.loads(f.read() or '{}')
+                except ValueError:
+                    entries = {}
+                entries = {token: entry for token, entry in entries.items() if _pid_alive(entry[0])}
+                result = change(entries)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(entries))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def try_reserve(self, token, cost):
+        def reserve(entries):
+            in_flight = (len(entries),
+                         sum(entry[1] for entry in entries.values()),
+                         sum(entry[2] for entry in entries.values()))
+            if not _fits(in_flight, cost, self.limits):
+                return False
+            entries[token] = [os.getpid(), cost[0], cost[1]]
+            return True
+        return self._update(reserve)
+
+    def release(self, token):
+        self._update(lambda entries: entries.pop(token, None))
+
+    def in_flight(self):
+        return self._update(lambda entries: (
+            len(entries),
+            sum(entry[1] for entry in entries.values()),
+            sum(entry[2] for entry in entries.values()),
+        ))
+
+
+class Admission:
+    """A granted reservation; release it (or leave the with block) when the work is done."""
+
+    def __init__(self, controller, token, cost):
+        self.controller = controller
+        self.token = token
+        self.cost = cost
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class AdmissionController:
+    """
+    Per-process admission of conversions by (bytes, rows) cost.
+
+    max_bytes/max_rows bound this process; shared, if given, is a
+    SharedBudget across processes. admit() waits up to queue_seconds for
+    room (0 rejects immediately) and raises AdmissionRejected carrying the
+    retry_after hint otherwise. A limit of None is unbounded.
+    """
+
+    def __init__(self, max_bytes=None, max_rows=None, shared=None,
+                 queue_seconds=0.0, retry_after=10):
+        self.limits = (max_bytes, max_rows)
+        self.shared = shared if fcntl is not None else None
+        self.queue_seconds = queue_seconds
+        self.retry_after = retry_after
+        self._changed = threading.Condition()
+        self._count = 0
+        self._bytes = 0
+        self._rows = 0
+
+    def in_flight(self):
+        """Return (conversions, bytes, rows) currently admitted in this process."""
+        with self._changed:
+            return self._count, self._bytes, self._rows
+
+    def admit(self, nbytes, rows):
+        """Reserve nbytes and rows, waiting up to queue_seconds. Returns an Admission."""
+        cost = (nbytes, rows)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.queue_seconds
+        with self._changed:
+            while True:
+                if (_fits((self._count, self._bytes, self._rows), cost, self.limits)
+                        and (self.shared is None or self.shared.try_reserve(token, cost))):
+                    self._count += 1
+                    self._bytes += nbytes
+                    self._rows += rows
+                    return Admission(self, token, cost)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise AdmissionRejected(self.retry_after)
+                # Local releases notify; other processes' releases are only seen by polling
+                self._changed.wait(min(remaining, POLL_INTERVAL))
+
+    def _release(self, admission):
+        if self.shared is not None:
+            self.shared.release(admission.token)
+        with self._changed:
+            self._count -= 1
+            self._bytes -= admission.cost[0]
+            self._rows -= admission.cost[1]
+            self._changed.notify_all()
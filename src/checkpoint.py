@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Conversion Checkpoints for FUB to Sierra CSV Converter
+Records how far a conversion got each time a chunk file is completed, so a
+run that is killed part way through resumes after the last finished chunk
+and still produces exactly the files (and row stage reports) an
+uninterrupted run would.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import pickle
+from array import array
+from pathlib import Path
+
+# Checkpoints live in the output folder as .{input file name}.checkpoint.json
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+
+# Bump when the checkpoint layout changes; other versions are ignored
+CHECKPOINT_VERSION = 2
+
+# Bytes per recorded delta lead in the sidecar file (key + fingerprint)
+_DELTA_ENTRY_BYTES = 16
+
+
+def checkpoint_path(output_dir, input_path):
+    """Return the checkpoint file used for an input file."""
+    return Path(output_dir) / f".{Path(input_path).name}{CHECKPOINT_SUFFIX}"
+
+
+def run_signature(input_path, settings):
+    """
+    Fingerprint the input file version and the settings that shape the
+    output. A checkpoint is only resumed when the signature matches.
+    """
+    path = Path(input_path)
+    stat = path.stat()
+    payload = json.dumps({
+        'input': str(path.resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'settings': settings,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ConversionCheckpoint:
+    """
+    Saved progress of one input file.
+
+    position is the reader position after the last row of the last
+    completed chunk (None for a fresh run) and files the completed
+    (filename, rows) chunks. The row stages' counts are saved with them
+    (pickled, as for a parallel run's workers). Leads recorded by a delta
+    filter are appended to a binary sidecar, so each save writes only what
+    is new since the previous one.
+    """
+
+    def __init__(self, path, signature):
+        self.path = Path(path)
+        self.delta_path = self.path.with_name(self.path.name + '.delta')
+        self.signature = signature
+        self.position = None
+        self.files = []
+        self.delta_stats = None
+        self.delta_count = 0
+        self.stages = []
+
+    @classmethod
+    def load(cls, path, signature):
+        """
+        Return the checkpoint saved at path if it belongs to signature and
+        its chunk files are still on disk, otherwise a fresh checkpoint.
+        """
+        checkpoint = cls(path, signature)
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if state.get('version') != CHECKPOINT_VERSION or state.get('signature') != signature:
+            return checkpoint
+        if not all((checkpoint.path.parent / name).exists() for name, _ in state['files']):
+            return checkpoint
+
+        checkpoint.position = state['position']
+        checkpoint.files = [tuple(f) for f in state['files']]
+        checkpoint.delta_stats = state.get('delta_stats')
+        checkpoint.delta_count = state.get('delta_count', 0)
+        if state.get('stages'):
+            checkpoint.stages = pickle.loads(base64.b64decode(state['stages']))
+        return checkpoint
+
+    @property
+    def resumed(self):
+        return self.position is not None
+
+    @property
+    def rows_emitted(self):
+        return sum(rows for _, rows in self.files)
+
+    def restore_delta(self, delta_filter):
+        """Reload the leads and stats a DeltaFilter had recorded at the checkpoint."""
+        pairs = array('Q')
+        if self.delta_count:
+            with open(self.delta_path, 'rb') as f:
+                pairs.fromfile(f, self.delta_count * 2)
+        delta_filter.keys = pairs[0::2]
+        delta_filter.fingerprints = pairs[1::2]
+        if self.delta_stats:
+            delta_filter.stats = dict(self.delta_stats)
+
+    def restore_stages(self, stages):
+        """Fold the counts each row stage had at the checkpoint into the matching stage."""
+        saved = {type(stage): stage for stage in self.stages}
+        for stage in stages:
+            if type(stage) in saved:
+                stage.merge(saved[type(stage)])
+
+    def _append_delta(self, delta_filter):
+        pairs = array('Q')
+        for i in range(self.delta_count, len(delta_filter.keys)):
+            pairs.append(delta_filter.keys[i])
+            pairs.append(delta_filter.fingerprints[i])
+        mode = 'r+b' if self.delta_path.exists() else 'wb'
+        with open(self.delta_path, mode) as f:
+            # Drop anything written after the last saved checkpoint
+            f.truncate(self.delta_count * _DELTA_ENTRY_BYTES)
+            f.seek(0, os.SEEK_END)
+            pairs.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.delta_count = len(delta_filter.keys)
+
+    def save(self, position, files, delta_filter=None, stages=()):
+        """
+        Record progress; call only once the listed chunk files are on disk
+        and stages have seen exactly the rows in them.
+        """
+        self.position = position
+        self.files = [tuple(f) for f in files]
+        self.stages = list(stages)
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'signature': self.signature,
+            'position': position,
+            'files': self.files,
+        }
+        if self.stages:
+            state['stages'] = base64.b64encode(pickle.dumps(self.stages)).decode('ascii')
+        if delta_filter is not None:
+            self._append_delta(delta_filter)
+            state['delta_count'] = self.delta_count
+            state['delta_stats'] = delta_filter.stats
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path, json.dumps(state))
+
+    def clear(self):
+        """Remove the checkpoint once the conversion has finished."""
+        for path in (self.path, self.delta_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Streaming Chunk Writer for FUB to Sierra CSV Converter
+Writes Sierra rows straight to disk, rotating to a new file every time a
+chunk reaches Sierra's import limit. Optionally evens out chunk sizes or
+routes rows into per-agent/source/tag chunk series.
+"""
+
+import csv
+import hashlib
+import os
+import queue
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Sierra import limit
+SIERRA_MAX_ROWS = 5000
+
+# Columns rows can be partitioned by ('Tags' routes on a row's first tag)
+PARTITION_COLUMNS = ('Assigned Agent', 'Lead Source', 'Tags')
+
+# Open file handles kept by a partitioned writer before the least recently
+# used one is closed (it is reopened in append mode if more rows arrive)
+MAX_OPEN_PARTITIONS = 32
+
+# Partition name for rows with no value in the partition column
+UNASSIGNED_PARTITION = 'unassigned'
+
+# Longest partition slug used in file names (a long first tag would otherwise
+# exceed the file system's name limit)
+PARTITION_SLUG_MAX = 40
+
+# Hex digits of the value's hash appended when two values share a slug
+PARTITION_HASH_DIGITS = 8
+
+# Write-behind: rows handed to the writer thread at a time, batches queued
+# ahead of it before conversion waits, and the output file buffer size
+WRITE_BATCH_ROWS = 1000
+WRITE_QUEUE_DEPTH = 8
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+_SLUG_JUNK = re.compile(r'[^a-z0-9]+')
+
+
+def balanced_chunk_size(total_rows, max_rows=SIERRA_MAX_ROWS):
+    """
+    Return the chunk size that splits total_rows into the fewest chunks
+    of as equal a size as possible (5,100 rows -> 2 x 2,550).
+    Never exceeds max_rows, so an underestimated total stays import-safe.
+    """
+    if not total_rows or total_rows <= max_rows:
+        return max_rows
+    num_chunks = (total_rows + max_rows - 1) // max_rows
+    return (total_rows + num_chunks - 1) // num_chunks
+
+
+class ChunkWriter:
+    """
+    Rotating CSV writer producing {base}-sierra-chunkN.csv files.
+
+    Rows are written as they arrive, so only the current row is held in
+    memory. If everything fits in a single chunk the file is renamed to
+    {base}-sierra.csv on close, matching the non-chunked naming.
+
+    prefix is prepended to every file on disk (e.g. the web session id)
+    but not to the names reported in self.files, which is a list of
+    (filename, row_count) tuples.
+
+    For resumable runs, completed lists chunks already written by an
+    earlier run (numbering continues after them), and on_chunk_complete
+    is called with self.files each time a chunk fills up, after the chunk
+    has been closed and synced to disk.
+    """
+
+    def __init__(self, output_dir, base_name, fieldnames, max_rows=SIERRA_MAX_ROWS, prefix='',
+                 completed=None, on_chunk_complete=None):
+        if max_rows < 1:
+            raise ValueError("max_rows must be at least 1")
+        self.output_dir = Path(output_dir)
+        self.base_name = base_name
+        self.fieldnames = list(fieldnames)
+        self.max_rows = max_rows
+        self.prefix = prefix
+        self.files = [list(f) for f in completed or ()]
+        self.total_rows = sum(rows for _, rows in self.files)
+        self.on_chunk_complete = on_chunk_complete
+        self._file = None
+        self._writer = None
+        self._rows_in_chunk = 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def path_for(self, filename):
+        """Return the on-disk path for a reported filename."""
+        return self.output_dir / f"{self.prefix}{filename}"
+
+    def _open_next(self):
+        self._close_current()
+        filename = f"{self.base_name}-sierra-chunk{len(self.files) + 1}.csv"
+        self._file = open(self.path_for(filename), 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        self._writer.writeheader()
+        self._rows_in_chunk = 0
+        self.files.append([filename, 0])
+
+    def _close_current(self, sync=False):
+        if self._file is not None:
+            if sync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def write(self, row):
+        """Write one row, starting a new chunk when the current one is full."""
+        if self._writer is None or self._rows_in_chunk >= self.max_rows:
+            self._open_next()
+        self._writer.writerow(row)
+        self._rows_in_chunk += 1
+        self.files[-1][1] += 1
+        self.total_rows += 1
+        if self.on_chunk_complete and self._rows_in_chunk >= self.max_rows:
+            self._close_current(sync=True)
+            self.on_chunk_complete([tuple(f) for f in self.files])
+
+    def write_rows(self, rows):
+        """Write every row from an iterable."""
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        """
+        Finish the last chunk and return the list of (filename, rows).
+        A lone chunk is renamed to the plain {base}-sierra.csv name.
+        """
+        if self._closed:
+            return self.files
+        self._closed = True
+        self._close_current()
+        if len(self.files) == 1:
+            single = f"{self.base_name}-sierra.csv"
+            os.replace(self.path_for(self.files[0][0]), self.path_for(single))
+            self.files[0][0] = single
+        self.files = [tuple(f) for f in self.files]
+        return self.files
+
+
+class WriteBehindChunkWriter(ChunkWriter):
+    """
+    ChunkWriter that formats and writes rows on a background thread.
+
+    Rows (dicts, or sequences already in fieldnames order) are queued as
+    tuples in batches of batch_rows; the writer thread writes them through
+    a large file buffer, so converting the next rows overlaps writing the
+    previous ones and a slow (e.g. network) volume only holds up conversion
+    once queue_depth batches are waiting. Chunk names and row counts are
+    the same as ChunkWriter's and are final once close() returns. An error
+    in the writer thread is raised from the next write() or from close().
+
+    Not for resumable runs: a chunk is on disk only once the thread has
+    caught up, so there is no on_chunk_complete.
+    """
+
+    def __init__(self, output_dir, base_name, fieldnames, max_rows=SIERRA_MAX_ROWS, prefix='',
+                 batch_rows=WRITE_BATCH_ROWS, queue_depth=WRITE_QUEUE_DEPTH):
+        super().__init__(output_dir, base_name, fieldnames, max_rows=max_rows, prefix=prefix)
+        self.batch_rows = batch_rows
+        self._batch = []
+        self._queue = queue.Queue(maxsize=queue_depth)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='chunk-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        out = None
+        path = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue  # keep draining so the converting thread never blocks
+            batch_path, rows = item
+            try:
+                if batch_path != path:
+                    if out is not None:
+                        out.close()
+                    out = open(batch_path, 'w', encoding='utf-8', newline='',
+                               buffering=WRITE_BUFFER_SIZE)
+                    path = batch_path
+                    writer = csv.writer(out)
+                    writer.writerow(self.fieldnames)
+                writer.writerows(rows)
+            except Exception as e:
+                self._error = e
+        try:
+            if out is not None:
+                out.close()
+        except Exception as e:
+            self._error = self._error or e
+
+    def _flush(self):
+        if self._batch:
+            self._queue.put((self.path_for(self.files[-1][0]), self._batch))
+            self._batch = []
+
+    def write(self, row):
+        """Queue one row, starting a new chunk when the current one is full."""
+        if self._error is not None:
+            raise self._error
+        if not self.files or self._rows_in_chunk >= self.max_rows:
+            self._flush()
+            self.files.append([f"{self.base_name}-sierra-chunk{len(self.files) + 1}.csv", 0])
+            self._rows_in_chunk = 0
+        if isinstance(row, dict):
+            row = tuple(map(row.get, self.fieldnames))
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_rows:
+            self._flush()
+        self._rows_in_chunk += 1
+        self.files[-1][1] += 1
+        self.total_rows += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(aborted=exc_type is not None)
+        return False
+
+    def close(self, aborted=False):
+        """
+        Wait for the writer thread, then finish like ChunkWriter.close().
+        With aborted (the with block is unwinding from an exception) the
+        queued rows are dropped, no writer error is raised over the one in
+        flight and the partial chunks are left unfinished.
+        """
+        if self._thread.is_alive():
+            if aborted:
+                self._batch = []
+            else:
+                self._flush()
+            self._queue.put(None)
+            self._thread.join()
+        if aborted:
+            self._closed = True
+            self.files = [tuple(f) for f in self.files]
+            return self.files
+        if self._error is not None:
+            raise self._error
+        return super().close()
+
+
+def partition_slug(value):
+    """Turn a partition value into a filename-safe slug of at most PARTITION_SLUG_MAX characters."""
+    slug = _SLUG_JUNK.sub('-', (value or '').lower()).strip('-')[:PARTITION_SLUG_MAX]
+    return slug.rstrip('-') or UNASSIGNED_PARTITION
+
+
+def partition_value(row, partition_by):
+    """Return the raw partition value of a row ('Tags' -> its first tag)."""
+    value = row.get(partition_by) or ''
+    if partition_by == 'Tags':
+        value = re.split(r'[;,|]', value, maxsplit=1)[0]
+    return value.strip()
+
+
+class _Partition:
+    """Chunk series bookkeeping for one partition key."""
+
+    def __init__(self, slug):
+        self.slug = slug
+        self.files = []
+        self.rows_in_chunk = 0
+        self.file = None
+        self.writer = None
+
+
+class PartitionedChunkWriter:
+    """
+    Routes rows into one chunk series per partition value in a single pass.
+
+    Files are named {base}-{slug}-sierra-chunkN.csv (or {base}-{slug}-sierra.csv
+    when a partition fits in one chunk). Each distinct value gets its own
+    series: when a value's slug is already taken by another value ('Mary Ann'
+    and 'Mary-Ann'), a short hash of the value is appended to it. At most
+    max_open_files handles are open at once; the least recently used one is
+    closed and reopened in append mode when its partition receives more rows.
+    self.files is a list of (filename, row_count) tuples ordered by partition
+    first appearance.
+    """
+
+    def __init__(self, output_dir, base_name, fieldnames, partition_by,
+                 max_rows=SIERRA_MAX_ROWS, prefix='', max_open_files=MAX_OPEN_PARTITIONS):
+        if partition_by not in PARTITION_COLUMNS:
+            raise ValueError(f"Cannot partition by '{partition_by}'. "
+                             f"Choose one of: {', '.join(PARTITION_COLUMNS)}")
+        if max_rows < 1 or max_open_files < 1:
+            raise ValueError("max_rows and max_open_files must be at least 1")
+        self.output_dir = Path(output_dir)
+        self.base_name = base_name
+        self.fieldnames = list(fieldnames)
+        self.partition_by = partition_by
+        self.max_rows = max_rows
+        self.prefix = prefix
+        self.max_open_files = max_open_files
+        self.files = []
+        self.total_rows = 0
+        self._partitions = OrderedDict()
+        self._slugs = {}
+        self._open = OrderedDict()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def path_for(self, filename):
+        """Return the on-disk path for a reported filename."""
+        return self.output_dir / f"{self.prefix}{filename}"
+
+    def _release(self, part):
+        if part.file is not None:
+            part.file.close()
+            part.file = None
+            part.writer = None
+        self._open.pop(part.slug, None)
+
+    def _activate(self, part, new_chunk):
+        if new_chunk:
+            self._release(part)
+            part.files.append([f"{self.base_name}-{part.slug}-sierra-chunk{len(part.files) + 1}.csv", 0])
+            part.rows_in_chunk = 0
+        elif part.file is not None:
+            self._open.move_to_end(part.slug)
+            return
+
+        while len(self._open) >= self.max_open_files:
+            _, oldest = self._open.popitem(last=False)
+            self._release(oldest)
+
+        path = self.path_for(part.files[-1][0])
+        part.file = open(path, 'w' if new_chunk else 'a', encoding='utf-8', newline='')
+        part.writer = csv.DictWriter(part.file, fieldnames=self.fieldnames)
+        if new_chunk:
+            part.writer.writeheader()
+        self._open[part.slug] = part
+
+    def _slug_for(self, value):
+        slug = self._slugs.get(value)
+        if slug is None:
+            slug = partition_slug(value)
+            if slug in self._partitions:
+                digest = hashlib.sha1(value.encode('utf-8')).hexdigest()[:PARTITION_HASH_DIGITS]
+                slug = f"{slug}-{digest}"
+            self._slugs[value] = slug
+        return slug
+
+    def write(self, row):
+        """Write one row to the chunk series of its partition."""
+        slug = self._slug_for(partition_value(row, self.partition_by))
+        part = self._partitions.get(slug)
+        if part is None:
+            part = self._partitions[slug] = _Partition(slug)
+
+        self._activate(part, new_chunk=not part.files or part.rows_in_chunk >= self.max_rows)
+        part.writer.writerow(row)
+        part.rows_in_chunk += 1
+        part.files[-1][1] += 1
+        self.total_rows += 1
+
+    def write_rows(self, rows):
+        """Write every row from an iterable."""
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        """Close every handle, rename single-chunk partitions, return self.files."""
+        if self._closed:
+            return self.files
+        self._closed = True
+        for part in list(self._open.values()):
+            self._release(part)
+
+        self.files = []
+        for part in self._partitions.values():
+            if len(part.files) == 1:
+                single = f"{self.base_name}-{part.slug}-sierra.csv"
+                os.replace(self.path_for(part.files[0][0]), self.path_for(single))
+                part.files[0][0] = single
+            self.files.extend(tuple(f) for f in part.files)
+        return self.files
+
+
+class ChunkPieceWriter:
+    """
+    Writes the converted rows of one input range for a parallel conversion.
+
+    first_row is the global index of the range's first row, so each row
+    lands in the piece file of the chunk it belongs to. Pieces have no
+    header; join_chunk_pieces() concatenates them into the final chunks.
+    self.pieces is a list of (chunk_index, path, row_count) tuples.
+    """
+
+    def __init__(self, piece_dir, name, fieldnames, max_rows, first_row):
+        self.piece_dir = Path(piece_dir)
+        self.name = name
+        self.fieldnames = list(fieldnames)
+        self.max_rows = max_rows
+        self.row_index = first_row
+        self.pieces = []
+        self._file = None
+        self._writer = None
+        self._chunk = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def write(self, row):
+        chunk = self.row_index // self.max_rows
+        if chunk != self._chunk:
+            self.close()
+            path = self.piece_dir / f"{self.name}-chunk{chunk}.part"
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+            self._chunk = chunk
+            self.pieces.append([chunk, str(path), 0])
+        self._writer.writerow(row)
+        self.pieces[-1][2] += 1
+        self.row_index += 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.pieces = [tuple(p) for p in self.pieces]
+        return self.pieces
+
+
+def join_chunk_pieces(output_dir, base_name, fieldnames, pieces, prefix=''):
+    """
+    Concatenate piece files (from every ChunkPieceWriter, in range order)
+    into chunk files named like ChunkWriter's. Piece bytes are copied
+    as-is, so nothing is parsed twice. Returns a list of (filename, rows).
+    """
+    by_chunk = OrderedDict()
+    for chunk, path, rows in sorted(pieces, key=lambda p: p[0]):
+        if rows:
+            by_chunk.setdefault(chunk, []).append((path, rows))
+
+    output_dir = Path(output_dir)
+    files = []
+    for number, chunk_pieces in enumerate(by_chunk.values(), 1):
+        filename = f"{base_name}-sierra-chunk{number}.csv"
+        with open(output_dir / f"{prefix}{filename}", 'w', encoding='utf-8', newline='') as out:
+            csv.DictWriter(out, fieldnames=fieldnames).writeheader()
+            out.flush()
+            for path, _ in chunk_pieces:
+                with open(path, 'rb') as piece:
+                    shutil.copyfileobj(piece, out.buffer)
+        files.append((filename, sum(rows for _, rows in chunk_pieces)))
+
+    if len(files) == 1:
+        single = f"{base_name}-sierra.csv"
+        os.replace(output_dir / f"{prefix}{files[0][0]}", output_dir / f"{prefix}{single}")
+        files[0] = (single, files[0][1])
+    return files
+
+
+def open_chunk_writer(output_dir, base_name, fieldnames, max_rows=SIERRA_MAX_ROWS, prefix='',
+                      balance=False, expected_rows=None, partition_by=None, write_behind=False):
+    """
+    Build the writer for a conversion.
+    balance evens out chunk sizes using expected_rows (known or estimated);
+    partition_by routes rows into per-value chunk series instead.
+    write_behind writes (non-partitioned) chunks on a background thread.
+    """
+    if partition_by:
+        return PartitionedChunkWriter(output_dir, base_name, fieldnames, partition_by,
+                                      max_rows=max_rows, prefix=prefix)
+    if balance:
+        max_rows = balanced_chunk_size(expected_rows, max_rows)
+    if write_behind:
+        return WriteBehindChunkWriter(output_dir, base_name, fieldnames, max_rows=max_rows,
+                                      prefix=prefix)
+    return ChunkWriter(output_dir, base_name, fieldnames, max_rows=max_rows, prefix=prefix)
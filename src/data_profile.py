@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Data Quality Profile for FUB to Sierra CSV Converter
+Collects fill rates, invalid phone/email counts and the most common lead
+sources, agents and tags while converted rows stream to the chunk writer,
+so the report costs no extra pass over the data and bounded memory.
+"""
+
+import re
+
+from email_normalizer import normalize_email
+
+# Phones normalize_phone could format; anything else non-empty was passed through as-is
+VALID_PHONE = re.compile(r'\(\d{3}\) \d{3}-\d{4}')
+
+PHONE_COLUMNS = ('Phone', 'Secondary Phone')
+EMAIL_COLUMNS = ('Email', 'Secondary Email')
+
+# Report name -> Sierra column whose most common values are tracked
+TOP_VALUE_COLUMNS = {
+    'sources': 'Lead Source',
+    'agents': 'Assigned Agent',
+    'tags': 'Tags',
+}
+
+# Counters kept per tracked column; values with fewer occurrences than
+# rows / TOP_K_CAPACITY may be missed once a column has more distinct values
+TOP_K_CAPACITY = 64
+
+# Values listed per column in the report
+TOP_N = 5
+
+
+class TopK:
+    """
+    Misra-Gries heavy-hitters sketch over at most `capacity` counters.
+    Counts are exact while there are no more distinct values than counters;
+    after that they are lower bounds (each undercounted by at most rows/capacity).
+    """
+
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, value):
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < self.capacity:
+            counts[value] = 1
+        else:
+            # Decrement everything instead of storing the new value; the total
+            # work is bounded by the increments, so this is amortized O(1)
+            for key in list(counts):
+                if counts[key] == 1:
+                    del counts[key]
+                else:
+                    counts[key] -= 1
+
+    def merge(self, other):
+        """Fold another sketch (e.g. from a worker process) into this one."""
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > self.capacity:
+            cutoff = sorted(self.counts.values(), reverse=True)[self.capacity]
+            self.counts = {value: count - cutoff for value, count in self.counts.items()
+                           if count > cutoff}
+
+    def top(self, n=TOP_N):
+        """Return the n most common values as [value, count] pairs."""
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return [[value, count] for value, count in ranked[:n]]
+
+
+class DataProfile:
+    """
+    Streaming quality profile of converted Sierra rows.
+
+    apply() returns the row it was given, so a profile can be slotted into
+    a row stream with map() or profile.wrap(rows). Put it before any
+    EmailNormalizer: emails are judged by the same rule, but the normalizer
+    clears invalid ones, which would then count as missing.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.rows = 0
+        self.filled = dict.fromkeys(self.columns, 0)
+        self.invalid_phones = 0
+        self.invalid_emails = 0
+        self.top = {name: TopK() for name in TOP_VALUE_COLUMNS}
+
+    def apply(self, row):
+        """Count one row and return it unchanged."""
+        self.rows += 1
+        filled = self.filled
+        for col in self.columns:
+            if row.get(col):
+                filled[col] += 1
+        for col in PHONE_COLUMNS:
+            value = row.get(col)
+            if value and not VALID_PHONE.fullmatch(value):
+                self.invalid_phones += 1
+        for col in EMAIL_COLUMNS:
+            value = row.get(col)
+            if value and normalize_email(value)[1] == 'rejected':
+                self.invalid_emails += 1
+        for name, col in TOP_VALUE_COLUMNS.items():
+            value = row.get(col)
+            if not value:
+                continue
+            if col == 'Tags':
+                for tag in value.split('; '):
+                    self.top[name].add(tag)
+            else:
+                self.top[name].add(value)
+        return row
+
+    def wrap(self, rows):
+        """Yield rows unchanged while profiling them."""
+        for row in rows:
+            yield self.apply(row)
+
+    def merge(self, other):
+        """Add another profile's counts (e.g. one range of a parallel run)."""
+        self.rows += other.rows
+        for col, count in other.filled.items():
+            self.filled[col] = self.filled.get(col, 0) + count
+        self.invalid_phones += other.invalid_phones
+        self.invalid_emails += other.invalid_emails
+        for name, sketch in other.top.items():
+            self.top[name].merge(sketch)
+
+    def report(self):
+        """Return the profile as a small JSON-serializable dict."""
+        rows = self.rows
+        return {
+            'rows': rows,
+            'fill_rate': {col: round(count / rows, 3) if rows else 0.0
+                          for col, count in self.filled.items()},
+            'missing_email': rows - self.filled.get('Email', 0),
+            'invalid_phones': self.invalid_phones,
+            'invalid_emails': self.invalid_emails,
+            **{f'top_{name}': sketch.top() for name, sketch in self.top.items()},
+        }
+
+    def summary_lines(self):
+        """Human-readable summary for the CLI and conversion logs."""
+        report = self.report()
+        lines = [
+            f"Data quality: {report['missing_email']} of {report['rows']} rows without an email, "
+            f"{report['invalid_phones']} unformatted phones, {report['invalid_emails']} invalid emails",
+        ]
+        empty = [col for col, rate in report['fill_rate'].items() if rate < 0.5]
+        if empty and report['rows']:
+            lines.append(f"Mostly empty columns: {', '.join(empty)}")
+        for name in TOP_VALUE_COLUMNS:
+            top = report[f'top_{name}']
+            if top:
+                lines.append(f"Top {name}: " + ', '.join(f"{value} ({count})" for value, count in top))
+        return lines
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Delta Conversion Index for FUB to Sierra CSV Converter
+Remembers a fingerprint of every lead from the previous run so a re-export
+only yields rows that are new or have changed since then.
+"""
+
+import hashlib
+import os
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from lead_dedup import email_key, phone_key
+
+# File header: magic bytes followed by the entry count as 8 little-endian bytes
+INDEX_MAGIC = b'FUBDELTA1\n'
+
+# Separator between field values when hashing row content
+_FIELD_SEP = '\x1f'
+
+
+def _hash64(text):
+    """Stable 64-bit hash (unlike hash(), identical across processes)."""
+    return int.from_bytes(
+        hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little'
+    )
+
+
+def _value(fub_row, fub_cols, key):
+    column = fub_cols.get(key)
+    if not column:
+        return ''
+    return (fub_row.get(column) or '').strip()
+
+
+def lead_key(fub_row, fub_cols):
+    """
+    Return the stable identity hash for a FUB row, or None if the row has
+    nothing to identify it by (no email, phone or name).
+    """
+    email = email_key(_value(fub_row, fub_cols, 'email'))
+    if email:
+        return _hash64('e:' + email)
+    phone = phone_key(_value(fub_row, fub_cols, 'phone'))
+    if phone:
+        return _hash64('p:' + phone)
+    first = _value(fub_row, fub_cols, 'first_name').lower()
+    last = _value(fub_row, fub_cols, 'last_name').lower()
+    if first or last:
+        return _hash64(f'n:{first}{_FIELD_SEP}{last}')
+    return None
+
+
+def content_fingerprint(fub_row, fub_cols):
+    """
+    Return a hash of the row content that matters for the conversion.
+    When 'modified_date' is mapped and populated it alone decides whether
+    the lead changed; otherwise every mapped column is hashed.
+    """
+    modified = _value(fub_row, fub_cols, 'modified_date')
+    if modified:
+        return _hash64('m:' + modified)
+    values = [_value(fub_row, fub_cols, key) for key in sorted(fub_cols)]
+    return _hash64('c:' + _FIELD_SEP.join(values))
+
+
+class DeltaIndex:
+    """
+    Compact key → fingerprint index stored as two parallel sorted arrays of
+    unsigned 64-bit ints (16 bytes per lead on disk and in memory).
+    Lookups are binary searches.
+    """
+
+    def __init__(self, keys=None, fingerprints=None):
+        self.keys = keys if keys is not None else array('Q')
+        self.fingerprints = fingerprints if fingerprints is not None else array('Q')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, key):
+        """Return the stored fingerprint for key, or None."""
+        idx = bisect_left(self.keys, key)
+        if idx < len(self.keys) and self.keys[idx] == key:
+            return self.fingerprints[idx]
+        return None
+
+    @classmethod
+    def load(cls, path):
+        """Load an index file, returning an empty index if it does not exist."""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+
+        with open(path, 'rb') as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"Not a delta index file: {path}")
+            count = int.from_bytes(f.read(8), 'little')
+            keys = array('Q')
+            fingerprints = array('Q')
+            keys.fromfile(f, count)
+            fingerprints.fromfile(f, count)
+        return cls(keys, fingerprints)
+
+    def save(self, path):
+        """Write the index atomically so a crash never leaves a torn file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(len(self.keys).to_bytes(8, 'little'))
+            self.keys.tofile(f)
+            self.fingerprints.tofile(f)
+        os.replace(tmp_path, path)
+
+    def merged_with(self, keys, fingerprints):
+        """
+        Return a new index with the given (unsorted) entries applied on top
+        of this one. Later entries win over earlier ones and over stored ones.
+        """
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        new_keys = array('Q')
+        new_fps = array('Q')
+        for i in order:
+            if new_keys and new_keys[-1] == keys[i]:
+                new_fps[-1] = fingerprints[i]
+            else:
+                new_keys.append(keys[i])
+                new_fps.append(fingerprints[i])
+
+        out_keys = array('Q')
+        out_fps = array('Q')
+        i = j = 0
+        old_keys, old_fps = self.keys, self.fingerprints
+        while i < len(old_keys) and j < len(new_keys):
+            if old_keys[i] < new_keys[j]:
+                out_keys.append(old_keys[i])
+                out_fps.append(old_fps[i])
+                i += 1
+            else:
+                if old_keys[i] == new_keys[j]:
+                    i += 1
+                out_keys.append(new_keys[j])
+                out_fps.append(new_fps[j])
+                j += 1
+        out_keys.extend(old_keys[i:])
+        out_fps.extend(old_fps[i:])
+        out_keys.extend(new_keys[j:])
+        out_fps.extend(new_fps[j:])
+        return DeltaIndex(out_keys, out_fps)
+
+
+class DeltaFilter:
+    """
+    Row filter that passes only leads that are new or changed relative to a
+    previous DeltaIndex, recording every lead it sees for the next run.
+
+    Call the filter once per row on the single streaming pass. Multi-pass
+    stages (e.g. dedup) should use check() on the extra passes, which does
+    not record anything.
+    """
+
+    def __init__(self, previous, fub_cols):
+        self.previous = previous
+        self.fub_cols = fub_cols
+        self.keys = array('Q')
+        self.fingerprints = array('Q')
+        self.stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'unkeyed': 0}
+
+    def check(self, fub_row):
+        """Return True if the row should be converted, without recording it."""
+        key = lead_key(fub_row, self.fub_cols)
+        if key is None:
+            return True
+        return self.previous.get(key) != content_fingerprint(fub_row, self.fub_cols)
+
+    def __call__(self, fub_row):
+        key = lead_key(fub_row, self.fub_cols)
+        if key is None:
+            self.stats['unkeyed'] += 1
+            return True
+
+        fingerprint = content_fingerprint(fub_row, self.fub_cols)
+        self.keys.append(key)
+        self.fingerprints.append(fingerprint)
+
+        stored = self.previous.get(key)
+        if stored is None:
+            self.stats['new'] += 1
+            return True
+        if stored != fingerprint:
+            self.stats['changed'] += 1
+            return True
+        self.stats['unchanged'] += 1
+        return False
+
+    def save(self, path):
+        """
+        Persist the previous index updated with everything seen this run.
+        Call only after the output chunks were written successfully.
+        """
+        self.previous.merged_with(self.keys, self.fingerprints).save(path)
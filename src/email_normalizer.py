@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Email Normalization for FUB to Sierra CSV Converter
+Lowercases emails, validates them and fixes common domain typos
+(gmial.com -> gmail.com) so Sierra's duplicate detection sees one address
+per person. Decisions are made once per domain and cached, since a few
+thousand domains cover millions of rows.
+"""
+
+import re
+from functools import lru_cache
+
+# Sierra columns holding email addresses
+EMAIL_COLUMNS = ('Email', 'Secondary Email')
+
+# Column that receives emails rejected as invalid, so nothing is lost
+NOTE_COLUMN = 'Add to Import Note'
+NOTE_SEPARATOR = '\n\n'
+
+# Misspellings of the big mailbox providers. Only names no real mailbox
+# uses belong here: other providers' real domains (comcast.com is Comcast's
+# corporate mail) and the providers' names under other TLDs (gmail.co) are
+# left alone, since rewriting them would corrupt valid addresses.
+DOMAIN_TYPOS = {
+    'gmial.com': 'gmail.com', 'gmai.com': 'gmail.com', 'gmal.com': 'gmail.com',
+    'gamil.com': 'gmail.com', 'gnail.com': 'gmail.com', 'gmaill.com': 'gmail.com',
+    'gmsil.com': 'gmail.com',
+    'yaho.com': 'yahoo.com', 'yahooo.com': 'yahoo.com', 'yhoo.com': 'yahoo.com',
+    'tahoo.com': 'yahoo.com',
+    'hotmial.com': 'hotmail.com', 'hotmal.com': 'hotmail.com', 'hotmai.com': 'hotmail.com',
+    'hotmil.com': 'hotmail.com',
+    'outlok.com': 'outlook.com', 'outllok.com': 'outlook.com',
+    'iclod.com': 'icloud.com', 'icoud.com': 'icloud.com',
+    'aoll.com': 'aol.com',
+}
+
+# Top-level domains that are always typos (.con is not a TLD)
+TLD_TYPOS = {
+    'con': 'com', 'cmo': 'com', 'ocm': 'com', 'comm': 'com', 'vom': 'com', 'xom': 'com',
+    'nte': 'net', 'nett': 'net', 'ogr': 'org',
+}
+
+# Distinct domains whose decision is remembered
+DOMAIN_CACHE_SIZE = 4096
+
+# Rejected addresses listed in the report (the count covers all of them)
+REJECT_SAMPLES = 10
+
+# Local parts may hold UTF-8 letters (RFC 6531: josé@example.com)
+_LOCAL_CHAR = r"(?:[a-z0-9!#$%&'*+/=?^_`{|}~-]|[^\x00-\x7f\s])"
+_LOCAL_PART = re.compile(rf"{_LOCAL_CHAR}+(?:\.{_LOCAL_CHAR}+)*")
+# Domains are checked in their ASCII (IDNA) form, so internationalized
+# names (bücher.de) and punycode TLDs (.xn--p1ai) are valid too
+_DOMAIN = re.compile(r"(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})")
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def normalize_domain(domain):
+    """
+    Return the corrected form of a lowercased domain, or None if it is not
+    a valid domain name.
+    """
+    name, dot, tld = domain.rpartition('.')
+    if dot and tld in TLD_TYPOS:
+        domain = f"{name}.{TLD_TYPOS[tld]}"
+    domain = DOMAIN_TYPOS.get(domain, domain)
+    ascii_domain = domain
+    if not domain.isascii():
+        try:
+            ascii_domain = domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            return None
+    return domain if _DOMAIN.fullmatch(ascii_domain) else None
+
+
+def normalize_email(value):
+    """
+    Normalize one email. Returns (email, status) where status is None
+    (unchanged apart from case and whitespace), 'corrected' (domain typo
+    fixed) or 'rejected' (email is '' and value was not a valid address).
+    Blank values return ('', None).
+    """
+    email = value.strip().lower() if value else ''
+    if not email:
+        return '', None
+    local, at, domain = email.rpartition('@')
+    if not at or not _LOCAL_PART.fullmatch(local):
+        return '', 'rejected'
+    fixed = normalize_domain(domain)
+    if fixed is None:
+        return '', 'rejected'
+    if fixed != domain:
+        return f"{local}@{fixed}", 'corrected'
+    return email, None
+
+
+class EmailNormalizer:
+    """
+    Row stage that normalizes the email columns of Sierra rows and counts
+    what it did. Invalid addresses are taken out of the email columns and
+    added to the import note instead of being silently passed to Sierra.
+    """
+
+    def __init__(self):
+        self.stats = {'corrected': 0, 'rejected': 0}
+        self.rejected = []
+
+    def apply(self, row):
+        """Normalize a row's emails in place and return it."""
+        for col in EMAIL_COLUMNS:
+            value = row.get(col)
+            if not value:
+                continue
+            email, status = normalize_email(value)
+            row[col] = email
+            if status == 'rejected':
+                self.stats['rejected'] += 1
+                if len(self.rejected) < REJECT_SAMPLES:
+                    self.rejected.append(value.strip())
+                note = f"Invalid {col}: {value.strip()}"
+                row[NOTE_COLUMN] = NOTE_SEPARATOR.join(filter(None, [row.get(NOTE_COLUMN), note]))
+            elif status == 'corrected':
+                self.stats['corrected'] += 1
+        return row
+
+    def wrap(self, rows):
+        """Yield rows with their emails normalized."""
+        for row in rows:
+            yield self.apply(row)
+
+    def merge(self, other):
+        """Add another normalizer's counts (e.g. one range of a parallel run)."""
+        for key, count in other.stats.items():
+            self.stats[key] += count
+        self.rejected.extend(other.rejected[:REJECT_SAMPLES - len(self.rejected)])
+
+    def report(self):
+        """Return the counts and sample rejects as a JSON-serializable dict."""
+        return {**self.stats, 'rejected_samples': list(self.rejected)}
+
+    def summary_lines(self):
+        """Human-readable summary for the CLI and conversion logs."""
+        lines = [f"Emails: {self.stats['corrected']} domain typos fixed, "
+                 f"{self.stats['rejected']} invalid moved to the import note"]
+        if self.rejected:
+            lines.append(f"Invalid emails: {', '.join(self.rejected)}")
+        return lines
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Multi-File Export Merge for FUB to Sierra CSV Converter
+Streams several FUB exports with differing headers through one unified
+column mapping into a single continuous Sierra chunk sequence.
+"""
+
+import re
+
+from chunk_writer import ChunkWriter, SIERRA_MAX_ROWS
+from export_reader import open_export
+
+# Alternate header spellings seen in per-agent FUB exports and re-saved
+# spreadsheets. Matching is case-, space- and punctuation-insensitive.
+HEADER_ALIASES = {
+    'first_name': ['First', 'Firstname', 'Given Name'],
+    'last_name': ['Last', 'Lastname', 'Surname', 'Family Name'],
+    'email': ['Email Address', 'Email 1', 'Primary Email', 'E-mail'],
+    'secondary_email': ['Email 2', 'Other Email', 'Alternate Email'],
+    'phone': ['Phone Number', 'Phone 1', 'Primary Phone', 'Mobile', 'Cell'],
+    'secondary_phone': ['Phone 2', 'Other Phone', 'Alternate Phone', 'Home Phone'],
+    'source': ['Lead Source'],
+    'assigned_to': ['Assigned Agent', 'Agent', 'Owner'],
+    'street': ['Street Address', 'Address', 'Address 1'],
+    'zip': ['Zip Code', 'Postal Code', 'ZIP'],
+}
+
+_HEADER_JUNK = re.compile(r'[^a-z0-9]')
+
+
+def normalize_header(name):
+    """Reduce a header to a comparison key ('E-mail Address ' -> 'emailaddress')."""
+    return _HEADER_JUNK.sub('', (name or '').lower())
+
+
+def resolve_header_mapping(fieldnames, fub_cols):
+    """
+    Map the unified internal keys onto one file's actual headers.
+
+    fub_cols is the unified mapping (internal key -> canonical header). Each
+    key is matched against the canonical header first, then its aliases.
+    Returns (mapping, unused_headers) where mapping only contains the keys
+    this file can supply and unused_headers lists columns nothing maps to.
+    """
+    by_normalized = {}
+    for header in fieldnames or []:
+        if header:
+            by_normalized.setdefault(normalize_header(header), header)
+
+    mapping = {}
+    used = set()
+    for key, canonical in fub_cols.items():
+        if not canonical:
+            continue
+        for candidate in [canonical] + HEADER_ALIASES.get(key, []):
+            header = by_normalized.get(normalize_header(candidate))
+            if header and header not in used:
+                mapping[key] = header
+                used.add(header)
+                break
+
+    unused = [h for h in fieldnames or [] if h and h not in used]
+    return mapping, unused
+
+
+def iter_merged_rows(input_paths, fub_cols, convert_row, log_callback=None):
+    """
+    Yield converted Sierra rows from every input in turn.
+    Only one file is open at a time and rows are never accumulated.
+    convert_row is called as convert_row(fub_row, file_mapping).
+    """
+    for input_path in input_paths:
+        with open_export(input_path) as reader:
+            mapping, unused = resolve_header_mapping(reader.fieldnames, fub_cols)
+            if log_callback:
+                log_callback(f"{input_path.name}: {len(mapping)} mapped columns"
+                             + (f", ignoring {', '.join(unused)}" if unused else ''))
+            for fub_row in reader:
+                yield convert_row(fub_row, mapping)
+
+
+def merge_exports(input_paths, output_dir, base_name, fub_cols, convert_row, fieldnames,
+                  max_rows=SIERRA_MAX_ROWS, log_callback=None):
+    """
+    Merge several FUB exports into one Sierra chunk set.
+    Every chunk except the last is exactly max_rows rows, regardless of
+    how rows were spread across the inputs.
+    Returns (list of (filename, rows), total_rows).
+    """
+    with ChunkWriter(output_dir, base_name, fieldnames, max_rows) as writer:
+        writer.write_rows(iter_merged_rows(input_paths, fub_cols, convert_row, log_callback))
+    return writer.files, writer.total_rows
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Export Reader for FUB to Sierra CSV Converter
+Opens a FUB export as a stream of row dicts, whether it is a CSV in any
+supported encoding or an .xlsx workbook.
+"""
+
+import codecs
+import csv
+from contextlib import contextmanager
+from itertools import islice
+
+from mmap_reader import MAPPABLE_ENCODINGS, MappedCsvReader, count_records
+from transcode import FALLBACK_ERRORS, SNIFF_BYTES, detect_encoding, open_text
+from xlsx_reader import XlsxDictReader, sheet_row_count
+
+# Read size for the newline-counting row estimate
+_COUNT_BLOCK_BYTES = 1024 * 1024
+
+# Parse CSV files given by path through a memory map instead of buffered text I/O
+USE_MMAP = True
+
+# File types accepted as FUB exports
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+
+# Encodings in which every b'\n' byte ends a line, so a byte offset taken
+# between rows can be seeked back to (UTF-16/32 and workbooks cannot)
+_LINE_SEEKABLE_ENCODINGS = ('utf-8', 'utf-8-sig', 'cp1252')
+
+
+def is_xlsx(filename):
+    """Return True if the filename looks like an Excel workbook."""
+    return str(filename).lower().endswith('.xlsx')
+
+
+def is_supported_export(filename):
+    """Return True if the filename has a supported export extension."""
+    return str(filename).lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+@contextmanager
+def open_export(source, filename=None, encoding=None):
+    """
+    Yield a csv.DictReader-style reader (fieldnames + row dicts) for source.
+
+    source is a path or binary file object; filename decides the format
+    when source is a stream. The reader's encoding attribute holds the
+    detected text encoding, or 'xlsx' for workbooks. CSV paths in an
+    ASCII-compatible encoding are read through a memory map.
+    """
+    if is_xlsx(filename or source):
+        reader = XlsxDictReader(source)
+        reader.encoding = 'xlsx'
+        try:
+            yield reader
+        finally:
+            reader.close()
+        return
+
+    if USE_MMAP and _is_path(source):
+        encoding = _csv_encoding(source, encoding)
+        if encoding in MAPPABLE_ENCODINGS:
+            with MappedCsvReader(source, encoding=encoding) as reader:
+                yield reader
+            return
+
+    text, encoding = open_text(source, encoding)
+    with text:
+        reader = csv.DictReader(text)
+        reader.encoding = encoding
+        yield reader
+
+
+def _is_path(source):
+    return isinstance(source, str) or hasattr(source, '__fspath__')
+
+
+def _csv_encoding(path, encoding=None):
+    """Return encoding, or the one detected from the start of the file."""
+    if encoding is None:
+        with open(path, 'rb') as f:
+            encoding = detect_encoding(f.read(SNIFF_BYTES))
+    return encoding
+
+
+def estimate_row_count(path):
+    """
+    Estimate the number of data rows in an export without parsing it.
+    ASCII-compatible CSV files get an exact, quote-aware record count from
+    a memory-mapped scan; other CSV files are counted by newlines (quoted
+    multi-line notes make this an overestimate) and workbooks use the
+    sheet's declared dimension. Returns None when no estimate is available.
+    """
+    if is_xlsx(path):
+        return sheet_row_count(path)
+    if _csv_encoding(path) in MAPPABLE_ENCODINGS:
+        return count_records(path)
+
+    newlines = 0
+    last_byte = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(_COUNT_BLOCK_BYTES)
+            if not block:
+                break
+            newlines += block.count(b'\n')
+            last_byte = block[-1:]
+    lines = newlines + (0 if last_byte == b'\n' else 1)
+    return max(lines - 1, 0)
+
+
+class PositionedReader:
+    """
+    Reader over a FUB export that can report where it is after each row
+    and be reopened at that point.
+
+    position() returns a JSON-serialisable dict. For CSV files in an
+    ASCII-compatible encoding it holds the byte offset just past the last
+    row returned; otherwise only the number of rows read, and resuming
+    re-reads and skips those rows.
+    """
+
+    def __init__(self, fieldnames, rows, encoding, rows_read=0, offset=None):
+        self.fieldnames = fieldnames
+        self.encoding = encoding
+        self.rows_read = rows_read
+        self._rows = rows
+        self._offset = offset
+
+    def __iter__(self):
+        for row in self._rows:
+            self.rows_read += 1
+            yield row
+
+    def position(self):
+        offset = self._offset() if self._offset else None
+        return {'rows_read': self.rows_read, 'offset': offset,
+                'encoding': self.encoding, 'fieldnames': self.fieldnames}
+
+
+def _line_reader(binary, encoding, position):
+    """PositionedReader that parses CSV lines itself to track the byte offset."""
+    offset = 0
+    decode_as = encoding
+    if position:
+        offset = position['offset']
+        binary.seek(offset)
+        if encoding == 'utf-8-sig':
+            # The BOM only exists at the very start of the file
+            decode_as = 'utf-8'
+    decoder = codecs.getincrementaldecoder(decode_as)(errors=FALLBACK_ERRORS)
+    consumed = [offset]
+
+    def lines():
+        # csv pulls exactly the lines of each record, so after a row is
+        # returned consumed[0] is the offset of the next record
+        for line in iter(binary.readline, b''):
+            consumed[0] += len(line)
+            yield decoder.decode(line)
+
+    reader = csv.DictReader(lines(), fieldnames=position['fieldnames'] if position else None)
+    return PositionedReader(reader.fieldnames, reader, encoding,
+                            rows_read=position['rows_read'] if position else 0,
+                            offset=lambda: consumed[0])
+
+
+@contextmanager
+def open_export_at(path, position=None):
+    """
+    Open an export file as a PositionedReader, resuming at position (a
+    dict from PositionedReader.position() on the same file) if given.
+    """
+    encoding = position['encoding'] if position else None
+    if not is_xlsx(path):
+        if encoding is None:
+            with open(path, 'rb') as f:
+                encoding = detect_encoding(f.read(SNIFF_BYTES))
+        if encoding in _LINE_SEEKABLE_ENCODINGS and (position is None or position['offset'] is not None):
+            with open(path, 'rb') as binary:
+                yield _line_reader(binary, encoding, position)
+            return
+
+    with open_export(path, encoding=encoding) as reader:
+        skip = position['rows_read'] if position else 0
+        yield PositionedReader(reader.fieldnames, islice(reader, skip, None),
+                               reader.encoding, rows_read=skip)
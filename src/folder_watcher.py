@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Watch Folder for FUB to Sierra CSV Converter
+Polls an input directory for exports that have finished arriving, converts
+them on a bounded worker pool and archives each one. A small state file
+records what was converted so a restart never converts a file twice.
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from export_reader import SUPPORTED_EXTENSIONS
+
+# Seconds between directory scans
+POLL_INTERVAL = 2.0
+
+# A file must keep the same size and mtime for this long before it is picked up
+SETTLE_SECONDS = 2.0
+
+# Suffixes of files still being written (browser downloads, temp names renamed into place)
+PARTIAL_SUFFIXES = ('.part', '.partial', '.tmp', '.crdownload', '.download')
+
+# Number of converted-file entries remembered in the state file
+STATE_HISTORY = 1000
+
+STATE_FILENAME = '.fub_watch_state.json'
+FAILED_DIRNAME = 'failed'
+
+
+def is_candidate(name):
+    """Return True if a file name looks like a finished FUB export."""
+    lower = name.lower()
+    return (not name.startswith('.')
+            and lower.endswith(SUPPORTED_EXTENSIONS)
+            and not lower.endswith(PARTIAL_SUFFIXES))
+
+
+def file_key(path, stat=None):
+    """Identity of one version of a file: name, size and modification time."""
+    stat = stat or path.stat()
+    return f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def unique_destination(directory, name):
+    """Return a path in directory for name that does not overwrite an existing file."""
+    target = directory / name
+    if not target.exists():
+        return target
+    stem, suffix = os.path.splitext(name)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    counter = 1
+    while True:
+        target = directory / f"{stem}-{stamp}-{counter}{suffix}"
+        if not target.exists():
+            return target
+        counter += 1
+
+
+class FolderWatcher:
+    """
+    Converts exports dropped into input_dir as they finish arriving.
+
+    convert(path) runs on executor (any concurrent.futures executor) and
+    returns (output_files, total_rows). At most max_pending conversions are
+    queued at once; converted inputs move to archive_dir and inputs that
+    fail move to archive_dir/failed/ so they are not retried forever.
+    """
+
+    def __init__(self, input_dir, archive_dir, convert, executor, max_pending=2,
+                 settle_seconds=SETTLE_SECONDS, log=print):
+        self.input_dir = Path(input_dir)
+        self.archive_dir = Path(archive_dir)
+        self.failed_dir = self.archive_dir / FAILED_DIRNAME
+        self.state_path = self.archive_dir / STATE_FILENAME
+        self.convert = convert
+        self.executor = executor
+        self.max_pending = max_pending
+        self.settle_seconds = settle_seconds
+        self.log = log
+        self.pending = {}       # file name -> (path, key, future)
+        self._sightings = {}    # file name -> ((size, mtime_ns), first seen at)
+        self.processed = self._load_state()
+
+    # ---------- state ----------
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f).get('processed', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.log(f"Ignoring unreadable watch state {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self):
+        """Write the state file atomically, keeping only the newest entries."""
+        while len(self.processed) > STATE_HISTORY:
+            del self.processed[next(iter(self.processed))]
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'processed': self.processed}, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def _record(self, key, **entry):
+        self.processed[key] = dict(entry, at=time.strftime('%Y-%m-%d %H:%M:%S'))
+        self._save_state()
+
+    # ---------- scanning ----------
+
+    def scan(self, now=None):
+        """
+        Return input files that have stopped changing and are not queued.
+        A file is ready once the same size and mtime have been observed for
+        settle_seconds; files renamed into place complete on the same rule.
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        present = set()
+        for path in sorted(self.input_dir.iterdir()):
+            if not is_candidate(path.name) or not path.is_file():
+                continue
+            present.add(path.name)
+            if path.name in self.pending:
+                continue
+            stat = path.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self._sightings.get(path.name)
+            if previous is None or previous[0] != signature:
+                self._sightings[path.name] = (signature, now)
+            elif stat.st_size and now - previous[1] >= self.settle_seconds:
+                ready.append(path)
+
+        # Forget files that were removed or renamed before they settled
+        for name in list(self._sightings):
+            if name not in present:
+                del self._sightings[name]
+        return ready
+
+    def _archive(self, path, directory):
+        directory.mkdir(parents=True, exist_ok=True)
+        target = unique_destination(directory, path.name)
+        shutil.move(str(path), str(target))
+        self._sightings.pop(path.name, None)
+        return target
+
+    # ---------- conversion ----------
+
+    def poll_once(self, now=None):
+        """Collect finished conversions, then queue newly settled files."""
+        self.collect()
+        for path in self.scan(now):
+            if len(self.pending) >= self.max_pending:
+                break
+            key = file_key(path)
+            if key in self.processed:
+                # Handled before a restart but never moved out of the input folder
+                failed = self.processed[key]['status'] == 'failed'
+                self.log(f"{path.name} was already processed, archiving")
+                self._archive(path, self.failed_dir if failed else self.archive_dir)
+                continue
+            self.log(f"Converting {path.name}")
+            self.pending[path.name] = (path, key, self.executor.submit(self.convert, path))
+
+    def collect(self, wait=False):
+        """Record and archive finished conversions (all of them if wait)."""
+        for name, (path, key, future) in list(self.pending.items()):
+            if not wait and not future.done():
+                continue
+            del self.pending[name]
+            try:
+                output_files, total_rows = future.result()
+            except Exception as e:
+                self._record(key, status='failed', error=str(e))
+                target = self._archive(path, self.failed_dir)
+                self.log(f"✗ {name} failed: {e} (moved to {target})")
+                continue
+            self._record(key, status='converted', rows=total_rows,
+                         outputs=[filename for filename, _ in output_files])
+            self._archive(path, self.archive_dir)
+            self.log(f"✓ {name}: {total_rows} rows into {len(output_files)} file(s)")
+
+    def run(self, poll_interval=POLL_INTERVAL, should_stop=lambda: False):
+        """Poll until should_stop() returns True, then finish queued work."""
+        self.input_dir.mkdir(parents=True, exist_ok=True)
+        self.log(f"Watching {self.input_dir} (archive: {self.archive_dir})")
+        try:
+            while not should_stop():
+                self.poll_once()
+                time.sleep(poll_interval)
+        finally:
+            self.collect(wait=True)
@@ -4,11 +4,37 @@ FUB to Sierra CSV Converter
 Converts Follow Up Boss CSV exports to Sierra CRM-compatible format.
 """
 
+import argparse
 import csv
+import glob
+import io
+import json
+import os
 import re
+import signal
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from textwrap import shorten
 
+from address_standardizer import AddressStandardizer
+from checkpoint import ConversionCheckpoint, checkpoint_path, run_signature
+from chunk_writer import (PARTITION_COLUMNS, ChunkPieceWriter, ChunkWriter, balanced_chunk_size,
+                          join_chunk_pieces, open_chunk_writer)
+from data_profile import DataProfile
+from delta_index import DeltaFilter, DeltaIndex
+from email_normalizer import EmailNormalizer
+from export_merge import merge_exports
+from export_reader import SUPPORTED_EXTENSIONS, estimate_row_count, open_export, open_export_at
+from folder_watcher import POLL_INTERVAL, FolderWatcher
+from lead_dedup import dedupe_rows
+from memory_budget import MemoryPlan, PeakTracker
+from mmap_reader import MappedCsvReader, count_range_records, split_ranges
+from row_store import RowStore
+from zip_lookup import ZIP_INDEX_PATH, ZipEnricher, open_index
+
 # ========== CONFIGURATION ==========
 
 # Map actual FUB column names to our internal keys
@@ -95,6 +121,55 @@ OUTPUT_DIR = Path(__file__).parent.parent / 'csv_output'
 # Sierra import limit
 SIERRA_MAX_ROWS = 5000
 
+# Even out chunk sizes (5,100 rows -> 2 x 2,550) instead of filling each to the limit
+BALANCE_CHUNKS = False
+
+# Split output into one chunk series per value: None, 'Assigned Agent', 'Lead Source' or 'Tags'
+PARTITION_BY = None
+
+# Merge rows that share an email or phone into a single lead before chunking
+DEDUPE_LEADS = False
+
+# Only convert leads that are new or changed since the previous run
+DELTA_MODE = False
+DELTA_INDEX_PATH = OUTPUT_DIR / '.fub_delta_index'
+
+# Checkpoint after every full chunk so an interrupted conversion of the same
+# file resumes where it stopped (not available with DEDUPE_LEADS or PARTITION_BY)
+CHECKPOINTS = False
+
+# Fill blank City/State from the Zip Code using the offline ZIP index at
+# ZIP_INDEX_PATH (data/zip_index.bin, built with src/zip_lookup.py)
+ENRICH_ZIPS = False
+
+# Rewrite street addresses in USPS style ('123 Main Street' -> '123 MAIN ST')
+STANDARDIZE_ADDRESSES = False
+
+# Lowercase and validate emails and fix common domain typos (gmial.com);
+# invalid emails are moved into the import note
+NORMALIZE_EMAILS = True
+
+# Print fill rates, invalid phone/email counts and the most common sources,
+# agents and tags of the output after each conversion
+QUALITY_REPORT = True
+
+# Write chunk files on a background thread so slow disks overlap with conversion
+WRITE_BEHIND = True
+
+# Memory a conversion may use before it switches to streaming mode (dedup
+# keys spilled to a temporary file); None for no limit
+MEMORY_BUDGET = 1024 * 1024 * 1024
+
+# Measure each file's peak allocation with tracemalloc and print it beside
+# the estimate (slow; for calibrating the memory_budget.py per-row costs)
+TRACE_MEMORY = False
+
+# Print every converted row while processing (batch runs turn this off unless --verbose)
+VERBOSE = True
+
+# Rows between progress/ETA lines when per-row logging is off
+PROGRESS_EVERY_ROWS = 50000
+
 # ========== HELPER FUNCTIONS ==========
 
 def normalize_phone(phone_str):
@@ -137,13 +212,14 @@ def normalize_tags(tags_str):
     return '; '.join(unique)
 
 
-def build_short_summary(row):
+def build_short_summary(row, fub_cols=None):
     """
     Create a ≤128 character summary from lead source and location.
     """
-    source = row.get(FUB_COLS['source'], '').strip()
-    city = row.get(FUB_COLS['city'], '').strip()
-    state = row.get(FUB_COLS['state'], '').strip()
+    cols = FUB_COLS if fub_cols is None else fub_cols
+    source = row.get(cols.get('source', ''), '').strip()
+    city = row.get(cols.get('city', ''), '').strip()
+    state = row.get(cols.get('state', ''), '').strip()
     
     parts = []
     if source:
@@ -156,12 +232,22 @@ def build_short_summary(row):
     return shorten(summary, width=128, placeholder='...')
 
 
-def build_import_note(row):
+# Sierra columns build_short_summary reads when a stage rebuilds the summary
+SIERRA_SUMMARY_COLS = {'source': 'Lead Source', 'city': 'City', 'state': 'State'}
+
+
+def rebuild_short_summary(sierra_row):
+    """Build the Short Summary again from a (possibly enriched) Sierra row."""
+    return build_short_summary(sierra_row, SIERRA_SUMMARY_COLS)
+
+
+def build_import_note(row, fub_cols=None):
     """
     Combine search criteria and notes into import note field.
     """
-    criteria = row.get(FUB_COLS['search_criteria'], '').strip()
-    notes = row.get(FUB_COLS['notes'], '').strip()
+    cols = FUB_COLS if fub_cols is None else fub_cols
+    criteria = row.get(cols.get('search_criteria', ''), '').strip()
+    notes = row.get(cols.get('notes', ''), '').strip()
     
     parts = []
     if criteria:
@@ -172,12 +258,14 @@ def build_import_note(row):
     return '\n\n'.join(parts)
 
 
-def convert_row(fub_row):
+def convert_row(fub_row, fub_cols=None):
     """
     Convert a single FUB row dict to Sierra format dict.
+    fub_cols overrides the configured FUB_COLS (e.g. per-file merge mappings).
     """
-    first = fub_row.get(FUB_COLS['first_name'], '').strip()
-    last = fub_row.get(FUB_COLS['last_name'], '').strip()
+    cols = FUB_COLS if fub_cols is None else fub_cols
+    first = fub_row.get(cols.get('first_name', ''), '').strip()
+    last = fub_row.get(cols.get('last_name', ''), '').strip()
     
     # Build full name
     full_name = ' '.join(filter(None, [first, last]))
@@ -186,49 +274,118 @@ def convert_row(fub_row):
         'First Name': first,
         'Last Name': last,
         'Full Name': full_name,
-        'Email': fub_row.get(FUB_COLS['email'], '').strip(),
-        'Secondary Email': fub_row.get(FUB_COLS['secondary_email'], '').strip(),
-        'Phone': normalize_phone(fub_row.get(FUB_COLS['phone'], '')),
-        'Secondary Phone': normalize_phone(fub_row.get(FUB_COLS['secondary_phone'], '')),
-        'Lead Source': fub_row.get(FUB_COLS['source'], '').strip(),
-        'Assigned Agent': fub_row.get(FUB_COLS['assigned_to'], '').strip(),
-        'Street Address': fub_row.get(FUB_COLS['street'], '').strip(),
-        'City': fub_row.get(FUB_COLS['city'], '').strip(),
-        'State': fub_row.get(FUB_COLS['state'], '').strip(),
-        'Zip Code': fub_row.get(FUB_COLS['zip'], '').strip(),
-        'Tags': normalize_tags(fub_row.get(FUB_COLS['tags'], '')),
-        'Short Summary': build_short_summary(fub_row),
-        'Add to Import Note': build_import_note(fub_row),
+        'Email': fub_row.get(cols.get('email', ''), '').strip(),
+        'Secondary Email': fub_row.get(cols.get('secondary_email', ''), '').strip(),
+        'Phone': normalize_phone(fub_row.get(cols.get('phone', ''), '')),
+        'Secondary Phone': normalize_phone(fub_row.get(cols.get('secondary_phone', ''), '')),
+        'Lead Source': fub_row.get(cols.get('source', ''), '').strip(),
+        'Assigned Agent': fub_row.get(cols.get('assigned_to', ''), '').strip(),
+        'Street Address': fub_row.get(cols.get('street', ''), '').strip(),
+        'City': fub_row.get(cols.get('city', ''), '').strip(),
+        'State': fub_row.get(cols.get('state', ''), '').strip(),
+        'Zip Code': fub_row.get(cols.get('zip', ''), '').strip(),
+        'Tags': normalize_tags(fub_row.get(cols.get('tags', ''), '')),
+        'Short Summary': build_short_summary(fub_row, cols),
+        'Add to Import Note': build_import_note(fub_row, cols),
     }
 
 
 # ========== MAIN CONVERSION ==========
 
-def convert_fub_to_sierra(input_path, output_path):
+def convert_fub_to_sierra(input_path, output_path, row_filter=None):
     """
     Read FUB CSV, convert all rows, write Sierra CSV.
-    Returns list of sierra rows for potential chunking.
+    Rows for which row_filter(fub_row) is falsy are skipped before conversion.
+    Returns the sierra rows as a compact RowStore for potential chunking.
     """
-    with open(input_path, 'r', encoding='utf-8-sig') as infile:
-        reader = csv.DictReader(infile)
+    rows = RowStore(SIERRA_COLS)
+    rows.extend(iter_sierra_rows(input_path, row_filter, verbose=True))
+    return rows
+
+
+def iter_sierra_rows(input_path, row_filter=None, verbose=False, progress=False):
+    """
+    Stream converted Sierra rows from a FUB CSV, logging each row if verbose.
+    Each call re-reads the file, so it can back multi-pass stages like dedup.
+    """
+    with open_export(input_path) as reader:
+        yield from convert_rows(reader, row_filter, verbose, progress=progress)
+
+
+def print_progress(row_num, done, started):
+    """Print rows converted so far with the share of the file read and an ETA."""
+    elapsed = time.monotonic() - started
+    eta = f", about {elapsed * (1 - done) / done:.0f}s left" if done else ''
+    print(f"  {row_num:,} rows ({done:.0%}{eta})")
+
+
+def convert_rows(reader, row_filter=None, verbose=False, row_num=0, progress=False):
+    """
+    Convert the FUB row dicts from an open export reader.
+    row_num is the number of rows already consumed (for resumed runs' logs).
+    With progress, readers that know how far they are (memory-mapped CSV)
+    get a progress/ETA line every PROGRESS_EVERY_ROWS rows.
+    """
+    if verbose and reader.encoding not in ('utf-8', 'utf-8-sig', 'xlsx'):
+        print(f"  Detected encoding: {reader.encoding} (converting to UTF-8)")
+    
+    progress = progress and hasattr(reader, 'progress')
+    started = time.monotonic()
+    for fub_row in reader:
+        row_num += 1
+        if progress and row_num % PROGRESS_EVERY_ROWS == 0:
+            print_progress(row_num, reader.progress(), started)
+        if row_filter and not row_filter(fub_row):
+            continue
+        sierra_row = convert_row(fub_row)
         
-        sierra_rows = []
-        row_num = 0
-        for fub_row in reader:
-            row_num += 1
-            sierra_row = convert_row(fub_row)
-            sierra_rows.append(sierra_row)
-            
-            # Log progress every row
+        # Log progress every row
+        if verbose:
             name = sierra_row['Full Name'] or '(No Name)'
             email = sierra_row['Email'] or '(No Email)'
             print(f"  Row {row_num}: {name} - {email}")
-    
+        
+        yield sierra_row
+
+
+def output_stages():
+    """
+    Return the configured row stages (ZIP enrichment, address standardization,
+    quality profile, email normalization) for one conversion. Each has apply(row), wrap(rows), merge(other) and
+    summary_lines(), and rows pass through them in order.
+    """
+    stages = []
+    if ENRICH_ZIPS:
+        stages.append(ZipEnricher(open_index(ZIP_INDEX_PATH), rebuild_short_summary))
+    if STANDARDIZE_ADDRESSES:
+        stages.append(AddressStandardizer())
+    if QUALITY_REPORT:
+        # Profiled before normalizing, so rejected emails count as invalid, not missing
+        stages.append(DataProfile(SIERRA_COLS))
+    if NORMALIZE_EMAILS:
+        stages.append(EmailNormalizer())
+    return stages
+
+
+def apply_stages(sierra_rows, stages):
+    """Stream rows through each stage."""
+    for stage in stages:
+        sierra_rows = stage.wrap(sierra_rows)
     return sierra_rows
 
 
+def print_stage_reports(stages, file=None):
+    """Print each stage's summary under the file's conversion output."""
+    for stage in stages:
+        for line in stage.summary_lines():
+            print(f"  {line}", file=file)
+
+
 def write_sierra_csv(output_path, sierra_rows):
     """Write Sierra rows to CSV file."""
+    if isinstance(sierra_rows, RowStore):
+        sierra_rows.write_csv(output_path)
+        return
     with open(output_path, 'w', encoding='utf-8', newline='') as outfile:
         writer = csv.DictWriter(outfile, fieldnames=SIERRA_COLS)
         writer.writeheader()
@@ -238,36 +395,190 @@ def write_sierra_csv(output_path, sierra_rows):
 def process_file_with_chunks(input_path):
     """
     Process a FUB CSV file and split into 5,000-row chunks for Sierra import.
+    Rows are streamed straight into the chunk files; BALANCE_CHUNKS and
+    PARTITION_BY pick balanced or per-agent/source/tag chunk series.
     Returns list of (output_filename, row_count) tuples.
     """
-    # Convert all rows
-    sierra_rows = convert_fub_to_sierra(input_path, None)
-    total_rows = len(sierra_rows)
+    if CHECKPOINTS and not (DEDUPE_LEADS or PARTITION_BY):
+        return process_file_resumable(input_path)
     
-    # Calculate number of chunks needed
-    num_chunks = (total_rows + SIERRA_MAX_ROWS - 1) // SIERRA_MAX_ROWS  # Ceiling division
+    delta = DeltaFilter(DeltaIndex.load(DELTA_INDEX_PATH), FUB_COLS) if DELTA_MODE else None
     
-    output_files = []
+    # Rows are printed, never kept, so only dedup's key index grows with the file
+    plan = None
+    if DEDUPE_LEADS or BALANCE_CHUNKS or TRACE_MEMORY:
+        plan = MemoryPlan(input_path, MEMORY_BUDGET, dedupe=DEDUPE_LEADS, row_logs=False)
+        if plan.streaming:
+            print(f"  {plan.summary_line()}")
     
-    if num_chunks == 1:
-        # Single file, no chunking needed
-        output_filename = f"{input_path.stem}-sierra.csv"
-        output_path = OUTPUT_DIR / output_filename
-        write_sierra_csv(output_path, sierra_rows)
-        output_files.append((output_filename, total_rows))
+    # Convert all rows
+    if DEDUPE_LEADS:
+        # The first pass records delta fingerprints; the second only re-checks them
+        passes = iter([(delta, VERBOSE, not VERBOSE), (delta and delta.check, False, False)])
+        dedupe_stats = {}
+        sierra_rows = dedupe_rows(lambda: iter_sierra_rows(input_path, *next(passes)),
+                                  dedupe_stats, spill=plan.streaming)
     else:
-        # Multiple chunks needed
-        for chunk_num in range(num_chunks):
-            start_idx = chunk_num * SIERRA_MAX_ROWS
-            end_idx = min(start_idx + SIERRA_MAX_ROWS, total_rows)
-            chunk_rows = sierra_rows[start_idx:end_idx]
-            
-            output_filename = f"{input_path.stem}-sierra-chunk{chunk_num + 1}.csv"
-            output_path = OUTPUT_DIR / output_filename
-            write_sierra_csv(output_path, chunk_rows)
-            output_files.append((output_filename, len(chunk_rows)))
+        sierra_rows = iter_sierra_rows(input_path, delta, verbose=VERBOSE, progress=not VERBOSE)
+    stages = output_stages()
+    sierra_rows = apply_stages(sierra_rows, stages)
+    
+    expected_rows = plan.rows if BALANCE_CHUNKS else None
+    with PeakTracker(TRACE_MEMORY) as tracker, \
+            open_chunk_writer(OUTPUT_DIR, input_path.stem, SIERRA_COLS, SIERRA_MAX_ROWS,
+                              balance=BALANCE_CHUNKS, expected_rows=expected_rows,
+                              partition_by=PARTITION_BY, write_behind=WRITE_BEHIND) as writer:
+        writer.write_rows(sierra_rows)
+    
+    if DEDUPE_LEADS:
+        print(f"  Merged {dedupe_stats['merged_rows']} duplicate rows "
+              f"({dedupe_stats['input_rows']} rows → {dedupe_stats['output_rows']} leads)")
+    if delta:
+        print(f"  Delta: {delta.stats['new']} new, {delta.stats['changed']} changed, "
+              f"{delta.stats['unchanged']} unchanged rows skipped")
+        # Only remember this run once its chunks are safely on disk
+        delta.save(DELTA_INDEX_PATH)
+    print_stage_reports(stages)
+    if tracker.peak is not None:
+        print(f"  {tracker.summary_line(plan)}")
+    
+    return writer.files, writer.total_rows
+
+
+def process_file_resumable(input_path):
+    """
+    Chunked conversion that checkpoints after every full chunk.
+    If an earlier run of the same file with the same settings was
+    interrupted, conversion resumes after its last completed chunk and the
+    output matches an uninterrupted run. Returns like process_file_with_chunks.
+    """
+    delta = DeltaFilter(DeltaIndex.load(DELTA_INDEX_PATH), FUB_COLS) if DELTA_MODE else None
+    
+    settings = {name: globals()[name] for name in ('FUB_COLS', 'SIERRA_MAX_ROWS', 'BALANCE_CHUNKS')}
+    if delta:
+        # Resuming against a different previous index would change which rows are output
+        index_stat = DELTA_INDEX_PATH.stat() if DELTA_INDEX_PATH.exists() else None
+        settings['delta_index'] = index_stat and (index_stat.st_size, index_stat.st_mtime_ns)
+    checkpoint = ConversionCheckpoint.load(checkpoint_path(OUTPUT_DIR, input_path),
+                                           run_signature(input_path, settings))
+    if checkpoint.resumed:
+        print(f"  Resuming after row {checkpoint.position['rows_read']} "
+              f"({len(checkpoint.files)} chunk(s), {checkpoint.rows_emitted} rows already written)")
+        if delta:
+            checkpoint.restore_delta(delta)
+    
+    max_rows = SIERRA_MAX_ROWS
+    if BALANCE_CHUNKS:
+        max_rows = balanced_chunk_size(estimate_row_count(input_path), SIERRA_MAX_ROWS)
+    
+    # A resumed run's stages start from the counts saved with the checkpoint,
+    # so the reports cover the whole file
+    stages = output_stages()
+    checkpoint.restore_stages(stages)
+    with open_export_at(input_path, checkpoint.position) as reader:
+        sierra_rows = apply_stages(convert_rows(reader, delta, VERBOSE, reader.rows_read), stages)
+        
+        def save_checkpoint(files):
+            checkpoint.save(reader.position(), files, delta, stages)
+        
+        with ChunkWriter(OUTPUT_DIR, input_path.stem, SIERRA_COLS, max_rows,
+                         completed=checkpoint.files, on_chunk_complete=save_checkpoint) as writer:
+            writer.write_rows(sierra_rows)
+    
+    if delta:
+        print(f"  Delta: {delta.stats['new']} new, {delta.stats['changed']} changed, "
+              f"{delta.stats['unchanged']} unchanged rows skipped")
+        delta.save(DELTA_INDEX_PATH)
+    checkpoint.clear()
+    print_stage_reports(stages)
+    
+    return writer.files, writer.total_rows
+
+
+def can_convert_in_parallel(input_path):
+    """
+    Return True if a file can be split into byte ranges and converted by
+    several workers: a memory-mappable CSV with no whole-file stage
+    (dedupe, delta, partitions or checkpoints) in the way.
+    """
+    if DEDUPE_LEADS or DELTA_MODE or PARTITION_BY or CHECKPOINTS:
+        return False
+    try:
+        MappedCsvReader(input_path).close()
+    except ValueError:
+        return False
+    return True
+
+
+def _convert_range(input_path, start, end, first_row, max_rows, piece_dir, name):
+    """Worker: convert one byte range into chunk piece files; returns them and its row stages."""
+    stages = output_stages()
+    with MappedCsvReader(input_path, start, end) as reader:
+        with ChunkPieceWriter(piece_dir, name, SIERRA_COLS, max_rows, first_row) as writer:
+            writer.write_rows(apply_stages(convert_rows(reader), stages))
+    return writer.pieces, stages
+
+
+def process_file_parallel(input_path, workers):
+    """
+    Convert one large CSV with several worker processes.
+    The file is split into byte ranges on record boundaries, each range's
+    row count comes from the pre-scan, and workers write straight into the
+    pieces of the chunks their rows belong to. The pieces are then joined,
+    giving the same chunk files as process_file_with_chunks.
+    """
+    ranges = split_ranges(input_path, workers)
+    counts = count_range_records(input_path, ranges)
+    max_rows = SIERRA_MAX_ROWS
+    if BALANCE_CHUNKS:
+        max_rows = balanced_chunk_size(sum(counts), SIERRA_MAX_ROWS)
     
-    return output_files, total_rows
+    first_rows = [sum(counts[:i]) for i in range(len(counts))]
+    settings = {name: globals()[name] for name in _CLI_SETTINGS}
+    with tempfile.TemporaryDirectory(dir=OUTPUT_DIR) as piece_dir:
+        with ProcessPoolExecutor(max_workers=workers, initializer=apply_settings,
+                                 initargs=(settings,)) as pool:
+            futures = [pool.submit(_convert_range, input_path, start, end, first_row,
+                                   max_rows, piece_dir, f"range{i}")
+                       for i, ((start, end), first_row) in enumerate(zip(ranges, first_rows))]
+            results = [future.result() for future in futures]
+        pieces = [piece for range_pieces, _ in results for piece in range_pieces]
+        files = join_chunk_pieces(OUTPUT_DIR, input_path.stem, SIERRA_COLS, pieces)
+    
+    stages = output_stages()
+    for _, range_stages in results:
+        for stage, range_stage in zip(stages, range_stages):
+            stage.merge(range_stage)
+    print_stage_reports(stages)
+    
+    return files, sum(rows for _, rows in files)
+
+
+def merge_files_with_chunks(input_paths, base_name='merged'):
+    """
+    Merge several FUB CSV exports into one continuous set of full Sierra chunks.
+    Each file's headers are reconciled against FUB_COLS independently and
+    rows are streamed, so no file is ever fully loaded into memory.
+    Returns list of (output_filename, row_count) tuples and the total rows.
+    """
+    max_rows = SIERRA_MAX_ROWS
+    if BALANCE_CHUNKS:
+        max_rows = balanced_chunk_size(sum(estimate_row_count(p) or 0 for p in input_paths),
+                                       SIERRA_MAX_ROWS)
+    stages = output_stages()
+    
+    def convert(fub_row, cols):
+        sierra_row = convert_row(fub_row, cols)
+        for stage in stages:
+            sierra_row = stage.apply(sierra_row)
+        return sierra_row
+    
+    result = merge_exports(
+        input_paths, OUTPUT_DIR, base_name, FUB_COLS, convert, SIERRA_COLS,
+        max_rows=max_rows, log_callback=lambda msg: print(f"  {msg}"),
+    )
+    print_stage_reports(stages)
+    return result
 
 
 def main():
@@ -279,26 +590,33 @@ def main():
     INPUT_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Find all CSV files
-    csv_files = list(INPUT_DIR.glob('*.csv'))
+    # Find all CSV and Excel exports
+    csv_files = sorted(p for p in INPUT_DIR.iterdir()
+                       if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS)
     
     if not csv_files:
-        print(f"No CSV files found in {INPUT_DIR}")
+        print(f"No CSV or .xlsx files found in {INPUT_DIR}")
         print("Please add Follow Up Boss CSV exports to the csv_input/ folder.")
         return
     
-    print(f"Found {len(csv_files)} CSV file(s):\n")
+    print(f"Found {len(csv_files)} export file(s):\n")
     
     # List files with numbers
     for idx, file_path in enumerate(csv_files, 1):
         print(f"  {idx}. {file_path.name}")
     
     print(f"\n  0. Process ALL files")
+    print(f"  M. Merge ALL files into one Sierra output set")
     
     # Get user choice
     while True:
         try:
-            choice = input(f"\nSelect file to process (0-{len(csv_files)}): ").strip()
+            choice = input(f"\nSelect file to process (0-{len(csv_files)} or M): ").strip()
+            
+            if choice.lower() == 'm':
+                files_to_process = None
+                break
+            
             choice_num = int(choice)
             
             if choice_num == 0:
@@ -317,6 +635,19 @@ def main():
             print("\n\nCancelled by user.")
             return
     
+    if files_to_process is None:
+        # Merge all files into one continuous chunk sequence
+        print(f"\nMerging {len(csv_files)} file(s)...\n")
+        try:
+            output_files, total_rows = merge_files_with_chunks(csv_files)
+            print(f"\n✓ Merged {total_rows} rows from {len(csv_files)} files into {len(output_files)} file(s):")
+            for filename, count in output_files:
+                print(f"  - {filename}: {count} rows")
+        except Exception as e:
+            print(f"✗ Error merging files: {e}")
+        print(f"\nOutput files saved to: {OUTPUT_DIR}")
+        return
+    
     print(f"\nProcessing {len(files_to_process)} file(s)...\n")
     
     # Process selected file(s)
@@ -343,5 +674,337 @@ def main():
     print(f"\nOutput files saved to: {OUTPUT_DIR}")
 
 
+# ========== COMMAND LINE ==========
+
+# Exit codes for scripted runs
+EXIT_OK = 0
+EXIT_FAILED = 1     # at least one file failed to convert
+EXIT_USAGE = 2      # bad arguments, unreadable mapping file or ZIP index
+EXIT_NO_INPUT = 3   # no CSV or .xlsx files matched the inputs
+
+# Module settings the command line can override (copied into worker processes)
+_CLI_SETTINGS = ('FUB_COLS', 'OUTPUT_DIR', 'SIERRA_MAX_ROWS', 'BALANCE_CHUNKS', 'PARTITION_BY',
+                 'DEDUPE_LEADS', 'DELTA_MODE', 'DELTA_INDEX_PATH', 'CHECKPOINTS', 'ENRICH_ZIPS',
+                 'ZIP_INDEX_PATH', 'STANDARDIZE_ADDRESSES', 'NORMALIZE_EMAILS', 'QUALITY_REPORT',
+                 'WRITE_BEHIND', 'MEMORY_BUDGET', 'TRACE_MEMORY', 'VERBOSE')
+
+
+def build_arg_parser():
+    """Build the argument parser for non-interactive runs."""
+    parser = argparse.ArgumentParser(
+        prog='fub_to_sierra.py',
+        description="Convert Follow Up Boss exports to Sierra CSV imports. "
+                    "Run without arguments for the interactive menu.",
+        epilog="Use '-' as the only input to read a FUB CSV from stdin and "
+               "write one Sierra CSV to stdout (no chunking).",
+    )
+    parser.add_argument('inputs', nargs='*', metavar='INPUT',
+                        help="export files, directories or glob patterns "
+                             "(default: every export in csv_input/)")
+    parser.add_argument('-o', '--output-dir', type=Path, default=OUTPUT_DIR,
+                        help="directory for Sierra CSV files (default: csv_output/)")
+    parser.add_argument('-n', '--chunk-size', type=int, default=SIERRA_MAX_ROWS,
+                        help=f"rows per output file, at most {SIERRA_MAX_ROWS}")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="files to convert in parallel (default: 1)")
+    parser.add_argument('-m', '--mapping', type=Path,
+                        help="JSON file mapping FUB_COLS keys to export headers; "
+                             "keys not given keep their defaults")
+    parser.add_argument('--merge', action='store_true',
+                        help="merge all inputs into one 'merged' Sierra output set")
+    parser.add_argument('--balance', action='store_true',
+                        help="even out chunk sizes instead of filling each chunk")
+    parser.add_argument('--partition-by', choices=PARTITION_COLUMNS,
+                        help="write one chunk series per value of this column")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="merge rows sharing an email or phone into one lead")
+    parser.add_argument('--delta', action='store_true',
+                        help="only convert leads new or changed since the last delta run")
+    parser.add_argument('--delta-index', type=Path,
+                        help="fingerprint index for --delta (default: OUTPUT_DIR/.fub_delta_index)")
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="checkpoint every full chunk and resume an interrupted run of "
+                             "the same file (not with --dedupe or --partition-by)")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running and convert exports as they land in the input "
+                             "directory (default: csv_input/)")
+    parser.add_argument('--archive-dir', type=Path,
+                        help="where --watch moves converted inputs (default: INPUT/processed)")
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL,
+                        help=f"seconds between --watch scans (default: {POLL_INTERVAL:g})")
+    parser.add_argument('--enrich-zips', action='store_true',
+                        help="fill blank city and state from the zip code (needs a ZIP index)")
+    parser.add_argument('--zip-index', type=Path, default=ZIP_INDEX_PATH,
+                        help="ZIP index built with src/zip_lookup.py (default: data/zip_index.bin)")
+    parser.add_argument('--standardize-addresses', action='store_true',
+                        help="rewrite street addresses in USPS style (123 Main Street -> 123 MAIN ST)")
+    parser.add_argument('--keep-emails', action='store_true',
+                        help="pass emails through as exported (no lowercasing, typo fixes "
+                             "or rejection of invalid addresses)")
+    parser.add_argument('--no-quality-report', action='store_true',
+                        help="skip the data quality summary printed after each file")
+    parser.add_argument('--no-write-behind', action='store_true',
+                        help="write chunk files on the converting thread instead of a "
+                             "background writer")
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        default=(MEMORY_BUDGET or 0) / (1024 * 1024),
+                        help="switch to streaming mode (dedup keys on disk) for files estimated "
+                             "to need more memory than this; 0 for no limit (default: %(default)g)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="measure each file's peak allocation with tracemalloc (slow)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="print every converted row")
+    return parser
+
+
+def load_mapping(path):
+    """
+    Read a column mapping file and return FUB_COLS with its overrides applied.
+    Raises ValueError if the file is not a JSON object of strings.
+    """
+    with open(path, encoding='utf-8') as f:
+        mapping = json.load(f)
+    if not isinstance(mapping, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()):
+        raise ValueError("mapping must be a JSON object of column names")
+    return {**FUB_COLS, **mapping}
+
+
+def resolve_inputs(patterns):
+    """
+    Expand files, directories and glob patterns into a sorted, de-duplicated
+    list of supported export paths. Patterns that match nothing are returned
+    separately so the caller can report them.
+    """
+    found = {}
+    unmatched = []
+    for pattern in patterns:
+        matches = [Path(m) for m in sorted(glob.glob(pattern, recursive=True))]
+        paths = []
+        for match in matches:
+            if match.is_dir():
+                paths.extend(sorted(p for p in match.iterdir() if p.is_file()))
+            else:
+                paths.append(match)
+        paths = [p for p in paths if p.suffix.lower() in SUPPORTED_EXTENSIONS]
+        if not paths:
+            unmatched.append(pattern)
+        for path in paths:
+            found.setdefault(path.resolve(), path)
+    return list(found.values()), unmatched
+
+
+def apply_settings(settings):
+    """Apply command-line settings to the module config (also runs in worker processes)."""
+    globals().update(settings)
+
+
+def _convert_in_worker(input_path):
+    """Worker entry point; returns what process_file_with_chunks returns."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    return process_file_with_chunks(input_path)
+
+
+def run_filter(stdin=None, stdout=None):
+    """
+    Stream one FUB CSV from stdin to a single Sierra CSV on stdout.
+    Messages go to stderr so the output can be piped on.
+    """
+    stdin = stdin if stdin is not None else sys.stdin.buffer
+    stdout = stdout if stdout is not None else sys.stdout.buffer
+    delta = DeltaFilter(DeltaIndex.load(DELTA_INDEX_PATH), FUB_COLS) if DELTA_MODE else None
+
+    out = io.TextIOWrapper(stdout, encoding='utf-8', newline='', write_through=True)
+    writer = csv.DictWriter(out, fieldnames=SIERRA_COLS)
+    stages = output_stages()
+    total = 0
+    try:
+        writer.writeheader()
+        for sierra_row in apply_stages(iter_sierra_rows(stdin, delta), stages):
+            writer.writerow(sierra_row)
+            total += 1
+        out.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); that is not a conversion failure.
+        # Point stdout at devnull so the final flush at exit does not raise again.
+        if stdout is sys.stdout.buffer:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    finally:
+        out.detach()
+
+    if delta:
+        delta.save(DELTA_INDEX_PATH)
+    print(f"Converted {total} rows", file=sys.stderr)
+    print_stage_reports(stages, file=sys.stderr)
+    return EXIT_OK
+
+
+def run_batch(input_paths, merge=False, workers=1):
+    """Convert the given exports without prompting. Returns an exit code."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    if merge:
+        try:
+            output_files, total_rows = merge_files_with_chunks(input_paths)
+        except Exception as e:
+            print(f"✗ Error merging files: {e}", file=sys.stderr)
+            return EXIT_FAILED
+        print(f"✓ Merged {total_rows} rows from {len(input_paths)} files "
+              f"into {len(output_files)} file(s)")
+        for filename, count in output_files:
+            print(f"  - {filename}: {count} rows")
+        return EXIT_OK
+
+    failed = 0
+
+    def report(input_path, result):
+        output_files, total_rows = result
+        print(f"✓ {input_path.name}: {total_rows} rows into {len(output_files)} file(s)")
+        for filename, count in output_files:
+            print(f"  - {filename}: {count} rows")
+
+    if workers > 1 and len(input_paths) == 1 and can_convert_in_parallel(input_paths[0]):
+        # One big file: split it into ranges instead of converting files side by side
+        input_path = input_paths[0]
+        try:
+            report(input_path, process_file_parallel(input_path, workers))
+        except Exception as e:
+            failed += 1
+            print(f"✗ Error processing '{input_path.name}': {e}", file=sys.stderr)
+    elif workers > 1 and len(input_paths) > 1:
+        settings = {name: globals()[name] for name in _CLI_SETTINGS}
+        with ProcessPoolExecutor(max_workers=workers, initializer=apply_settings,
+                                 initargs=(settings,)) as pool:
+            futures = [(p, pool.submit(_convert_in_worker, p)) for p in input_paths]
+            for input_path, future in futures:
+                try:
+                    report(input_path, future.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"✗ Error processing '{input_path.name}': {e}", file=sys.stderr)
+    else:
+        for input_path in input_paths:
+            if VERBOSE:
+                print(f"Processing: {input_path.name}")
+            try:
+                report(input_path, process_file_with_chunks(input_path))
+            except Exception as e:
+                failed += 1
+                print(f"✗ Error processing '{input_path.name}': {e}", file=sys.stderr)
+
+    print(f"Output files saved to: {OUTPUT_DIR}")
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def run_watch(input_dir, archive_dir, workers=1, poll_interval=POLL_INTERVAL):
+    """
+    Convert exports as they arrive in input_dir until interrupted or sent
+    SIGTERM. Queued conversions finish before the process exits.
+    """
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    stop = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.append(signum))
+
+    settings = {name: globals()[name] for name in _CLI_SETTINGS}
+    with ProcessPoolExecutor(max_workers=workers, initializer=apply_settings,
+                             initargs=(settings,)) as pool:
+        watcher = FolderWatcher(input_dir, archive_dir, _convert_in_worker, pool,
+                                max_pending=workers * 2)
+        try:
+            watcher.run(poll_interval, should_stop=lambda: bool(stop))
+        except KeyboardInterrupt:
+            print("\nStopping watch.")
+    return EXIT_OK
+
+
+def cli(argv=None):
+    """
+    Entry point. With no arguments the interactive menu runs; otherwise the
+    arguments select a batch conversion or the stdin/stdout filter.
+    Returns a process exit code.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        main()
+        return EXIT_OK
+
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    filter_mode = '-' in args.inputs
+
+    if filter_mode and len(args.inputs) > 1:
+        parser.error("'-' (stdin) cannot be combined with other inputs")
+    if not 1 <= args.chunk_size <= SIERRA_MAX_ROWS:
+        parser.error(f"--chunk-size must be between 1 and {SIERRA_MAX_ROWS}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.delta and args.workers > 1:
+        parser.error("--delta shares one index across files and needs --workers 1")
+    if filter_mode and (args.merge or args.balance or args.partition_by or args.dedupe):
+        parser.error("stdin mode writes a single stream; --merge, --balance, "
+                     "--partition-by and --dedupe need file inputs")
+    if args.watch and (filter_mode or args.merge or len(args.inputs) > 1
+                       or (args.inputs and not Path(args.inputs[0]).is_dir())):
+        parser.error("--watch takes a single input directory and cannot be combined with --merge")
+    if args.merge and (args.dedupe or args.delta or args.partition_by or args.workers > 1):
+        parser.error("--merge writes one combined chunk series in a single pass and cannot be "
+                     "combined with --dedupe, --delta, --partition-by or --workers")
+    if args.checkpoint and (args.dedupe or args.partition_by or filter_mode or args.merge):
+        parser.error("--checkpoint cannot be combined with --dedupe, --partition-by, --merge or stdin")
+    if args.poll_interval <= 0:
+        parser.error("--poll-interval must be positive")
+    if args.memory_budget < 0:
+        parser.error("--memory-budget cannot be negative")
+
+    settings = {
+        'OUTPUT_DIR': args.output_dir,
+        'SIERRA_MAX_ROWS': args.chunk_size,
+        'BALANCE_CHUNKS': args.balance,
+        'PARTITION_BY': args.partition_by,
+        'DEDUPE_LEADS': args.dedupe,
+        'DELTA_MODE': args.delta,
+        'DELTA_INDEX_PATH': args.delta_index or args.output_dir / '.fub_delta_index',
+        'CHECKPOINTS': args.checkpoint,
+        'ENRICH_ZIPS': args.enrich_zips,
+        'ZIP_INDEX_PATH': args.zip_index,
+        'STANDARDIZE_ADDRESSES': args.standardize_addresses,
+        'NORMALIZE_EMAILS': not args.keep_emails,
+        'QUALITY_REPORT': not args.no_quality_report,
+        'WRITE_BEHIND': not args.no_write_behind,
+        'MEMORY_BUDGET': int(args.memory_budget * 1024 * 1024) or None,
+        'TRACE_MEMORY': args.trace_memory,
+        'VERBOSE': args.verbose,
+    }
+    if args.mapping:
+        try:
+            settings['FUB_COLS'] = load_mapping(args.mapping)
+        except (OSError, ValueError) as e:
+            print(f"✗ Cannot read mapping file '{args.mapping}': {e}", file=sys.stderr)
+            return EXIT_USAGE
+    if args.enrich_zips:
+        try:
+            open_index(args.zip_index)
+        except (OSError, ValueError) as e:
+            print(f"✗ Cannot open ZIP index '{args.zip_index}': {e}", file=sys.stderr)
+            return EXIT_USAGE
+    apply_settings(settings)
+
+    if filter_mode:
+        return run_filter()
+
+    if args.watch:
+        watch_dir = Path(args.inputs[0]) if args.inputs else INPUT_DIR
+        archive_dir = args.archive_dir or watch_dir / 'processed'
+        return run_watch(watch_dir, archive_dir, args.workers, args.poll_interval)
+
+    input_paths, unmatched = resolve_inputs(args.inputs or [str(INPUT_DIR)])
+    for pattern in unmatched:
+        print(f"✗ No CSV or .xlsx files match '{pattern}'", file=sys.stderr)
+    if not input_paths:
+        return EXIT_NO_INPUT
+    return run_batch(input_paths, merge=args.merge, workers=args.workers)
+
+
 if __name__ == '__main__':
-    main()
+    sys.exit(cli())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Duplicate Lead Consolidation for FUB to Sierra CSV Converter
+Links Sierra rows that share any normalized email or phone and merges each
+connected group into a single lead before import.
+"""
+
+import os
+import re
+import tempfile
+from array import array
+
+from email_normalizer import normalize_email
+from row_store import RowStore
+
+# Sierra columns used to link rows belonging to the same person
+EMAIL_KEYS = ('Email', 'Secondary Email')
+PHONE_KEYS = ('Phone', 'Secondary Phone')
+
+# Separator used when concatenating import notes from merged rows
+NOTE_SEPARATOR = '\n\n'
+
+_NON_DIGIT = re.compile(r'\D')
+
+
+# ========== KEY NORMALIZATION ==========
+
+def email_key(value):
+    """
+    Return a case-insensitive match key for an email, or '' if blank.
+    Domain typos are corrected so jane@gmial.com links with jane@gmail.com.
+    """
+    if not value:
+        return ''
+    email, _ = normalize_email(str(value))
+    return email or str(value).strip().lower()
+
+
+def phone_key(value):
+    """
+    Return the last 10 digits of a phone as its match key.
+    Numbers with fewer than 7 digits are too ambiguous to link on.
+    """
+    if not value:
+        return ''
+    digits = _NON_DIGIT.sub('', str(value))
+    if len(digits) < 7:
+        return ''
+    return digits[-10:]
+
+
+def row_keys(row):
+    """
+    Yield hashed match keys for a Sierra row.
+    Keys are prefixed by kind so an email can never collide with a phone.
+    Hashing keeps the index at one int per key instead of one string.
+    """
+    for col in EMAIL_KEYS:
+        key = email_key(row.get(col))
+        if key:
+            yield hash('e:' + key)
+    for col in PHONE_KEYS:
+        key = phone_key(row.get(col))
+        if key:
+            yield hash('p:' + key)
+
+
+# ========== UNION-FIND ==========
+
+class UnionFind:
+    """
+    Array-backed disjoint set over row indexes.
+    Uses union by size and path halving, so a full pass over n rows runs in
+    near-linear time while storing only two machine ints per row.
+    """
+
+    def __init__(self):
+        self.parent = array('l')
+        self.size = array('l')
+
+    def add(self):
+        """Register a new singleton element and return its index."""
+        idx = len(self.parent)
+        self.parent.append(idx)
+        self.size.append(1)
+        return idx
+
+    def find(self, idx):
+        """Return the root of idx, halving the path as it goes."""
+        parent = self.parent
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    def union(self, a, b):
+        """Merge the sets containing a and b and return the new root."""
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def __len__(self):
+        return len(self.parent)
+
+
+class DiskKeyIndex:
+    """
+    Match key -> first row index map kept in a temporary SQLite file, for
+    inputs whose in-memory key index would not fit the memory budget.
+    Supports the one dict operation link_rows() needs, setdefault().
+    """
+
+    # Pages SQLite may cache in memory (negative: KiB)
+    CACHE_KIB = 16 * 1024
+
+    def __init__(self, directory=None):
+        import sqlite3  # only needed for oversized inputs
+
+        fd, self.path = tempfile.mkstemp(prefix='fub_dedupe_', suffix='.db', dir=directory)
+        os.close(fd)
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(f"""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            PRAGMA cache_size = -{self.CACHE_KIB};
+            CREATE TABLE keys (key INTEGER PRIMARY KEY, idx INTEGER NOT NULL);
+        """)
+
+    def setdefault(self, key, idx):
+        """Store idx for key unless the key is known; return the stored index."""
+        if self._db.execute('INSERT OR IGNORE INTO keys VALUES (?, ?)', (key, idx)).rowcount:
+            return idx
+        return self._db.execute('SELECT idx FROM keys WHERE key = ?', (key,)).fetchone()[0]
+
+    def close(self):
+        """Close and delete the database file."""
+        self._db.close()
+        os.unlink(self.path)
+
+
+def link_rows(rows, key_index=None):
+    """
+    First pass: assign each row an index and union rows sharing any key.
+    Only the key index and union-find arrays are held in memory, unless
+    key_index (e.g. a DiskKeyIndex) is given to hold the keys instead.
+    Returns the populated UnionFind.
+    """
+    uf = UnionFind()
+    if key_index is None:
+        key_index = {}
+
+    for row in rows:
+        idx = uf.add()
+        for key in row_keys(row):
+            other = key_index.setdefault(key, idx)
+            if other != idx:
+                uf.union(idx, other)
+
+    return uf
+
+
+# ========== MERGING ==========
+
+def _split_tags(tags):
+    return [t.strip() for t in re.split(r'[;,|]', tags or '') if t.strip()]
+
+
+def merge_group(rows):
+    """
+    Merge rows for one person into a single Sierra row.
+    The first row wins for scalar fields, blanks are filled from later rows,
+    distinct emails and phones fill the primary/secondary slots, tags are
+    unioned and import notes are concatenated.
+    """
+    if len(rows) == 1:
+        return dict(rows[0])
+
+    merged = dict(rows[0])
+    for row in rows[1:]:
+        for col, value in row.items():
+            if not merged.get(col) and value:
+                merged[col] = value
+
+    for cols, key_func in ((EMAIL_KEYS, email_key), (PHONE_KEYS, phone_key)):
+        values = []
+        seen = set()
+        for row in rows:
+            for col in cols:
+                value = row.get(col, '')
+                key = key_func(value) or value
+                if value and key not in seen:
+                    seen.add(key)
+                    values.append(value)
+        for i, col in enumerate(cols):
+            merged[col] = values[i] if i < len(values) else ''
+
+    tags = []
+    seen_tags = set()
+    for row in rows:
+        for tag in _split_tags(row.get('Tags')):
+            if tag not in seen_tags:
+                seen_tags.add(tag)
+                tags.append(tag)
+    merged['Tags'] = '; '.join(tags)
+
+    notes = []
+    for row in rows:
+        note = (row.get('Add to Import Note') or '').strip()
+        if note and note not in notes:
+            notes.append(note)
+    merged['Add to Import Note'] = NOTE_SEPARATOR.join(notes)
+
+    if not merged.get('Full Name'):
+        merged['Full Name'] = ' '.join(
+            filter(None, [merged.get('First Name', ''), merged.get('Last Name', '')])
+        )
+
+    return merged
+
+
+def dedupe_rows(row_source, stats=None, spill=False):
+    """
+    Consolidate duplicate leads in two streaming passes.
+
+    row_source is a zero-argument callable returning a fresh iterator of
+    Sierra rows each time it is called (e.g. a function that re-reads the
+    CSV), so the rows never need to be held in memory all at once. Pass one
+    builds the union-find; pass two buffers only groups that are still
+    incomplete and yields each merged lead as soon as its last member has
+    been seen. Buffered rows share one RowStore, emptied whenever no group
+    is pending.
+
+    With spill, the match keys of pass one are kept in a temporary SQLite
+    file rather than a dict, trading speed for a flat memory footprint.
+
+    If stats is a dict it is filled with 'input_rows', 'output_rows' and
+    'merged_rows'.
+    """
+    if spill:
+        key_index = DiskKeyIndex()
+        try:
+            uf = link_rows(row_source(), key_index)
+        finally:
+            key_index.close()
+    else:
+        uf = link_rows(row_source())
+    total = len(uf)
+
+    # Remaining member count for every root; singletons never get buffered
+    remaining = {}
+    for idx in range(total):
+        root = uf.find(idx)
+        if uf.size[root] > 1:
+            remaining[root] = uf.size[root]
+
+    # Buffered rows live in a compact store; groups hold their rows' indexes
+    buffered = None
+    pending = {}
+    output_rows = 0
+    for idx, row in enumerate(row_source()):
+        if idx >= total:
+            raise ValueError('row_source returned more rows on the second pass')
+        root = uf.find(idx)
+        if root not in remaining:
+            output_rows += 1
+            yield row
+            continue
+
+        if buffered is None:
+            buffered = RowStore(row)
+        group = pending.setdefault(root, [])
+        group.append(buffered.append(row))
+        remaining[root] -= 1
+        if remaining[root] == 0:
+            del remaining[root]
+            del pending[root]
+            output_rows += 1
+            yield merge_group([buffered[i] for i in group])
+            if not pending:
+                buffered.clear()
+
+    if remaining:
+        raise ValueError('row_source returned fewer rows on the second pass')
+
+    if stats is not None:
+        stats['input_rows'] = total
+        stats['output_rows'] = output_rows
+        stats['merged_rows'] = total - output_rows
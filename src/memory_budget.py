@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Memory Budget for FUB to Sierra CSV Converter
+Estimates a conversion's peak memory from the export's size and a quick
+row-count scan before any row is converted. Conversions whose estimate is
+over budget run in streaming mode (no per-row log kept, dedup keys spilled
+to disk) instead of risking an out-of-memory kill of the whole worker.
+PeakTracker measures the real peak with tracemalloc so the per-row costs
+below can be checked against actual runs.
+"""
+
+import os
+import threading
+import tracemalloc
+
+from export_reader import estimate_row_count, is_xlsx
+
+# Python allocation per converted row for each part of a conversion that
+# grows with the input (measured with PeakTracker on 20,000-40,000 row exports)
+ROW_LOG_BYTES = 340          # 'Row N: ...' log line kept for (and sent in) the response
+DEDUPE_ROW_BYTES = 180       # union-find entry plus the email/phone key index
+DEDUPE_SPILL_ROW_BYTES = 90  # union-find and pending-group buffer left when the keys spill
+
+# Allocation per byte of an .xlsx file (shared strings and cell XML are
+# held while the sheet is read)
+XLSX_BYTES_PER_FILE_BYTE = 4
+
+# Fixed cost of a conversion: reader and writer buffers, stages, preview
+BASE_BYTES = 8 * 1024 * 1024
+
+# Export bytes per row, used when the row count cannot be estimated
+FALLBACK_ROW_BYTES = 200
+
+# tracemalloc is process-wide, so only one PeakTracker measures at a time
+_tracing_lock = threading.Lock()
+
+
+def estimate_peak_bytes(path, rows, dedupe=False, row_logs=True, spill=False):
+    """
+    Estimate the peak allocation of converting rows rows of the export at
+    path; spill means dedup keeps its key index on disk.
+    """
+    per_row = ROW_LOG_BYTES if row_logs else 0
+    if dedupe:
+        per_row += DEDUPE_SPILL_ROW_BYTES if spill else DEDUPE_ROW_BYTES
+    peak = BASE_BYTES + rows * per_row
+    if is_xlsx(path):
+        peak += os.path.getsize(path) * XLSX_BYTES_PER_FILE_BYTE
+    return peak
+
+
+class MemoryPlan:
+    """
+    How a conversion should run under a memory budget (None: unlimited).
+    estimate is the in-memory peak; streaming is True when that is over
+    budget, and streaming_estimate is the peak in streaming mode.
+    """
+
+    def __init__(self, path, budget, dedupe=False, row_logs=True):
+        self.budget = budget
+        self.rows = estimate_row_count(path)
+        if self.rows is None:
+            self.rows = os.path.getsize(path) // FALLBACK_ROW_BYTES
+        self.estimate = estimate_peak_bytes(path, self.rows, dedupe, row_logs)
+        self.streaming = budget is not None and self.estimate > budget
+        self.streaming_estimate = estimate_peak_bytes(path, self.rows, dedupe, row_logs=False,
+                                                      spill=True)
+
+    def summary_line(self):
+        """Human-readable decision for the conversion log."""
+        mb = 1024 * 1024
+        if not self.streaming:
+            return f"Estimated memory: {self.estimate / mb:.0f} MB for ~{self.rows:,} rows"
+        return (f"Estimated memory {self.estimate / mb:.0f} MB for ~{self.rows:,} rows is over the "
+                f"{self.budget / mb:.0f} MB budget: converting in streaming mode")
+
+
+class PeakTracker:
+    """
+    Context manager measuring the peak Python allocation inside its block.
+    tracemalloc slows every allocation and counts all threads, so only turn
+    it on (enabled) for debug runs. Only one tracker in the process measures
+    at a time; a block entered while another is being measured is skipped.
+    peak is None when disabled or skipped.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.peak = None
+        self._started = False
+        self._measuring = False
+        self._baseline = 0
+
+    def __enter__(self):
+        self._measuring = self.enabled and _tracing_lock.acquire(blocking=False)
+        if self._measuring:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._measuring:
+            self.peak = tracemalloc.get_traced_memory()[1] - self._baseline
+            if self._started:
+                tracemalloc.stop()
+                self._started = False
+            self._measuring = False
+            _tracing_lock.release()
+        return False
+
+    def summary_line(self, plan=None):
+        """Measured peak, next to the plan's estimate for calibration."""
+        line = f"Measured peak allocation: {self.peak / (1024 * 1024):.1f} MB"
+        if plan is not None:
+            estimate = plan.streaming_estimate if plan.streaming else plan.estimate
+            line += f" (estimated {estimate / (1024 * 1024):.1f} MB)"
+        return line
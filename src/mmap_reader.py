@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped CSV Reader for FUB to Sierra CSV Converter
+Maps large local exports into memory and parses them block by block, with
+a quote-aware record pre-scan that gives exact row counts and splits a file
+into byte ranges on record boundaries for parallel conversion.
+"""
+
+import codecs
+import csv
+import io
+import mmap
+from contextlib import contextmanager
+
+from transcode import FALLBACK_ERRORS, SNIFF_BYTES, detect_encoding
+
+# Bytes handed to the decoder and scanners at a time
+MAP_BLOCK_BYTES = 1024 * 1024
+
+# Encodings whose b'\n' and b'"' bytes are always the ASCII characters, so
+# the raw bytes can be scanned and cut on line boundaries before decoding
+MAPPABLE_ENCODINGS = ('utf-8', 'utf-8-sig', 'cp1252')
+
+
+@contextmanager
+def open_mapped(path):
+    """Yield a read-only mmap of path (b'' for an empty file, which cannot be mapped)."""
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b''
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def _blocks(buf, start, end):
+    for offset in range(start, end, MAP_BLOCK_BYTES):
+        yield buf[offset:min(offset + MAP_BLOCK_BYTES, end)]
+
+
+def count_range(buf, start=0, end=None):
+    """
+    Count the CSV records in buf[start:end] the way csv.reader yields them:
+    a record ends at a newline outside quotes, and blank lines ('' or '\r')
+    are skipped. start must be a record boundary. Splitting each block on
+    '"' leaves the quoted text in every other piece; the text outside quotes
+    is rejoined with '"' markers where quoted text stood (so a line holding
+    only a quoted field is not blank) and split into lines at C speed.
+    """
+    end = len(buf) if end is None else end
+    records = 0
+    inside_quotes = False
+    # The unterminated line carried over from the previous block while it
+    # is still blank; None once it has content
+    line = b''
+    for block in _blocks(buf, start, end):
+        pieces = block.split(b'"')
+        started_inside = inside_quotes
+        if len(pieces) % 2 == 0:
+            # An odd number of quotes flips the state for the next block
+            inside_quotes = not inside_quotes
+        text = b'"'.join(pieces[1::2] if started_inside else pieces[0::2])
+        if started_inside:
+            text = b'"' + text
+        if inside_quotes:
+            text += b'"'
+
+        lines = text.split(b'\n')
+        lines[0] = (b'"' if line is None else line) + lines[0]
+        last = lines[-1]
+        last_blank = last in (b'', b'\r')
+        blanks = lines.count(b'') + lines.count(b'\r') - last_blank
+        records += len(lines) - 1 - blanks
+        line = last if last_blank else None
+
+    if line is None:
+        records += 1  # last record without a trailing newline
+    return records
+
+
+def count_records(path):
+    """
+    Return the number of data rows in a CSV file (header excluded).
+    Quoted multi-line fields such as notes are counted once and blank
+    lines not at all, matching the rows the readers yield.
+    """
+    with open_mapped(path) as buf:
+        if not buf:
+            return 0
+        return max(count_range(buf) - 1, 0)
+
+
+def count_range_records(path, ranges):
+    """Return the number of records in each (start, end) range from split_ranges()."""
+    with open_mapped(path) as buf:
+        return [count_range(buf, start, end) for start, end in ranges]
+
+
+def _next_record_start(buf, offset, inside_quotes):
+    """Return the offset just past the first record end at or after offset."""
+    while True:
+        newline = buf.find(b'\n', offset)
+        if newline == -1:
+            return len(buf)
+        quotes = buf[offset:newline].count(b'"')
+        inside_quotes ^= quotes % 2 == 1
+        if not inside_quotes:
+            return newline + 1
+        offset = newline + 1
+
+
+def header_end(buf):
+    """Return the offset where the first data record starts."""
+    return _next_record_start(buf, 0, False)
+
+
+def _quote_parity(buf, start, end):
+    """Return True if buf[start:end] holds an odd number of '"' bytes."""
+    return sum(block.count(b'"') for block in _blocks(buf, start, end)) % 2 == 1
+
+
+def split_ranges(path, parts):
+    """
+    Split the data records of a CSV file into up to `parts` byte ranges of
+    roughly equal size, each starting and ending on a record boundary.
+    Returns a list of (start, end) offsets.
+    """
+    with open_mapped(path) as buf:
+        size = len(buf)
+        start = header_end(buf) if size else 0
+        if size <= start:
+            return []
+
+        ranges = []
+        step = max((size - start) // max(parts, 1), 1)
+        range_start = start
+        for i in range(1, parts):
+            target = start + step * i
+            if target <= range_start:
+                continue
+            # Every range starts outside quotes, so the parity since then decides
+            inside_quotes = _quote_parity(buf, range_start, target)
+            boundary = _next_record_start(buf, target, inside_quotes)
+            if boundary >= size:
+                break
+            ranges.append((range_start, boundary))
+            range_start = boundary
+        ranges.append((range_start, size))
+        return ranges
+
+
+class MappedCsvReader:
+    """
+    csv.DictReader look-alike over an mmap of an export.
+
+    Blocks of the mapping are cut on line boundaries, decoded in one go and
+    handed to the csv parser, avoiding the separate binary and text buffers
+    of a regular file object. start/end restrict reading to a byte range
+    from split_ranges(); the header always comes from the top of the file.
+    Raises ValueError for encodings that cannot be cut on raw newline bytes.
+    """
+
+    def __init__(self, path, start=None, end=None, encoding=None):
+        self._file = open(path, 'rb')
+        try:
+            self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._buf = b''
+        if encoding is None:
+            encoding = detect_encoding(self._buf[:SNIFF_BYTES])
+        if encoding not in MAPPABLE_ENCODINGS:
+            self.close()
+            raise ValueError(f"Cannot memory-map a {encoding} file")
+        self.encoding = encoding
+        self.size = len(self._buf)
+
+        data_start = header_end(self._buf) if self.size else 0
+        header = codecs.decode(self._buf[:data_start], encoding, FALLBACK_ERRORS)
+        self.fieldnames = next(csv.reader(io.StringIO(header, newline='')), [])
+        self.start = data_start if start is None else start
+        self.end = self.size if end is None else end
+        self.offset = self.start
+        self._view = memoryview(self._buf)
+
+    def close(self):
+        view = getattr(self, '_view', None)
+        if view is not None:
+            # The mapping cannot be closed while a view of it is exported
+            view.release()
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def progress(self):
+        """Fraction of the reader's byte range parsed so far."""
+        span = self.end - self.start
+        return (self.offset - self.start) / span if span else 1.0
+
+    def _lines(self):
+        # The BOM is only at the top of the file, which the header consumed
+        decoder = codecs.getincrementaldecoder(
+            'utf-8' if self.encoding == 'utf-8-sig' else self.encoding)(errors=FALLBACK_ERRORS)
+        buf = self._buf
+        view = self._view
+        while self.offset < self.end:
+            cut = min(self.offset + MAP_BLOCK_BYTES, self.end)
+            if cut < self.end:
+                newline = buf.rfind(b'\n', self.offset, cut)
+                if newline == -1:
+                    newline = buf.find(b'\n', cut, self.end)
+                cut = self.end if newline == -1 else newline + 1
+            text = decoder.decode(view[self.offset:cut])
+            self.offset = cut
+            yield from io.StringIO(text, newline='')
+
+    def __iter__(self):
+        width = len(self.fieldnames)
+        for values in csv.reader(self._lines()):
+            if not values:
+                continue
+            # Same shape as csv.DictReader: missing values None, extras under None
+            row = dict(zip(self.fieldnames, values))
+            if len(values) < width:
+                for name in self.fieldnames[len(values):]:
+                    row[name] = None
+            elif len(values) > width:
+                row[None] = values[width:]
+            yield row
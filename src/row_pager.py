@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Row Pager for FUB to Sierra CSV Converter
+Random access to pages of rows across the chunk files of one conversion,
+so the web preview can scroll through every converted row without the
+server re-reading each file from the top for every page.
+"""
+
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+from export_reader import open_export_at
+
+# Rows between the reader positions remembered for each file
+INDEX_STRIDE = 500
+
+# Files whose position index is kept in memory
+INDEX_CACHE_FILES = 64
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def _file_index(path):
+    """
+    Return reader positions at every INDEX_STRIDE rows of a CSV file
+    (index 0 is None, the start). Cached per file version.
+    """
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with _index_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    positions = [None]
+    with open_export_at(path) as reader:
+        for rows_read, _ in enumerate(reader, 1):
+            if rows_read % INDEX_STRIDE == 0:
+                positions.append(reader.position())
+
+    with _index_lock:
+        _index_cache[key] = positions
+        while len(_index_cache) > INDEX_CACHE_FILES:
+            _index_cache.popitem(last=False)
+    return positions
+
+
+def read_page(files, offset, limit):
+    """
+    Return up to limit rows starting at row offset, counting across files
+    in order. files is a list of (path, row_count) pairs.
+    """
+    rows = []
+    for path, row_count in files:
+        if len(rows) >= limit:
+            break
+        if offset >= row_count:
+            offset -= row_count
+            continue
+        positions = _file_index(path)
+        start = positions[min(offset // INDEX_STRIDE, len(positions) - 1)]
+        skip = offset - (start['rows_read'] if start else 0)
+        with open_export_at(path, start) as reader:
+            rows.extend(islice(reader, skip, skip + limit - len(rows)))
+        offset = 0
+    return rows
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compact Row Store for FUB to Sierra CSV Converter
+Holds converted rows column by column instead of as one 16-key dict per
+row. Low-cardinality columns (state, city, lead source, agent, ...) are
+dictionary-encoded into an array of uint32 codes; the rest are packed into
+one UTF-8 buffer per column with an array of end offsets. A row costs a
+few dozen bytes of arrays plus its text, rather than a dict and sixteen
+string objects.
+"""
+
+import csv
+import sys
+from array import array
+
+# Columns whose values repeat across many rows; each distinct value is stored once
+DICTIONARY_COLUMNS = ('Lead Source', 'Assigned Agent', 'City', 'State', 'Zip Code',
+                      'Tags', 'Short Summary')
+
+
+class _DictionaryColumn:
+    """Distinct values plus one code per row."""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+        self.codes = array('I')
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def get(self, i):
+        return self.values[self.codes[i]]
+
+    def nbytes(self):
+        return (self.codes.itemsize * len(self.codes) + sys.getsizeof(self.values)
+                + sys.getsizeof(self.index) + sum(sys.getsizeof(v) for v in self.values))
+
+
+class _BufferColumn:
+    """All values' UTF-8 bytes back to back, with each row's end offset."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array('Q')
+
+    def append(self, value):
+        self.data += value.encode('utf-8')
+        self.ends.append(len(self.data))
+
+    def get(self, i):
+        start = self.ends[i - 1] if i else 0
+        return self.data[start:self.ends[i]].decode('utf-8')
+
+    def nbytes(self):
+        return len(self.data) + self.ends.itemsize * len(self.ends)
+
+
+class RowStore:
+    """
+    Append-only columnar store of rows with a fixed column layout.
+
+    Rows go in as dicts (missing keys are stored as '', keys outside the
+    layout are ignored) and come back out as new dicts, so a store can
+    stand in for a list of rows wherever rows are indexed or iterated.
+    """
+
+    def __init__(self, columns, dictionary_columns=DICTIONARY_COLUMNS):
+        self.columns = list(columns)
+        self.dictionary_columns = tuple(dictionary_columns)
+        self._data = [_DictionaryColumn() if name in dictionary_columns else _BufferColumn()
+                      for name in self.columns]
+        self._pairs = list(zip(self.columns, self._data))
+        self._count = 0
+
+    def append(self, row):
+        """Add a row; returns its index."""
+        for name, column in self._pairs:
+            column.append(row.get(name) or '')
+        self._count += 1
+        return self._count - 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def clear(self):
+        """Drop every row (and every dictionary value)."""
+        self.__init__(self.columns, self.dictionary_columns)
+
+    def __len__(self):
+        return self._count
+
+    def values(self, i):
+        """Return row i as a list in column order."""
+        return [column.get(i) for column in self._data]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('row index out of range')
+        return dict(zip(self.columns, self.values(i)))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield dict(zip(self.columns, self.values(i)))
+
+    def write_csv(self, output, header=True):
+        """
+        Write the rows as CSV to a path or an open text file, straight from
+        the columns (no per-row dicts). Returns the number of rows written.
+        """
+        if not hasattr(output, 'write'):
+            with open(output, 'w', encoding='utf-8', newline='') as f:
+                return self.write_csv(f, header)
+        writer = csv.writer(output)
+        if header:
+            writer.writerow(self.columns)
+        writer.writerows(self.values(i) for i in range(self._count))
+        return self._count
+
+    def nbytes(self):
+        """Approximate memory held by the stored rows."""
+        return sum(column.nbytes() for column in self._data)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Static Asset Fingerprinting for FUB to Sierra CSV Converter
+Gives every static file a content-hashed name (css/styles.1a2b3c4d5e.css)
+so browsers can cache it forever, and keeps gzip (and, when the brotli
+package is installed, br) variants precompressed in memory.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+# Hex digits of the content hash put into fingerprinted file names
+HASH_LENGTH = 10
+
+# Only text formats are worth compressing; images, fonts etc. already are
+COMPRESSIBLE_SUFFIXES = ('.css', '.js', '.svg', '.html', '.json', '.txt', '.map')
+
+# Preferred order when a client accepts several encodings
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, level=None):
+    """Compress data with 'gzip' or 'br'. level defaults to the maximum (for build-time use)."""
+    if encoding == 'gzip':
+        # mtime=0 keeps the output, and so its ETag, identical across builds
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=11 if level is None else level)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def choose_encoding(quality, available):
+    """
+    Pick the best of available encodings the client accepts. quality maps an
+    encoding name to the client's q-value (0 = not acceptable).
+    Returns None for the identity encoding.
+    """
+    for encoding in ENCODINGS:
+        if encoding in available and quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def fingerprinted_name(filename, digest):
+    stem, dot, suffix = filename.rpartition('.')
+    if not dot or '/' in suffix:
+        return f"{filename}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+class StaticAsset:
+    """One static file: its bytes per content encoding, content hash and MIME type."""
+
+    def __init__(self, path, filename):
+        data = path.read_bytes()
+        stat = path.stat()
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.filename = filename
+        self.digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        self.url_name = fingerprinted_name(filename, self.digest)
+        self.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self.variants = {None: data}
+        if path.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            for encoding in ENCODINGS:
+                compressed = compress(data, encoding)
+                if len(compressed) < len(data):
+                    self.variants[encoding] = compressed
+
+
+class AssetManifest:
+    """
+    Fingerprinted view of a static folder.
+
+    url_name() maps a logical name to its hashed name and lookup() resolves
+    either form back to the asset. Files are re-read when their mtime or
+    size changes, so edits show up without a restart during development.
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = Path(static_dir)
+        self._assets = {}
+        self._by_url_name = {}
+
+    def build(self):
+        """Hash and compress every file up front (e.g. before workers fork)."""
+        for root, _, files in os.walk(self.static_dir):
+            for name in files:
+                path = Path(root) / name
+                self._load(path.relative_to(self.static_dir).as_posix())
+        return self
+
+    def _load(self, filename):
+        path = self.static_dir / filename
+        try:
+            stat = path.stat()
+        except (OSError, ValueError):
+            return None
+        asset = self._assets.get(filename)
+        if asset is not None and asset.signature == (stat.st_mtime_ns, stat.st_size):
+            return asset
+        if not path.is_file() or self.static_dir.resolve() not in path.resolve().parents:
+            return None
+        asset = StaticAsset(path, filename)
+        if filename in self._assets:
+            self._by_url_name.pop(self._assets[filename].url_name, None)
+        self._assets[filename] = asset
+        self._by_url_name[asset.url_name] = asset
+        return asset
+
+    def url_name(self, filename):
+        """Return the fingerprinted name for a static file (unchanged if it does not exist)."""
+        asset = self._load(filename)
+        return asset.url_name if asset is not None else filename
+
+    def lookup(self, name):
+        """
+        Resolve a requested name. Returns (asset, fingerprinted), where
+        fingerprinted says the request used the current hashed name, or
+        (None, False) if there is no such file.
+        """
+        asset = self._by_url_name.get(name)
+        if asset is not None:
+            # Make sure the hashed name still matches the file on disk
+            current = self._load(asset.filename)
+            return current, current is asset
+        return self._load(name), False
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Charset Detection and Streaming Transcoding for FUB to Sierra CSV Converter
+Detects the encoding of an export from its first block and decodes the rest
+incrementally, so cp1252 and UTF-16 files re-saved in Excel convert without
+ever being fully decoded in memory.
+"""
+
+import codecs
+import io
+
+# How much of the file is inspected to pick an encoding
+SNIFF_BYTES = 64 * 1024
+
+# Codec error handler that decodes stray bytes as Windows-1252 instead of
+# failing. Lets a file that looked like UTF-8 in its first block survive a
+# cp1252 byte further down.
+FALLBACK_ERRORS = 'fub-cp1252-fallback'
+
+
+def _cp1252_fallback(exc):
+    if not isinstance(exc, UnicodeDecodeError):
+        raise exc
+    chars = []
+    for byte in exc.object[exc.start:exc.end]:
+        try:
+            chars.append(bytes([byte]).decode('cp1252'))
+        except UnicodeDecodeError:
+            # 0x81, 0x8D, 0x8F, 0x90 and 0x9D are undefined in cp1252
+            chars.append(chr(byte))
+    return ''.join(chars), exc.end
+
+
+codecs.register_error(FALLBACK_ERRORS, _cp1252_fallback)
+
+
+def detect_encoding(sample):
+    """
+    Pick an encoding for a file from its first block of bytes.
+    Checks byte order marks, then the NUL pattern of BOM-less UTF-16, then
+    whether the block is valid UTF-8 (tolerating a character cut off at the
+    end of the block). Anything else is treated as cp1252, which is what
+    Excel writes for "CSV" on Windows.
+    """
+    if sample.startswith(codecs.BOM_UTF32_LE) or sample.startswith(codecs.BOM_UTF32_BE):
+        return 'utf-32'
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith(codecs.BOM_UTF16_LE) or sample.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+
+    if b'\x00' in sample:
+        even_nuls = sample[0::2].count(0)
+        odd_nuls = sample[1::2].count(0)
+        if odd_nuls > even_nuls:
+            return 'utf-16-le'
+        if even_nuls > odd_nuls:
+            return 'utf-16-be'
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+def _peek(binary, size):
+    """Return up to size leading bytes without consuming them."""
+    if hasattr(binary, 'peek'):
+        return binary.peek(size)[:size]
+    position = binary.tell()
+    sample = binary.read(size)
+    binary.seek(position)
+    return sample
+
+
+def open_text(source, encoding=None):
+    """
+    Open a path or binary file object as a text stream for csv readers.
+    The encoding is detected from the first block unless given, and bytes
+    that do not decode fall back to cp1252 rather than raising.
+    Returns (text_stream, encoding).
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        binary = open(source, 'rb')
+    else:
+        binary = source
+
+    if encoding is None:
+        encoding = detect_encoding(_peek(binary, SNIFF_BYTES))
+
+    text = io.TextIOWrapper(binary, encoding=encoding, errors=FALLBACK_ERRORS, newline='')
+    return text, encoding
+
+
+def decode_sample(sample, encoding=None, final=False):
+    """
+    Decode a leading block of a file for validation and column detection.
+    Unless final (the sample is the whole file), a trailing partial
+    character and the incomplete last line are dropped.
+    Returns (text, encoding).
+    """
+    if encoding is None:
+        encoding = detect_encoding(sample)
+    decoder = codecs.getincrementaldecoder(encoding)(errors=FALLBACK_ERRORS)
+    text = decoder.decode(sample, final=final)
+    if not final and '\n' in text:
+        text = text[:text.rindex('\n') + 1]
+    return text, encoding
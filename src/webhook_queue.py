@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Webhook Event Queue for FUB to Sierra CSV Converter
+Durable, idempotent log of incoming webhook events (keyed by the provider's
+event id) with deferred processing, so the endpoint can acknowledge at once
+and redelivered events are never handled twice.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+# Handling attempts before an event is left as failed
+MAX_ATTEMPTS = 5
+
+# Seconds before a failed event is tried again
+RETRY_DELAY = 30
+
+# Seconds after which an event claimed by a worker that never finished
+# (e.g. the process was killed) is handed out again
+CLAIM_TIMEOUT = 300
+
+# Seconds the background processor sleeps between checks of the log
+POLL_INTERVAL = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    received_at REAL NOT NULL,
+    claimed_at REAL,
+    processed_at REAL,
+    error TEXT
+)
+"""
+
+
+class WebhookEventLog:
+    """
+    SQLite table of webhook events, safe to share between threads and
+    worker processes. Events move queued -> processing -> done, or back
+    to queued on failure until MAX_ATTEMPTS is reached (then failed).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._ready = False
+
+    def _connect(self):
+        # Autocommit connection; closing() rolls back anything left open on error.
+        # sqlite3 is imported here so web workers that never see a webhook skip it.
+        import sqlite3
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        if not self._ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+            self._ready = True
+        return closing(conn)
+
+    def record(self, event_id, event_type, payload):
+        """Store a new event as queued. Returns False if the id was seen before."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO events (id, type, payload, received_at) VALUES (?, ?, ?, ?)',
+                (event_id, event_type, payload, time.time()))
+            return cursor.rowcount == 1
+
+    def claim(self, event_id=None):
+        """
+        Mark a queued event (the given one, or the oldest) as processing and
+        return (id, type, payload dict), or None if there is nothing to claim.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            # Take back events whose worker died mid-handling
+            conn.execute(
+                "UPDATE events SET status = 'queued' WHERE status = 'processing' AND claimed_at < ?",
+                (now - CLAIM_TIMEOUT,))
+            # Fresh events have no claimed_at; failed ones wait RETRY_DELAY
+            ready = "status = 'queued' AND (claimed_at IS NULL OR claimed_at <= ?)"
+            if event_id is None:
+                row = conn.execute(
+                    f"SELECT id, type, payload FROM events WHERE {ready} "
+                    "ORDER BY received_at LIMIT 1", (now - RETRY_DELAY,)).fetchone()
+            else:
+                row = conn.execute(
+                    f"SELECT id, type, payload FROM events WHERE {ready} AND id = ?",
+                    (now - RETRY_DELAY, event_id)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE events SET status = 'processing', claimed_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?", (now, row[0]))
+            conn.execute('COMMIT')
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def complete(self, event_id):
+        """Mark a claimed event as done and clear any earlier error."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE events SET status = 'done', processed_at = ?, error = NULL WHERE id = ?",
+                (time.time(), event_id))
+
+    def fail(self, event_id, error):
+        """
+        Record a failed attempt: the event is queued again (after RETRY_DELAY)
+        until it has been tried MAX_ATTEMPTS times, then left as failed.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE events SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "error = ? WHERE id = ?", (MAX_ATTEMPTS, str(error), event_id))
+
+    def status(self, event_id):
+        """Return (status, attempts) for an event, or None if it was never received."""
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT status, attempts FROM events WHERE id = ?', (event_id,)).fetchone()
+
+
+class WebhookProcessor:
+    """
+    Runs handlers for logged events off the request path.
+
+    handlers maps event types to callables taking the event dict; types
+    without a handler are marked done. Call start() in each worker process
+    once it is running (after any preload fork): its daemon thread sweeps
+    the log every poll_interval, so events left queued, claimed or waiting
+    for a retry by other workers or restarts are handled even if no new
+    webhook arrives. enqueue() starts the thread too if it is not running.
+    """
+
+    def __init__(self, event_log, handlers, log=print, poll_interval=POLL_INTERVAL):
+        self.event_log = event_log
+        self.handlers = handlers
+        self.log = log
+        self.poll_interval = poll_interval
+        self._wakeups = queue.Queue()
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the background thread in this process unless it is already running."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='webhook-processor', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def enqueue(self, event_id):
+        """Hand a recorded event to the background thread."""
+        self.start()
+        self._wakeups.put(event_id)
+
+    def process(self, event_id=None):
+        """Claim and handle one event; returns its id, or None if nothing was claimed."""
+        claimed = self.event_log.claim(event_id)
+        if claimed is None:
+            return None
+        event_id, event_type, event = claimed
+        try:
+            handler = self.handlers.get(event_type)
+            if handler is not None:
+                handler(event)
+        except Exception as e:
+            self.log(f"Webhook event {event_id} ({event_type}) failed: {e}")
+            self.event_log.fail(event_id, e)
+        else:
+            self.event_log.complete(event_id)
+        return event_id
+
+    def drain(self):
+        """Handle every queued event in the calling thread; returns how many were claimed."""
+        handled = 0
+        while self.process() is not None:
+            handled += 1
+        return handled
+
+    def _run(self):
+        while True:
+            try:
+                event_id = self._wakeups.get(timeout=self.poll_interval)
+            except queue.Empty:
+                event_id = None
+            try:
+                if event_id is not None:
+                    self.process(event_id)
+                self.drain()
+            except Exception as e:
+                self.log(f"Webhook processor error: {e}")
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Streaming XLSX Reader for FUB to Sierra CSV Converter
+Iterates worksheet rows straight out of the zipped XML so FUB exports that
+were re-saved in Excel can be converted without loading the workbook.
+"""
+
+import posixpath
+import re
+import zipfile
+from datetime import datetime, timedelta
+
+
+def iterparse(source, events=None):
+    """ElementTree's iterparse, imported on first use so importing this module stays cheap."""
+    from xml.etree.ElementTree import iterparse as element_iterparse
+    return element_iterparse(source, events)
+
+
+# Relationship namespace used to resolve the first sheet's part name
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+# Excel's day zero (the 1900 leap-year bug is absorbed by starting on Dec 30)
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Built-in number formats that display dates or times
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+
+# Date/time tokens in a custom format once quoted text and [colors] are removed
+_DATE_TOKENS = re.compile(r'[dmyhs]', re.IGNORECASE)
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.')
+
+_COLUMN_LETTERS = re.compile(r'[A-Z]+')
+
+
+def _local(tag):
+    """Strip the XML namespace so transitional and strict files parse alike."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def column_index(cell_ref):
+    """Return the zero-based column of a cell reference ('C12' -> 2)."""
+    letters = _COLUMN_LETTERS.match(cell_ref or '')
+    if not letters:
+        return None
+    idx = 0
+    for ch in letters.group():
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+
+def format_excel_date(serial):
+    """Render an Excel date serial as ISO date, adding the time if present."""
+    value = _EXCEL_EPOCH + timedelta(days=float(serial))
+    if value.hour or value.minute or value.second:
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value.strftime('%Y-%m-%d')
+
+
+def format_number(text):
+    """Drop the '.0' Excel adds to whole numbers such as phone digits."""
+    if text.endswith('.0') and text[:-2].lstrip('-').isdigit():
+        return text[:-2]
+    return text
+
+
+class XlsxReader:
+    """
+    Row iterator over the first worksheet of an .xlsx file.
+
+    source is a path or a seekable binary file object. Shared strings and
+    the date styles are loaded when iteration starts (they are small
+    compared with the sheet); the sheet itself is parsed incrementally and
+    each row element is discarded as soon as it has been yielded.
+    """
+
+    def __init__(self, source):
+        self._zip = zipfile.ZipFile(source)
+        self.sheet_path = self._first_sheet_path()
+        self.shared_strings = None
+        self.date_styles = None
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _first_sheet_path(self):
+        names = set(self._zip.namelist())
+        try:
+            with self._zip.open('xl/workbook.xml') as f:
+                rel_id = None
+                for _, elem in iterparse(f):
+                    if _local(elem.tag) == 'sheet':
+                        rel_id = elem.get(_REL_NS + 'id') or elem.get('id')
+                        break
+            with self._zip.open('xl/_rels/workbook.xml.rels') as f:
+                for _, elem in iterparse(f):
+                    if _local(elem.tag) == 'Relationship' and elem.get('Id') == rel_id:
+                        target = elem.get('Target').lstrip('/')
+                        if not target.startswith('xl/'):
+                            target = posixpath.normpath(posixpath.join('xl', target))
+                        if target in names:
+                            return target
+        except KeyError:
+            pass
+
+        sheets = sorted(n for n in names if n.startswith('xl/worksheets/sheet'))
+        if not sheets:
+            raise ValueError("Workbook has no worksheets")
+        return sheets[0]
+
+    def _load_shared_strings(self):
+        strings = []
+        try:
+            f = self._zip.open('xl/sharedStrings.xml')
+        except KeyError:
+            return strings
+        with f:
+            for _, elem in iterparse(f):
+                if _local(elem.tag) == 'si':
+                    # Rich text splits a string over several <t> runs
+                    strings.append(''.join(
+                        t.text or '' for t in elem.iter() if _local(t.tag) == 't'
+                    ))
+                    elem.clear()
+        return strings
+
+    def _load_date_styles(self):
+        """Return the set of cell style indexes that format a date."""
+        try:
+            f = self._zip.open('xl/styles.xml')
+        except KeyError:
+            return set()
+
+        custom_date_formats = set()
+        date_styles = set()
+        with f:
+            in_cell_xfs = False
+            xf_index = 0
+            for event, elem in iterparse(f, events=('start', 'end')):
+                tag = _local(elem.tag)
+                if event == 'start':
+                    if tag == 'cellXfs':
+                        in_cell_xfs = True
+                    continue
+                if tag == 'numFmt':
+                    code = _FORMAT_LITERALS.sub('', elem.get('formatCode', ''))
+                    if _DATE_TOKENS.search(code):
+                        custom_date_formats.add(int(elem.get('numFmtId')))
+                elif tag == 'xf' and in_cell_xfs:
+                    fmt_id = int(elem.get('numFmtId', 0))
+                    if fmt_id in _BUILTIN_DATE_FORMATS or fmt_id in custom_date_formats:
+                        date_styles.add(xf_index)
+                    xf_index += 1
+                elif tag == 'cellXfs':
+                    in_cell_xfs = False
+        return date_styles
+
+    def _cell_value(self, cell):
+        cell_type = cell.get('t', 'n')
+        if cell_type == 'inlineStr':
+            return ''.join(t.text or '' for t in cell.iter() if _local(t.tag) == 't')
+
+        value = None
+        for child in cell:
+            if _local(child.tag) == 'v':
+                value = child.text
+                break
+        if value is None:
+            return ''
+
+        if cell_type == 's':
+            return self.shared_strings[int(value)]
+        if cell_type == 'b':
+            return 'TRUE' if value == '1' else 'FALSE'
+        if cell_type == 'n':
+            style = cell.get('s')
+            if style is not None and int(style) in self.date_styles:
+                try:
+                    return format_excel_date(value)
+                except (ValueError, OverflowError):
+                    return value
+            return format_number(value)
+        return value
+
+    def declared_row_count(self):
+        """
+        Return the data row count declared by the sheet's <dimension>
+        element (header excluded), or None if the sheet does not declare one.
+        Only the start of the sheet XML is parsed.
+        """
+        with self._zip.open(self.sheet_path) as f:
+            for _, elem in iterparse(f, events=('start',)):
+                tag = _local(elem.tag)
+                if tag == 'dimension':
+                    last_ref = elem.get('ref', '').split(':')[-1]
+                    digits = _COLUMN_LETTERS.sub('', last_ref)
+                    return max(int(digits) - 1, 0) if digits.isdigit() else None
+                if tag == 'sheetData':
+                    return None
+        return None
+
+    def __iter__(self):
+        """Yield each worksheet row as a list of strings, gaps filled with ''."""
+        if self.shared_strings is None:
+            self.shared_strings = self._load_shared_strings()
+            self.date_styles = self._load_date_styles()
+        with self._zip.open(self.sheet_path) as f:
+            sheet_data = None
+            for event, elem in iterparse(f, events=('start', 'end')):
+                tag = _local(elem.tag)
+                if event == 'start':
+                    if tag == 'sheetData':
+                        sheet_data = elem
+                    continue
+                if tag != 'row':
+                    continue
+
+                values = []
+                for cell in elem:
+                    if _local(cell.tag) != 'c':
+                        continue
+                    idx = column_index(cell.get('r'))
+                    if idx is None:
+                        idx = len(values)
+                    if idx > len(values):
+                        values.extend([''] * (idx - len(values)))
+                    values.append(self._cell_value(cell))
+                yield values
+
+                # Drop parsed rows so memory stays flat for any sheet size
+                elem.clear()
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+
+def sheet_row_count(source):
+    """Return the declared data row count of a workbook's first sheet, or None."""
+    with XlsxReader(source) as reader:
+        return reader.declared_row_count()
+
+
+class XlsxDictReader:
+    """
+    csv.DictReader look-alike over an XlsxReader.
+    The first row supplies fieldnames; blank rows are skipped, short rows
+    are padded with '' and trailing empty header cells are dropped.
+    """
+
+    def __init__(self, source):
+        self._reader = XlsxReader(source)
+        self._rows = iter(self._reader)
+        header = next(self._rows, [])
+        while header and not header[-1].strip():
+            header.pop()
+        self.fieldnames = header
+
+    def close(self):
+        self._reader.close()
+
+    def __iter__(self):
+        width = len(self.fieldnames)
+        for values in self._rows:
+            if not any(v.strip() for v in values):
+                continue
+            if len(values) < width:
+                values = values + [''] * (width - len(values))
+            yield dict(zip(self.fieldnames, values))
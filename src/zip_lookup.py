@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Offline ZIP Code Lookup for FUB to Sierra CSV Converter
+Fills in missing city and state (and county, where the output has one) from
+a compact binary ZIP index. The index is a memory-mapped file of sorted
+arrays searched with bisect: it opens in well under a millisecond, and
+every worker process shares the same pages of the OS page cache instead of
+building its own dict of ~40,000 entries.
+
+Build the index once from a GeoNames postal code dump (US.txt from
+https://download.geonames.org/export/zip/) or a CSV with zip, city, state
+and county columns:
+
+    python src/zip_lookup.py US.txt data/zip_index.bin
+"""
+
+import csv
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+
+# Default location of the compiled index
+ZIP_INDEX_PATH = Path(__file__).parent.parent / 'data' / 'zip_index.bin'
+
+# File layout (little-endian uint32 arrays, each 4-byte aligned):
+#   header   magic, zip count, string count
+#   zips     sorted 5-digit ZIPs as integers
+#   places   (city, state, county) string ids per ZIP
+#   offsets  string count + 1 byte offsets into the string blob
+#   blob     UTF-8 strings, each stored once
+MAGIC = b'FUBZIP1\0'
+HEADER = struct.Struct('<8sII')
+
+
+def zip_key(value):
+    """
+    Return a ZIP as an int from '78701', '78701-1234' or a 4-digit ZIP
+    whose leading zero a spreadsheet dropped ('2134'), or None.
+    """
+    digits = str(value).strip().split('-')[0]
+    if not digits.isdigit() or not 3 <= len(digits) <= 5:
+        return None
+    return int(digits)
+
+
+def _uint32s(values):
+    data = array('I', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def build_index(places, path):
+    """
+    Write an index file from (zip, city, state, county) tuples.
+    Later duplicates of a ZIP are ignored (GeoNames lists the primary city first).
+    Returns the number of ZIPs written.
+    """
+    by_zip = {}
+    for zip_code, city, state, county in places:
+        key = zip_key(zip_code)
+        if key is not None:
+            by_zip.setdefault(key, (city.strip(), state.strip(), county.strip()))
+
+    strings = {'': 0}
+    zips = sorted(by_zip)
+    place_ids = []
+    for key in zips:
+        for text in by_zip[key]:
+            place_ids.append(strings.setdefault(text, len(strings)))
+
+    blob = bytearray()
+    offsets = []
+    for text in strings:
+        offsets.append(len(blob))
+        blob += text.encode('utf-8')
+    offsets.append(len(blob))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(zips), len(strings)))
+        f.write(_uint32s(zips))
+        f.write(_uint32s(place_ids))
+        f.write(_uint32s(offsets))
+        f.write(blob)
+    tmp_path.replace(path)
+    return len(zips)
+
+
+def read_source(path):
+    """
+    Yield (zip, city, state, county) from a GeoNames postal code dump
+    (tab-separated, no header) or a CSV with zip, city, state and county headers.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        if Path(path).suffix.lower() == '.txt':
+            for fields in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+                # country, postal code, place, state name, state code, county, ...
+                if len(fields) > 5:
+                    yield fields[1], fields[2], fields[4], fields[5]
+            return
+        for row in csv.DictReader(f):
+            row = {(k or '').strip().lower(): v or '' for k, v in row.items()}
+            yield row.get('zip', ''), row.get('city', ''), row.get('state', ''), row.get('county', '')
+
+
+class ZipIndex:
+    """Read-only view of an index file; lookups binary-search the mapped arrays."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, string_count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a ZIP index")
+
+        view = memoryview(self._map)
+        start = HEADER.size
+        sections = []
+        for length in (count, count * 3, string_count + 1):
+            sections.append(self._uint32_view(view[start:start + length * 4]))
+            start += length * 4
+        self._zips, self._places, self._offsets = sections
+        self._blob = view[start:]
+        self.count = count
+
+    @staticmethod
+    def _uint32_view(buffer):
+        if sys.byteorder == 'little':
+            return buffer.cast('I')
+        data = array('I', bytes(buffer))
+        data.byteswap()
+        return data
+
+    def __len__(self):
+        return self.count
+
+    def _string(self, string_id):
+        return str(self._blob[self._offsets[string_id]:self._offsets[string_id + 1]], 'utf-8')
+
+    def lookup(self, zip_code):
+        """Return (city, state, county) for a ZIP, or None if it is not in the index."""
+        key = zip_key(zip_code)
+        if key is None:
+            return None
+        i = bisect_left(self._zips, key)
+        if i == self.count or self._zips[i] != key:
+            return None
+        return tuple(self._string(string_id) for string_id in self._places[i * 3:i * 3 + 3])
+
+
+@lru_cache(maxsize=None)
+def open_index(path=ZIP_INDEX_PATH):
+    """Open an index once per process; the mapping stays open for reuse."""
+    return ZipIndex(path)
+
+
+class ZipEnricher:
+    """
+    Row stage that fills blank City and State (and County, if the output
+    has that column) from the row's Zip Code. summary_builder, if given,
+    rebuilds the Short Summary of filled rows so it picks up the location.
+    """
+
+    def __init__(self, index, summary_builder=None):
+        self.index = index
+        self.summary_builder = summary_builder
+        self.stats = {'filled': 0, 'unknown': 0}
+
+    def apply(self, row):
+        """Fill a row's missing location in place and return it."""
+        zip_code = row.get('Zip Code')
+        if not zip_code or (row.get('City') and row.get('State')):
+            return row
+        place = self.index.lookup(zip_code)
+        if place is None:
+            self.stats['unknown'] += 1
+            return row
+        for col, value in zip(('City', 'State', 'County'), place):
+            if col in row and not row[col]:
+                row[col] = value
+        if self.summary_builder:
+            row['Short Summary'] = self.summary_builder(row)
+        self.stats['filled'] += 1
+        return row
+
+    def wrap(self, rows):
+        """Yield rows with missing locations filled."""
+        for row in rows:
+            yield self.apply(row)
+
+    def merge(self, other):
+        """Add another enricher's counts (e.g. one range of a parallel run)."""
+        for key, count in other.stats.items():
+            self.stats[key] += count
+
+    def report(self):
+        """Return the counts as a JSON-serializable dict."""
+        return dict(self.stats)
+
+    def summary_lines(self):
+        """Human-readable summary for the CLI and conversion logs."""
+        return [f"ZIP enrichment: filled the location of {self.stats['filled']} rows, "
+                f"{self.stats['unknown']} ZIPs not found"]
+
+    def __getstate__(self):
+        # Worker processes send back their counts; the index is reopened, not pickled
+        return {**self.__dict__, 'index': None, 'summary_builder': None}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        sys.exit(f"usage: {sys.argv[0]} SOURCE [INDEX] (default INDEX: {ZIP_INDEX_PATH})")
+    output = Path(sys.argv[2]) if len(sys.argv) == 3 else ZIP_INDEX_PATH
+    written = build_index(read_source(sys.argv[1]), output)
+    print(f"Wrote {written} ZIP codes to {output}")
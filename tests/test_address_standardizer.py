@@ -0,0 +1,101 @@
+"""
+Tests for street address standardization
+Ensures spelling variants of one address standardize to the same USPS form
+"""
+
+import json
+import random
+import time
+
+import pytest
+import fub_to_sierra
+from address_standardizer import AddressStandardizer, standardize_address
+
+# Uncached addresses per second the standardizer must sustain; far below what
+# it does on a laptop, so only a real regression (not a slow CI box) fails
+MIN_ROWS_PER_SECOND = 50000
+
+
+class TestStandardizeAddress:
+    """Test the USPS-style rewrite."""
+
+    @pytest.mark.parametrize('address', [
+        '123 Main Street', '123 main st.', '123 MAIN ST', ' 123  Main  St, ',
+    ])
+    def test_variants_match(self, address):
+        """Test common spellings of one address give the same result."""
+        assert standardize_address(address) == '123 MAIN ST'
+
+    @pytest.mark.parametrize('address, expected', [
+        ('12 n. main street apt. #4', '12 N MAIN ST APT 4'),
+        ('100 North East Broad Street Suite 200', '100 NE BROAD ST STE 200'),
+        ('123 Main St North', '123 MAIN ST N'),
+        ('77 Sunset Boulevard, Unit 3B', '77 SUNSET BLVD UNIT 3B'),
+        ('P.O. Box 55', 'PO BOX 55'),
+        ('Post Office Box 9', 'PO BOX 9'),
+        ('123 main st #5', '123 MAIN ST # 5'),
+    ])
+    def test_suffixes_directionals_units(self, address, expected):
+        """Test suffixes, directionals, unit designators and PO boxes are abbreviated."""
+        assert standardize_address(address) == expected
+
+    @pytest.mark.parametrize('address, expected', [
+        ('12 North Street', '12 NORTH ST'),
+        ('9 Park Avenue', '9 PARK AVE'),
+        ('5 Upper Valley Road', '5 UPPER VALLEY RD'),
+        ('40 West Lake Drive', '40 W LAKE DR'),
+    ])
+    def test_name_words_kept(self, address, expected):
+        """Test words that are part of the street name are not abbreviated."""
+        assert standardize_address(address) == expected
+
+    def test_blank(self):
+        """Test whitespace-only input gives an empty address."""
+        assert standardize_address('   ') == ''
+
+    def test_throughput(self):
+        """Test uncached standardization stays in the hundreds-of-thousands-per-second range."""
+        rng = random.Random(1)
+        addresses = [f"{i} {rng.choice(['Main', 'Oak', 'North Park'])} "
+                     f"{rng.choice(['Street', 'st.', 'Avenue', 'Blvd'])} Apt {i % 50}"
+                     for i in range(50000)]
+        started = time.perf_counter()
+        for address in addresses:
+            standardize_address.__wrapped__(address)
+        assert len(addresses) / (time.perf_counter() - started) > MIN_ROWS_PER_SECOND
+
+
+class TestConversion:
+    """Test standardization is selectable per conversion."""
+
+    def test_stage_counts_changes(self):
+        """Test the row stage rewrites the column and counts changed rows."""
+        stage = AddressStandardizer()
+        rows = [{'Street Address': '1 Elm Street'}, {'Street Address': '2 ELM ST'}, {'Street Address': ''}]
+        assert [row['Street Address'] for row in stage.wrap(rows)] == ['1 ELM ST', '2 ELM ST', '']
+        assert stage.report() == {'changed': 1}
+
+    def test_cli_flag(self, tmp_path, monkeypatch):
+        """Test addresses are only rewritten with --standardize-addresses."""
+        for name in fub_to_sierra._CLI_SETTINGS:
+            monkeypatch.setattr(fub_to_sierra, name, getattr(fub_to_sierra, name))
+        export = tmp_path / 'export.csv'
+        export.write_text('First Name,Street\nAnn,12 Oak Avenue\n')
+
+        fub_to_sierra.cli([str(export), '-o', str(tmp_path / 'plain')])
+        assert '12 Oak Avenue' in (tmp_path / 'plain' / 'export-sierra.csv').read_text()
+        fub_to_sierra.cli([str(export), '-o', str(tmp_path / 'usps'), '--standardize-addresses'])
+        assert '12 OAK AVE' in (tmp_path / 'usps' / 'export-sierra.csv').read_text()
+
+    def test_upload_option(self, client, tmp_path, column_mapping):
+        """Test the web form option standardizes the converted rows."""
+        export = tmp_path / 'contacts.csv'
+        export.write_text('First Name,Street\nAnn,12 Oak Avenue\n')
+        for enabled, expected in (('false', '12 Oak Avenue'), ('true', '12 OAK AVE')):
+            with open(export, 'rb') as f:
+                response = client.post('/upload', data={
+                    'file': (f, 'contacts.csv'),
+                    'column_mapping': json.dumps({**column_mapping, 'street': 'Street'}),
+                    'standardize_addresses': enabled,
+                }, content_type='multipart/form-data')
+            assert response.get_json()['preview'][0]['Street Address'] == expected
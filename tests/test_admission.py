@@ -0,0 +1,106 @@
+"""
+Tests for admission control of concurrent conversions
+Ensures budgets queue or reject work and are shared between processes
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import web_app.app as web_app
+from admission import AdmissionController, AdmissionRejected, SharedBudget
+
+
+class TestAdmissionController:
+    """Test the per-process budget."""
+
+    def test_rejects_over_budget_and_frees_on_release(self):
+        """Test work that does not fit is rejected until the running work finishes."""
+        controller = AdmissionController(max_bytes=100, max_rows=10, retry_after=7)
+        first = controller.admit(60, 5)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            controller.admit(60, 1)
+        assert excinfo.value.retry_after == 7
+        with pytest.raises(AdmissionRejected):
+            controller.admit(10, 6)
+
+        first.release()
+        first.release()
+        assert controller.in_flight() == (0, 0, 0)
+        with controller.admit(60, 1):
+            assert controller.in_flight() == (1, 60, 1)
+
+    def test_oversized_work_runs_alone(self):
+        """Test a single conversion larger than the budget is admitted when idle."""
+        controller = AdmissionController(max_bytes=100)
+        with controller.admit(500, 0):
+            with pytest.raises(AdmissionRejected):
+                controller.admit(1, 0)
+
+    def test_queued_work_admitted_after_release(self):
+        """Test admit waits for room instead of rejecting when queueing is enabled."""
+        controller = AdmissionController(max_bytes=100, queue_seconds=5)
+        running = controller.admit(100, 0)
+        threading.Timer(0.05, running.release).start()
+        started = time.monotonic()
+        with controller.admit(100, 0):
+            assert time.monotonic() - started < 2
+
+
+class TestSharedBudget:
+    """Test the budget shared between worker processes."""
+
+    def test_processes_share_the_budget(self, tmp_path):
+        """Test reservations made by one controller count against another."""
+        state = tmp_path / 'admission.json'
+        worker_a = AdmissionController(shared=SharedBudget(state, max_bytes=100))
+        worker_b = AdmissionController(shared=SharedBudget(state, max_bytes=100))
+        with worker_a.admit(80, 0):
+            with pytest.raises(AdmissionRejected):
+                worker_b.admit(30, 0)
+            assert worker_b.shared.in_flight() == (1, 80, 0)
+        with worker_b.admit(30, 0):
+            pass
+        assert json.loads(state.read_text()) == {}
+
+    def test_dead_process_reservations_are_dropped(self, tmp_path):
+        """Test a worker killed mid-conversion does not hold its budget forever."""
+        child = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                               capture_output=True, text=True, check=True)
+        dead_pid = int(child.stdout)
+        state = tmp_path / 'admission.json'
+        state.write_text(json.dumps({'stale': [dead_pid, 1000, 0], 'live': [os.getpid(), 10, 0]}))
+
+        budget = SharedBudget(state, max_bytes=100)
+        assert budget.in_flight() == (1, 10, 0)
+
+
+class TestUploadAdmission:
+    """Test the upload endpoint under load."""
+
+    def test_busy_upload_gets_503(self, client, sample_csv_file, column_mapping, monkeypatch, tmp_path):
+        """Test an upload that does not fit returns 503 with Retry-After and no conversion."""
+        controller = AdmissionController(max_bytes=1, retry_after=3,
+                                         shared=SharedBudget(tmp_path / 'admission.json'))
+        monkeypatch.setattr(web_app, 'admission', controller)
+        with controller.admit(1, 0):
+            with open(sample_csv_file, 'rb') as f:
+                response = client.post('/upload', data={
+                    'file': (f, 'test_contacts.csv'),
+                    'column_mapping': json.dumps(column_mapping),
+                }, content_type='multipart/form-data')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '3'
+        assert response.get_json()['success'] is False
+
+        with open(sample_csv_file, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'test_contacts.csv'),
+                'column_mapping': json.dumps(column_mapping),
+            }, content_type='multipart/form-data')
+        assert response.get_json()['success'] is True
+        assert controller.in_flight() == (0, 0, 0)
@@ -0,0 +1,147 @@
+"""
+Tests for the ASGI entry point
+Ensures streamed uploads and downloads behave like the WSGI app
+"""
+
+import asyncio
+import io
+import json
+
+import pytest
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import encode_multipart
+
+import web_app.asgi as asgi
+
+
+def asgi_request(method, path, chunks=(b'',), headers=(), disconnect=False):
+    """Drive the ASGI app with a body split into chunks; returns (status, headers, body, messages)."""
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    if disconnect:
+        messages[-1] = {'type': 'http.disconnect'}
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query.encode('latin-1'),
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    asyncio.run(asgi.application(scope, receive, send))
+    if not sent:
+        return None, {}, b'', sent
+    response_headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in sent[0]['headers']}
+    body = b''.join(m.get('body', b'') for m in sent[1:])
+    return sent[0]['status'], response_headers, body, sent
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)] or [b'']
+
+
+@pytest.fixture
+def multipart_upload(sample_csv_content, column_mapping):
+    """A multipart upload body large enough to spill to disk."""
+    content = sample_csv_content + ''.join(
+        f"\nPerson{i},Last{i},person{i}@example.com,555{i:07d},Austin,TX,Zillow,buyer,Note {i}"
+        for i in range(1500))
+    boundary, data = encode_multipart({
+        'file': FileStorage(io.BytesIO(content.encode('utf-8')), 'test_contacts.csv'),
+        'column_mapping': json.dumps(column_mapping),
+    })
+    return f'multipart/form-data; boundary={boundary}', data
+
+
+class TestAsgiUpload:
+    """Test request bodies streamed through the ASGI app."""
+
+    def test_chunked_upload_converts(self, app, multipart_upload, monkeypatch):
+        """Test a body arriving in small pieces without Content-Length is spooled and converted."""
+        monkeypatch.setattr(asgi, 'SPOOL_WRITE_BYTES', 4096)
+        content_type, data = multipart_upload
+        status, headers, body, _ = asgi_request('POST', '/upload', split(data, 1000),
+                                                [('Content-Type', content_type)])
+        result = json.loads(body)
+        assert status == 200
+        assert result['success'] is True
+        assert result['total_rows'] == 1503
+        assert 'set-cookie' in headers
+        # The spooled body was an anonymous temp file and leaves nothing behind
+        assert list(app.config['UPLOAD_FOLDER'].iterdir()) == []
+
+    def test_oversized_body_is_rejected(self, app, multipart_upload, monkeypatch):
+        """Test reading stops past MAX_CONTENT_LENGTH and the upload is refused."""
+        monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 50000)
+        content_type, data = multipart_upload
+        received = []
+        real_spool_body = asgi.spool_body
+
+        async def spool_body(receive, limit, loop):
+            async def counting_receive():
+                message = await receive()
+                received.append(message)
+                return message
+            return await real_spool_body(counting_receive, limit, loop)
+
+        monkeypatch.setattr(asgi, 'spool_body', spool_body)
+        chunks = split(data, 8192)
+        _, _, body, _ = asgi_request('POST', '/upload', chunks, [('Content-Type', content_type)])
+        result = json.loads(body)
+        assert result['success'] is False
+        assert 'Request Entity Too Large' in result['error']
+        assert len(received) < len(chunks)
+        assert list(app.config['UPLOAD_FOLDER'].iterdir()) == []
+
+    def test_client_disconnect_skips_app(self, app, multipart_upload):
+        """Test an abandoned upload never reaches the view."""
+        content_type, data = multipart_upload
+        status, _, _, sent = asgi_request('POST', '/upload', split(data, 8192),
+                                          [('Content-Type', content_type)], disconnect=True)
+        assert status is None and sent == []
+        assert list(app.config['UPLOAD_FOLDER'].iterdir()) == []
+
+
+class TestAsgiDownload:
+    """Test file responses streamed through the ASGI app."""
+
+    def test_download_streams_in_blocks(self, app, client, sample_csv_file, column_mapping, monkeypatch):
+        """Test a converted file is sent in several body messages with its validators."""
+        monkeypatch.setattr(asgi, 'STREAM_BLOCK_BYTES', 64)
+        with open(sample_csv_file, 'rb') as f:
+            upload = client.post('/upload', data={
+                'file': (f, 'test_contacts.csv'),
+                'column_mapping': json.dumps(column_mapping),
+            }, content_type='multipart/form-data').get_json()
+        file_path = upload['files'][0]['path']
+        expected = (app.config['DOWNLOAD_FOLDER'] / file_path).read_bytes()
+
+        status, headers, body, sent = asgi_request('GET', f'/download/{file_path}')
+        assert status == 200
+        assert body == expected
+        assert len(sent) > 3
+        assert headers['etag']
+
+        status, headers, body, _ = asgi_request('GET', f'/download/{file_path}',
+                                                headers=[('Range', 'bytes=5-14')])
+        assert status == 206
+        assert body == expected[5:15]
+
+    def test_json_routes_pass_through(self, app):
+        """Test ordinary routes still answer through the adapter."""
+        status, headers, body, _ = asgi_request('GET', '/health')
+        assert status == 200
+        assert headers['content-type'].startswith('application/json')
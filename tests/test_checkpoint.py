@@ -0,0 +1,151 @@
+"""
+Tests for checkpoint and resume of long conversions
+Ensures an interrupted run resumes and matches an uninterrupted one
+"""
+
+import os
+
+import pytest
+import fub_to_sierra
+from checkpoint import checkpoint_path
+from delta_index import DeltaIndex
+from export_reader import open_export, open_export_at
+
+
+CSV_TEXT = ('First Name,Email,Notes\n'
+            + ''.join(f'Person{i},p{i}@example.com,"line one\nline {i}"\n' for i in range(23)))
+
+
+def read_all(path, position=None, limit=None):
+    """Return rows from position on, and the position after `limit` rows."""
+    rows = []
+    with open_export_at(path, position) as reader:
+        for row in reader:
+            rows.append(row)
+            if len(rows) == limit:
+                return rows, reader.position()
+    return rows, None
+
+
+class TestPositionedReader:
+    """Test reopening an export part way through."""
+
+    @pytest.mark.parametrize('encoding', ['utf-8', 'utf-8-sig', 'cp1252', 'utf-16'])
+    def test_resume_matches_full_read(self, tmp_path, encoding):
+        """Test rows read after resuming continue exactly where the position was taken."""
+        path = tmp_path / 'export.csv'
+        path.write_bytes(CSV_TEXT.replace('Person1,', 'José1,').encode(encoding))
+        with open_export(path) as reader:
+            expected = list(reader)
+
+        head, position = read_all(path, limit=5)
+        tail, _ = read_all(path, position)
+        assert head + tail == expected
+        assert (position['offset'] is None) == (encoding == 'utf-16')
+
+
+@pytest.fixture
+def cli_env(tmp_path, monkeypatch):
+    """Point the CLI at a temporary output dir with small chunks and checkpoints on."""
+    monkeypatch.setattr(fub_to_sierra, 'SIERRA_MAX_ROWS', 5)
+    monkeypatch.setattr(fub_to_sierra, 'CHECKPOINTS', True)
+    monkeypatch.setattr(fub_to_sierra, 'VERBOSE', False)
+    export = tmp_path / 'export.csv'
+    export.write_text(CSV_TEXT)
+    return export
+
+
+def run_into(monkeypatch, output_dir, export):
+    monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', output_dir)
+    output_dir.mkdir(exist_ok=True)
+    return fub_to_sierra.process_file_with_chunks(export)
+
+
+def crash_after(monkeypatch, rows, real_convert=fub_to_sierra.convert_row):
+    """Make convert_row fail after a number of rows, like a killed process."""
+    calls = []
+
+    def convert(fub_row, fub_cols=None):
+        calls.append(fub_row)
+        if len(calls) > rows:
+            raise MemoryError('killed')
+        return real_convert(fub_row, fub_cols)
+
+    monkeypatch.setattr(fub_to_sierra, 'convert_row', convert)
+    return calls
+
+
+def snapshot(directory):
+    return {p.name: p.read_bytes() for p in directory.iterdir() if not p.name.startswith('.')}
+
+
+class TestResume:
+    """Test interrupted CLI conversions."""
+
+    def test_resume_produces_identical_output(self, tmp_path, monkeypatch, cli_env):
+        """Test a resumed run skips finished chunks and writes the same files."""
+        expected_files, _ = run_into(monkeypatch, tmp_path / 'clean', cli_env)
+
+        out = tmp_path / 'out'
+        crash_after(monkeypatch, 12)
+        with pytest.raises(MemoryError):
+            run_into(monkeypatch, out, cli_env)
+        assert checkpoint_path(out, cli_env).exists()
+
+        calls = crash_after(monkeypatch, 1000)
+        files, total = run_into(monkeypatch, out, cli_env)
+
+        assert len(calls) == 13     # only rows after the second completed chunk
+        assert total == 23
+        assert files == expected_files
+        assert snapshot(out) == snapshot(tmp_path / 'clean')
+        assert not checkpoint_path(out, cli_env).exists()
+
+    def test_resume_reports_on_whole_file(self, tmp_path, monkeypatch, cli_env):
+        """Test stage counts saved with the checkpoint carry into the resumed run's reports."""
+        reports = []
+        monkeypatch.setattr(fub_to_sierra, 'print_stage_reports',
+                            lambda stages: reports.append([stage.report() for stage in stages]))
+        run_into(monkeypatch, tmp_path / 'clean', cli_env)
+
+        crash_after(monkeypatch, 12)
+        with pytest.raises(MemoryError):
+            run_into(monkeypatch, tmp_path / 'out', cli_env)
+        crash_after(monkeypatch, 1000)
+        run_into(monkeypatch, tmp_path / 'out', cli_env)
+
+        clean, resumed = reports
+        assert resumed == clean
+        assert any(report.get('rows') == 23 for report in clean)
+
+    def test_changed_input_starts_over(self, tmp_path, monkeypatch, cli_env):
+        """Test a checkpoint for an older version of the file is ignored."""
+        out = tmp_path / 'out'
+        crash_after(monkeypatch, 7)
+        with pytest.raises(MemoryError):
+            run_into(monkeypatch, out, cli_env)
+
+        calls = crash_after(monkeypatch, 1000)
+        cli_env.write_text(CSV_TEXT + 'Late,late@example.com,\n')
+        os.utime(cli_env, ns=(1, 1))
+        files, total = run_into(monkeypatch, out, cli_env)
+        assert total == 24
+        assert len(calls) == 24
+
+    def test_delta_resume_matches_uninterrupted_index(self, tmp_path, monkeypatch, cli_env):
+        """Test delta leads recorded before the crash are kept in the saved index."""
+        monkeypatch.setattr(fub_to_sierra, 'DELTA_MODE', True)
+        monkeypatch.setattr(fub_to_sierra, 'DELTA_INDEX_PATH', tmp_path / 'clean.idx')
+        run_into(monkeypatch, tmp_path / 'clean', cli_env)
+
+        monkeypatch.setattr(fub_to_sierra, 'DELTA_INDEX_PATH', tmp_path / 'resumed.idx')
+        crash_after(monkeypatch, 17)
+        with pytest.raises(MemoryError):
+            run_into(monkeypatch, tmp_path / 'out', cli_env)
+        crash_after(monkeypatch, 1000)
+        run_into(monkeypatch, tmp_path / 'out', cli_env)
+
+        clean = DeltaIndex.load(tmp_path / 'clean.idx')
+        resumed = DeltaIndex.load(tmp_path / 'resumed.idx')
+        assert list(resumed.keys) == list(clean.keys)
+        assert list(resumed.fingerprints) == list(clean.fingerprints)
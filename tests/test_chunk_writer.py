@@ -0,0 +1,222 @@
+"""
+Tests for balanced and partitioned chunk writing
+Ensures chunk sizes even out and per-agent/source series stay separate
+"""
+
+import csv
+import json
+
+import pytest
+import fub_to_sierra
+from chunk_writer import (PARTITION_SLUG_MAX, ChunkWriter, PartitionedChunkWriter,
+                          WriteBehindChunkWriter, balanced_chunk_size)
+from export_reader import estimate_row_count
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+class TestBalancedChunks:
+    """Test even chunk sizing."""
+
+    def test_balanced_chunk_size(self):
+        """Test 5,100 rows split into two equal chunks, small files untouched."""
+        assert balanced_chunk_size(5100) == 2550
+        assert balanced_chunk_size(10001) == 3334
+        assert balanced_chunk_size(4000) == 5000
+        assert balanced_chunk_size(None) == 5000
+
+    def test_estimate_row_count(self, tmp_path):
+        """Test newline counting with and without a trailing newline."""
+        path = tmp_path / 'rows.csv'
+        path.write_text("a,b\n1,2\n3,4")
+        assert estimate_row_count(path) == 2
+        path.write_text("a,b\n1,2\n3,4\n")
+        assert estimate_row_count(path) == 2
+
+    def test_cli_balanced_chunks(self, tmp_path, monkeypatch):
+        """Test the CLI evens out chunks when BALANCE_CHUNKS is set."""
+        monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', tmp_path)
+        monkeypatch.setattr(fub_to_sierra, 'SIERRA_MAX_ROWS', 10)
+        monkeypatch.setattr(fub_to_sierra, 'BALANCE_CHUNKS', True)
+        export = tmp_path / 'export.csv'
+        export.write_text("First Name,Email\n" + "".join(f"P{i},p{i}@example.com\n" for i in range(12)))
+
+        files, total = fub_to_sierra.process_file_with_chunks(export)
+        assert total == 12
+        assert [count for _, count in files] == [6, 6]
+
+
+class TestPartitionedChunks:
+    """Test routing rows into per-value chunk series."""
+
+    def test_partition_by_agent_rotates_per_series(self, tmp_path):
+        """Test each agent gets its own chunk series and names."""
+        rows = [{'Assigned Agent': agent, 'Email': f'{agent}{i}@x.com'}
+                for i in range(3) for agent in ('Sarah Johnson', 'Mike Chen', '')]
+        with PartitionedChunkWriter(tmp_path, 'out', ['Assigned Agent', 'Email'],
+                                    'Assigned Agent', max_rows=2) as writer:
+            writer.write_rows(rows)
+
+        assert writer.files == [
+            ('out-sarah-johnson-sierra-chunk1.csv', 2), ('out-sarah-johnson-sierra-chunk2.csv', 1),
+            ('out-mike-chen-sierra-chunk1.csv', 2), ('out-mike-chen-sierra-chunk2.csv', 1),
+            ('out-unassigned-sierra-chunk1.csv', 2), ('out-unassigned-sierra-chunk2.csv', 1),
+        ]
+
+    def test_bounded_handles_reopen_in_append_mode(self, tmp_path):
+        """Test evicted partitions keep writing to the same file without a second header."""
+        rows = [{'Lead Source': source, 'Email': f'{source}{i}'}
+                for i in range(4) for source in ('Zillow', 'Facebook', 'Referral')]
+        with PartitionedChunkWriter(tmp_path, 'out', ['Lead Source', 'Email'], 'Lead Source',
+                                    max_rows=100, max_open_files=1) as writer:
+            writer.write_rows(rows)
+
+        assert writer.files == [('out-zillow-sierra.csv', 4), ('out-facebook-sierra.csv', 4),
+                                ('out-referral-sierra.csv', 4)]
+        assert [r['Email'] for r in read_csv(tmp_path / 'out-zillow-sierra.csv')] == \
+            ['Zillow0', 'Zillow1', 'Zillow2', 'Zillow3']
+
+    def test_partition_by_first_tag(self, tmp_path):
+        """Test Tags partitions on the first tag of each row."""
+        with PartitionedChunkWriter(tmp_path, 'out', ['Tags'], 'Tags') as writer:
+            writer.write_rows([{'Tags': 'Hot Lead; Buyer'}, {'Tags': 'Buyer'}])
+        assert [name for name, _ in writer.files] == ['out-hot-lead-sierra.csv', 'out-buyer-sierra.csv']
+
+    def test_colliding_slugs_get_separate_series(self, tmp_path):
+        """Test values sharing a slug are not merged and long values get short names."""
+        agents = ['Mary Ann', 'Mary-Ann', "O'Brien", 'O Brien', 'Mary Ann', 'x' * 300]
+        with PartitionedChunkWriter(tmp_path, 'out', ['Assigned Agent'], 'Assigned Agent') as writer:
+            writer.write_rows({'Assigned Agent': agent} for agent in agents)
+
+        names = [name for name, _ in writer.files]
+        assert [rows for _, rows in writer.files] == [2, 1, 1, 1, 1]
+        assert names[0] == 'out-mary-ann-sierra.csv'
+        assert names[1].startswith('out-mary-ann-') and names[1] != names[0]
+        assert names[2] == 'out-o-brien-sierra.csv' != names[3]
+        assert names[4] == f"out-{'x' * PARTITION_SLUG_MAX}-sierra.csv"
+        assert [r['Assigned Agent'] for r in read_csv(tmp_path / names[1])] == ['Mary-Ann']
+
+    def test_unknown_partition_column_rejected(self, tmp_path):
+        """Test partitioning is limited to the supported columns."""
+        with pytest.raises(ValueError):
+            PartitionedChunkWriter(tmp_path, 'out', ['Email'], 'Email')
+
+
+class TestWriteBehindChunks:
+    """Test writing chunks on a background thread."""
+
+    def test_same_files_as_chunk_writer(self, tmp_path):
+        """Test chunks rotate and match ChunkWriter's bytes, dicts and tuples alike."""
+        fields = ['Full Name', 'Email', 'Add to Import Note']
+        rows = [{'Full Name': f'P{i}', 'Email': f'p{i}@x.com', 'Add to Import Note': 'a, "b"\nc'}
+                for i in range(7)]
+        (tmp_path / 'sync').mkdir()
+        (tmp_path / 'behind').mkdir()
+        with ChunkWriter(tmp_path / 'sync', 'out', fields, max_rows=3) as writer:
+            writer.write_rows(rows)
+        with WriteBehindChunkWriter(tmp_path / 'behind', 'out', fields, max_rows=3,
+                                    batch_rows=2, queue_depth=1) as behind:
+            behind.write_rows(rows[:4])
+            behind.write_rows([tuple(row.values()) for row in rows[4:]])
+
+        assert behind.files == writer.files == [('out-sierra-chunk1.csv', 3),
+                                                ('out-sierra-chunk2.csv', 3),
+                                                ('out-sierra-chunk3.csv', 1)]
+        assert behind.total_rows == 7
+        for name, _ in writer.files:
+            assert (tmp_path / 'behind' / name).read_bytes() == (tmp_path / 'sync' / name).read_bytes()
+
+    def test_single_chunk_renamed(self, tmp_path):
+        """Test a lone chunk gets the plain name once the writer thread finishes."""
+        with WriteBehindChunkWriter(tmp_path, 'out', ['Email']) as writer:
+            writer.write({'Email': 'a@x.com'})
+        assert writer.files == [('out-sierra.csv', 1)]
+        assert read_csv(tmp_path / 'out-sierra.csv') == [{'Email': 'a@x.com'}]
+
+    def test_writer_error_raised(self, tmp_path):
+        """Test a failure on the writer thread surfaces in the caller."""
+        writer = WriteBehindChunkWriter(tmp_path / 'missing', 'out', ['Email'], batch_rows=1)
+        with pytest.raises(FileNotFoundError):
+            for i in range(100):
+                writer.write({'Email': f'{i}@x.com'})
+            writer.close()
+
+    def test_caller_error_not_masked(self, tmp_path):
+        """Test a with block failing keeps its own exception and leaves chunks unfinished."""
+        with pytest.raises(KeyError):
+            with WriteBehindChunkWriter(tmp_path / 'missing', 'out', ['Email'], batch_rows=1) as writer:
+                writer.write({'Email': 'a@x.com'})
+                raise KeyError('conversion failed')
+        assert writer.files == [('out-sierra-chunk1.csv', 1)]
+
+        with pytest.raises(KeyError):
+            with WriteBehindChunkWriter(tmp_path, 'out', ['Email']) as writer:
+                writer.write({'Email': 'a@x.com'})
+                raise KeyError('conversion failed')
+        assert not (tmp_path / 'out-sierra.csv').exists()
+
+    def test_cli_uses_write_behind(self, tmp_path, monkeypatch):
+        """Test CLI chunk output is the same with and without write-behind."""
+        monkeypatch.setattr(fub_to_sierra, 'SIERRA_MAX_ROWS', 5)
+        export = tmp_path / 'export.csv'
+        export.write_text("First Name,Email\n" + "".join(f"P{i},p{i}@example.com\n" for i in range(12)))
+        outputs = []
+        for write_behind in (True, False):
+            monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', tmp_path / str(write_behind))
+            monkeypatch.setattr(fub_to_sierra, 'WRITE_BEHIND', write_behind)
+            (tmp_path / str(write_behind)).mkdir()
+            files, total = fub_to_sierra.process_file_with_chunks(export)
+            assert total == 12
+            outputs.append([(tmp_path / str(write_behind) / name).read_bytes() for name, _ in files])
+        assert len(outputs[0]) == 3
+        assert outputs[0] == outputs[1]
+
+
+class TestUploadChunkOptions:
+    """Test chunking options on the upload endpoint."""
+
+    def test_upload_balanced_chunks(self, client, tmp_path, column_mapping):
+        """Test 5,100 rows become two 2,550-row chunks when balanced."""
+        csv_file = tmp_path / "big.csv"
+        csv_file.write_text("First Name,Email\n"
+                            + "".join(f"P{i},p{i}@example.com\n" for i in range(5100)))
+        with open(csv_file, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'big.csv'),
+                'column_mapping': json.dumps(column_mapping),
+                'balance_chunks': 'true',
+            }, content_type='multipart/form-data')
+
+        json_data = response.get_json()
+        assert json_data['success'] is True
+        assert [f['rows'] for f in json_data['files']] == [2550, 2550]
+        assert len(json_data['preview']) == 100
+
+    def test_upload_partition_by_source(self, client, sample_csv_file, column_mapping):
+        """Test per-source files are produced and reported."""
+        with open(sample_csv_file, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'contacts.csv'),
+                'column_mapping': json.dumps(column_mapping),
+                'partition_by': 'Lead Source',
+            }, content_type='multipart/form-data')
+
+        files = response.get_json()['files']
+        assert [f['filename'] for f in files] == [
+            'contacts-zillow-sierra.csv', 'contacts-realtor-com-sierra.csv',
+            'contacts-facebook-sierra.csv',
+        ]
+
+    def test_upload_rejects_unknown_partition(self, app, client, sample_csv_file, column_mapping):
+        """Test an unsupported partition column returns an error and leaves no upload behind."""
+        with open(sample_csv_file, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'contacts.csv'),
+                'column_mapping': json.dumps(column_mapping),
+                'partition_by': 'Email',
+            }, content_type='multipart/form-data')
+        assert response.get_json()['success'] is False
+        assert list(app.config['UPLOAD_FOLDER'].iterdir()) == []
@@ -0,0 +1,111 @@
+"""
+Tests for the non-interactive command line
+Ensures batch runs, the stdin/stdout filter and exit codes work without prompts
+"""
+
+import csv
+import io
+import json
+
+import pytest
+import fub_to_sierra
+
+
+@pytest.fixture(autouse=True)
+def restore_settings(monkeypatch):
+    """cli() rewrites module config; let monkeypatch put it back after each test."""
+    for name in fub_to_sierra._CLI_SETTINGS:
+        monkeypatch.setattr(fub_to_sierra, name, getattr(fub_to_sierra, name))
+
+
+@pytest.fixture
+def exports(tmp_path):
+    """Write two small FUB exports into an input directory."""
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir()
+    for name, count in (('a.csv', 3), ('b.csv', 5)):
+        lines = ['First Name,Email'] + [f'P{i},p{i}@{name}.com' for i in range(count)]
+        (input_dir / name).write_text('\n'.join(lines) + '\n')
+    (input_dir / 'notes.txt').write_text('ignored')
+    return input_dir
+
+
+class TestBatchMode:
+    """Test converting files from arguments."""
+
+    def test_glob_and_chunk_size(self, tmp_path, exports):
+        """Test globbed inputs are converted into the output dir with the given chunk size."""
+        out = tmp_path / 'out'
+        code = fub_to_sierra.cli([str(exports / '*.csv'), '-o', str(out), '-n', '2'])
+
+        assert code == fub_to_sierra.EXIT_OK
+        assert sorted(p.name for p in out.iterdir()) == [
+            'a-sierra-chunk1.csv', 'a-sierra-chunk2.csv',
+            'b-sierra-chunk1.csv', 'b-sierra-chunk2.csv', 'b-sierra-chunk3.csv',
+        ]
+
+    def test_directory_input_and_merge(self, tmp_path, exports):
+        """Test a directory expands to its exports and --merge combines them."""
+        out = tmp_path / 'out'
+        code = fub_to_sierra.cli([str(exports), '-o', str(out), '--merge'])
+
+        assert code == fub_to_sierra.EXIT_OK
+        assert [p.name for p in out.iterdir()] == ['merged-sierra.csv']
+
+    def test_mapping_file_overrides_columns(self, tmp_path):
+        """Test a mapping file renames only the keys it gives."""
+        export = tmp_path / 'export.csv'
+        export.write_text('Given,Email\nJane,jane@example.com\n')
+        mapping = tmp_path / 'mapping.json'
+        mapping.write_text(json.dumps({'first_name': 'Given'}))
+
+        out = tmp_path / 'out'
+        assert fub_to_sierra.cli([str(export), '-o', str(out), '-m', str(mapping)]) == 0
+        with open(out / 'export-sierra.csv', newline='', encoding='utf-8') as f:
+            row = next(csv.DictReader(f))
+        assert row['First Name'] == 'Jane'
+        assert row['Email'] == 'jane@example.com'
+
+    def test_exit_codes(self, tmp_path, exports):
+        """Test failures, usage errors and missing inputs map to distinct exit codes."""
+        (exports / 'broken.xlsx').write_text('not a workbook')
+        out = str(tmp_path / 'out')
+        assert fub_to_sierra.cli([str(exports), '-o', out]) == fub_to_sierra.EXIT_FAILED
+        assert fub_to_sierra.cli([str(tmp_path / 'none*.csv'), '-o', out]) == fub_to_sierra.EXIT_NO_INPUT
+
+        bad_mapping = tmp_path / 'bad.json'
+        bad_mapping.write_text('["First Name"]')
+        assert fub_to_sierra.cli([str(exports), '-m', str(bad_mapping)]) == fub_to_sierra.EXIT_USAGE
+
+        with pytest.raises(SystemExit) as exc:
+            fub_to_sierra.cli([str(exports), '--chunk-size', '6000'])
+        assert exc.value.code == fub_to_sierra.EXIT_USAGE
+
+
+class TestFilterMode:
+    """Test streaming stdin to stdout."""
+
+    def test_stdin_to_stdout(self, monkeypatch):
+        """Test '-' converts stdin into one Sierra CSV on stdout."""
+        stdin = io.BytesIO(b'First Name,Last Name,Phone\nJohn,Doe,5551234567\n')
+        stdout = io.BytesIO()
+        fub_to_sierra.apply_settings({'DELTA_MODE': False})
+
+        assert fub_to_sierra.run_filter(stdin, stdout) == fub_to_sierra.EXIT_OK
+        rows = list(csv.DictReader(io.StringIO(stdout.getvalue().decode('utf-8'))))
+        assert rows[0]['Full Name'] == 'John Doe'
+        assert rows[0]['Phone'] == '(555) 123-4567'
+
+    @pytest.mark.parametrize('option', [['--dedupe'], ['--delta'], ['--partition-by', 'Tags'],
+                                        ['--workers', '2']])
+    def test_merge_rejects_unsupported_options(self, tmp_path, exports, option):
+        """Test --merge refuses options its single combined pass would ignore."""
+        with pytest.raises(SystemExit) as exc:
+            fub_to_sierra.cli([str(exports), '-o', str(tmp_path / 'out'), '--merge', *option])
+        assert exc.value.code == fub_to_sierra.EXIT_USAGE
+        assert not (tmp_path / 'out').exists()
+
+    def test_stdin_rejects_multi_pass_options(self):
+        """Test options that need files cannot be used with stdin."""
+        with pytest.raises(SystemExit):
+            fub_to_sierra.cli(['-', '--dedupe'])
@@ -0,0 +1,130 @@
+"""
+Tests for the data quality profile
+Ensures single-pass counters and top-value sketches report the output correctly
+"""
+
+import json
+
+import pytest
+import fub_to_sierra
+from data_profile import DataProfile, TopK
+from email_normalizer import EmailNormalizer
+
+COLUMNS = ('Email', 'Secondary Email', 'Phone', 'Secondary Phone',
+           'Lead Source', 'Assigned Agent', 'Tags')
+
+
+def make_row(**fields):
+    row = dict.fromkeys(COLUMNS, '')
+    row.update({k.replace('_', ' '): v for k, v in fields.items()})
+    return row
+
+
+class TestTopK:
+    """Test the bounded heavy-hitters sketch."""
+
+    def test_exact_under_capacity(self):
+        """Test counts are exact while distinct values fit in the counters."""
+        sketch = TopK(capacity=4)
+        for value in 'aaabbc':
+            sketch.add(value)
+        assert sketch.top(2) == [['a', 3], ['b', 2]]
+
+    def test_heavy_hitter_survives_many_distinct_values(self):
+        """Test a frequent value stays on top while memory stays bounded."""
+        sketch = TopK(capacity=8)
+        for i in range(1000):
+            sketch.add('Zillow' if i % 3 == 0 else f'one-off-{i}')
+        assert len(sketch.counts) <= 8
+        assert sketch.top(1)[0][0] == 'Zillow'
+
+    def test_merge_keeps_capacity(self):
+        """Test merged sketches add counts and drop back to capacity."""
+        left, right = TopK(capacity=2), TopK(capacity=2)
+        for value in 'aaab':
+            left.add(value)
+        for value in 'aacc':
+            right.add(value)
+        left.merge(right)
+        assert len(left.counts) <= 2
+        assert left.top(1)[0][0] == 'a'
+
+
+class TestDataProfile:
+    """Test the streaming profile of converted rows."""
+
+    def test_report_counts(self):
+        """Test fill rates, invalid values and top values in one pass."""
+        profile = DataProfile(COLUMNS)
+        rows = [
+            make_row(Email='a@example.com', Phone='(555) 123-4567', Lead_Source='Zillow',
+                     Assigned_Agent='Kim', Tags='buyer; hot'),
+            make_row(Email='not-an-email', Phone='12345', Lead_Source='Zillow', Tags='buyer'),
+            make_row(Secondary_Phone='555-12', Lead_Source='Facebook'),
+        ]
+        assert list(profile.wrap(iter(rows))) == rows
+
+        report = profile.report()
+        assert report['rows'] == 3
+        assert report['missing_email'] == 1
+        assert report['invalid_phones'] == 2
+        assert report['invalid_emails'] == 1
+        assert report['fill_rate']['Lead Source'] == 1.0
+        assert report['fill_rate']['Email'] == pytest.approx(0.667)
+        assert report['top_sources'] == [['Zillow', 2], ['Facebook', 1]]
+        assert report['top_agents'] == [['Kim', 1]]
+        assert report['top_tags'] == [['buyer', 2], ['hot', 1]]
+        json.dumps(report)
+
+    def test_empty_profile(self):
+        """Test a profile of no rows reports zeros rather than dividing by zero."""
+        report = DataProfile(COLUMNS).report()
+        assert report['rows'] == 0
+        assert set(report['fill_rate'].values()) == {0.0}
+
+
+class TestConversionReports:
+    """Test the report is produced alongside conversions."""
+
+    def test_cli_prints_summary(self, tmp_path, monkeypatch, capsys):
+        """Test a chunked CLI conversion prints the quality summary."""
+        monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', tmp_path / 'out')
+        monkeypatch.setattr(fub_to_sierra, 'VERBOSE', False)
+        (tmp_path / 'out').mkdir()
+        export = tmp_path / 'export.csv'
+        export.write_text('First Name,Email,Phone,Source\n'
+                          'Ann,ann@example.com,5551234567,Zillow\n'
+                          'Bob,,12,Zillow\n')
+        fub_to_sierra.process_file_with_chunks(export)
+
+        output = capsys.readouterr().out
+        assert '1 of 2 rows without an email, 1 unformatted phones' in output
+        assert 'Top sources: Zillow (2)' in output
+
+    def test_rejected_emails_count_as_invalid_not_missing(self, tmp_path, monkeypatch):
+        """Test emails the normalizer rejects are reported as invalid, not as missing."""
+        monkeypatch.setattr(fub_to_sierra, 'VERBOSE', False)
+        export = tmp_path / 'export.csv'
+        export.write_text('First Name,Email\nAnn,bad@@x\nBob,\nCy,cy@gmial.com\n')
+        stages = fub_to_sierra.output_stages()
+        with fub_to_sierra.open_export(export) as reader:
+            list(fub_to_sierra.apply_stages(fub_to_sierra.convert_rows(reader), stages))
+
+        profile = next(s for s in stages if isinstance(s, DataProfile))
+        emails = next(s for s in stages if isinstance(s, EmailNormalizer))
+        report = profile.report()
+        assert report['invalid_emails'] == emails.stats['rejected'] == 1
+        assert report['missing_email'] == 1
+
+    def test_upload_returns_quality(self, client, sample_csv_file, column_mapping):
+        """Test /upload includes the report with the job."""
+        with open(sample_csv_file, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'test_contacts.csv'),
+                'column_mapping': json.dumps(column_mapping),
+            }, content_type='multipart/form-data')
+        data = response.get_json()
+        assert data['success'] is True
+        assert data['quality']['rows'] == 3
+        assert data['quality']['top_tags'][0] == ['buyer', 2]
+        assert any(line.startswith('Data quality:') for line in data['logs'])
@@ -0,0 +1,128 @@
+"""
+Tests for duplicate lead consolidation
+Ensures rows linked by shared emails or phones merge into a single lead
+"""
+
+import json
+
+import pytest
+from lead_dedup import UnionFind, dedupe_rows, merge_group, phone_key
+
+
+def make_row(**fields):
+    """Build a Sierra row with blanks for every unspecified column."""
+    row = {
+        'First Name': '', 'Last Name': '', 'Full Name': '', 'Email': '',
+        'Secondary Email': '', 'Phone': '', 'Secondary Phone': '',
+        'Lead Source': '', 'Assigned Agent': '', 'Street Address': '',
+        'City': '', 'State': '', 'Zip Code': '', 'Tags': '',
+        'Short Summary': '', 'Add to Import Note': '',
+    }
+    row.update({k.replace('_', ' '): v for k, v in fields.items()})
+    return row
+
+
+class TestUnionFind:
+    """Test the array-backed disjoint set."""
+
+    def test_union_links_transitively(self):
+        """Test a-b and b-c puts a and c in the same set."""
+        uf = UnionFind()
+        for _ in range(4):
+            uf.add()
+        uf.union(0, 1)
+        uf.union(1, 2)
+        assert uf.find(0) == uf.find(2)
+        assert uf.find(3) != uf.find(0)
+        assert uf.size[uf.find(0)] == 3
+
+
+class TestKeys:
+    """Test match key normalization."""
+
+    def test_phone_key_ignores_formatting_and_country_code(self):
+        """Test formatted and +1 phones produce the same key."""
+        assert phone_key("(555) 123-4567") == phone_key("+1 555.123.4567")
+
+    def test_phone_key_skips_short_numbers(self):
+        """Test numbers too short to identify a person are not linked."""
+        assert phone_key("123") == ""
+
+
+class TestDedupe:
+    """Test two-pass consolidation over a re-readable row source."""
+
+    def test_chain_of_shared_keys_merges_into_one_lead(self):
+        """Test rows linked only through a secondary email and a phone merge."""
+        rows = [
+            make_row(First_Name='John', Email='john@example.com', Phone='(555) 123-4567', Tags='buyer'),
+            make_row(Email='other@example.com', Secondary_Email='JOHN@example.com', Tags='investor'),
+            make_row(Email='third@example.com', Secondary_Phone='555-123-4567', Tags='buyer; hot'),
+            make_row(First_Name='Jane', Email='jane@example.com'),
+        ]
+        stats = {}
+        result = list(dedupe_rows(lambda: iter(rows), stats))
+
+        assert len(result) == 2
+        assert stats == {'input_rows': 4, 'output_rows': 2, 'merged_rows': 2}
+        merged = next(r for r in result if r['First Name'] == 'John')
+        assert merged['Tags'] == 'buyer; investor; hot'
+        assert merged['Email'] == 'john@example.com'
+        assert merged['Secondary Email'] == 'other@example.com'
+
+    def test_unrelated_rows_pass_through_unchanged(self):
+        """Test rows without shared keys are emitted as-is and in order."""
+        rows = [make_row(Email=f'p{i}@example.com') for i in range(5)]
+        result = list(dedupe_rows(lambda: iter(rows)))
+        assert result == rows
+
+    def test_rows_without_keys_are_never_merged(self):
+        """Test rows lacking email and phone are not lumped together."""
+        rows = [make_row(First_Name='A'), make_row(First_Name='B')]
+        assert len(list(dedupe_rows(lambda: iter(rows)))) == 2
+
+    def test_second_pass_mismatch_raises(self):
+        """Test a row source that changes between passes is rejected."""
+        rows = [make_row(Email='a@example.com'), make_row(Email='a@example.com')]
+        passes = iter([rows, rows[:1]])
+        with pytest.raises(ValueError):
+            list(dedupe_rows(lambda: iter(next(passes))))
+
+
+class TestMergeGroup:
+    """Test field-level merge rules."""
+
+    def test_notes_concatenated_and_blanks_filled(self):
+        """Test notes join in order and empty fields fill from later rows."""
+        merged = merge_group([
+            make_row(First_Name='John', Add_to_Import_Note='Notes: first'),
+            make_row(Last_Name='Doe', City='Austin', Add_to_Import_Note='Notes: second'),
+        ])
+        assert merged['Add to Import Note'] == 'Notes: first\n\nNotes: second'
+        assert merged['Last Name'] == 'Doe'
+        assert merged['City'] == 'Austin'
+
+
+class TestUploadDedupe:
+    """Test the dedupe option on the upload endpoint."""
+
+    def test_upload_with_dedupe_merges_rows(self, client, tmp_path, column_mapping):
+        """Test duplicate emails collapse when dedupe_leads is enabled."""
+        csv_file = tmp_path / "dupes.csv"
+        csv_file.write_text(
+            "First Name,Last Name,Email,Phone,Tags\n"
+            "John,Doe,john@example.com,5551234567,buyer\n"
+            "Johnny,Doe,JOHN@example.com,,seller\n"
+            "Jane,Smith,jane@example.com,5559876543,buyer\n"
+        )
+        with open(csv_file, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'dupes.csv'),
+                'column_mapping': json.dumps(column_mapping),
+                'dedupe_leads': 'true',
+            }, content_type='multipart/form-data')
+
+        json_data = response.get_json()
+        assert json_data['success'] is True
+        assert json_data['total_rows'] == 2
+        assert json_data['preview'][0]['Tags'] == 'buyer; seller'
@@ -0,0 +1,114 @@
+"""
+Tests for delta conversion against a previous export snapshot
+Ensures re-exports only emit leads that are new or changed
+"""
+
+from array import array
+
+import pytest
+import fub_to_sierra
+from delta_index import DeltaFilter, DeltaIndex, content_fingerprint, lead_key
+
+
+FUB_COLS = {
+    'first_name': 'First Name',
+    'last_name': 'Last Name',
+    'email': 'Email',
+    'phone': 'Phone',
+    'tags': 'Tags',
+}
+
+
+class TestDeltaIndex:
+    """Test the sorted-array fingerprint index."""
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        """Test an index survives a save/load cycle unchanged."""
+        index = DeltaIndex().merged_with(array('Q', [30, 10, 20]), array('Q', [3, 1, 2]))
+        path = tmp_path / 'delta.idx'
+        index.save(path)
+
+        loaded = DeltaIndex.load(path)
+        assert list(loaded.keys) == [10, 20, 30]
+        assert loaded.get(20) == 2
+        assert loaded.get(99) is None
+
+    def test_load_missing_file_returns_empty_index(self, tmp_path):
+        """Test the first run starts from an empty index."""
+        assert len(DeltaIndex.load(tmp_path / 'missing.idx')) == 0
+
+    def test_load_rejects_foreign_file(self, tmp_path):
+        """Test a non-index file is not silently misread."""
+        path = tmp_path / 'bogus.idx'
+        path.write_bytes(b'not an index')
+        with pytest.raises(ValueError):
+            DeltaIndex.load(path)
+
+    def test_merge_overrides_and_keeps_old_entries(self):
+        """Test new entries replace stored ones and unseen keys are kept."""
+        old = DeltaIndex(array('Q', [1, 2, 3]), array('Q', [10, 20, 30]))
+        merged = old.merged_with(array('Q', [2, 4, 2]), array('Q', [21, 40, 22]))
+        assert list(merged.keys) == [1, 2, 3, 4]
+        assert list(merged.fingerprints) == [10, 22, 30, 40]
+
+
+class TestDeltaFilter:
+    """Test new/changed/unchanged classification."""
+
+    def test_second_run_skips_unchanged_rows(self):
+        """Test only edited and added leads pass on the next run."""
+        first = [
+            {'First Name': 'John', 'Email': 'john@example.com', 'Tags': 'buyer'},
+            {'First Name': 'Jane', 'Email': 'jane@example.com', 'Tags': 'seller'},
+        ]
+        delta = DeltaFilter(DeltaIndex(), FUB_COLS)
+        assert all(delta(row) for row in first)
+        index = DeltaIndex().merged_with(delta.keys, delta.fingerprints)
+
+        second = [
+            {'First Name': 'John', 'Email': 'john@example.com', 'Tags': 'buyer'},
+            {'First Name': 'Jane', 'Email': 'jane@example.com', 'Tags': 'seller; hot'},
+            {'First Name': 'Bob', 'Email': 'bob@example.com', 'Tags': ''},
+        ]
+        delta = DeltaFilter(index, FUB_COLS)
+        assert [delta(row) for row in second] == [False, True, True]
+        assert delta.stats == {'new': 1, 'changed': 1, 'unchanged': 1, 'unkeyed': 0}
+
+    def test_modified_date_decides_when_mapped(self):
+        """Test content edits are ignored when Modified Date is unchanged."""
+        cols = dict(FUB_COLS, modified_date='Modified Date')
+        row = {'Email': 'a@example.com', 'Tags': 'x', 'Modified Date': '2024-01-01'}
+        edited = dict(row, Tags='y')
+        bumped = dict(row, **{'Modified Date': '2024-02-01'})
+
+        assert content_fingerprint(row, cols) == content_fingerprint(edited, cols)
+        assert content_fingerprint(row, cols) != content_fingerprint(bumped, cols)
+
+    def test_rows_without_identity_always_pass(self):
+        """Test rows with no email, phone or name are never dropped."""
+        delta = DeltaFilter(DeltaIndex(), FUB_COLS)
+        assert lead_key({'Tags': 'x'}, FUB_COLS) is None
+        assert delta({'Tags': 'x'}) is True
+        assert delta.stats['unkeyed'] == 1
+
+
+class TestCliDelta:
+    """Test delta mode in the CLI chunking pipeline."""
+
+    def test_rerun_emits_only_changed_rows(self, tmp_path, monkeypatch):
+        """Test an unchanged re-export produces no rows and an edit produces one."""
+        monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', tmp_path)
+        monkeypatch.setattr(fub_to_sierra, 'DELTA_MODE', True)
+        monkeypatch.setattr(fub_to_sierra, 'DELTA_INDEX_PATH', tmp_path / 'delta.idx')
+
+        export = tmp_path / 'export.csv'
+        export.write_text("First Name,Last Name,Email,Phone\n"
+                          "John,Doe,john@example.com,5551234567\n"
+                          "Jane,Smith,jane@example.com,5559876543\n")
+        assert fub_to_sierra.process_file_with_chunks(export)[1] == 2
+        assert fub_to_sierra.process_file_with_chunks(export)[1] == 0
+
+        export.write_text("First Name,Last Name,Email,Phone\n"
+                          "John,Doe,john@example.com,5551234567\n"
+                          "Jane,Smith-Jones,jane@example.com,5559876543\n")
+        assert fub_to_sierra.process_file_with_chunks(export)[1] == 1
@@ -0,0 +1,125 @@
+"""
+Tests for email normalization
+Ensures emails are lowercased, domain typos fixed and invalid addresses reported
+"""
+
+import json
+
+import email_normalizer
+import fub_to_sierra
+from email_normalizer import EmailNormalizer, normalize_domain, normalize_email
+from lead_dedup import email_key
+
+
+class TestNormalizeEmail:
+    """Test single-address normalization."""
+
+    def test_case_and_whitespace(self):
+        """Test addresses are trimmed and lowercased."""
+        assert normalize_email('  Jane.Doe@Example.COM ') == ('jane.doe@example.com', None)
+
+    def test_domain_typos(self):
+        """Test provider misspellings and impossible TLDs are corrected."""
+        assert normalize_email('bob@gmial.com') == ('bob@gmail.com', 'corrected')
+        assert normalize_email('bob@YAHO.com') == ('bob@yahoo.com', 'corrected')
+        assert normalize_email('bob@example.con') == ('bob@example.com', 'corrected')
+
+    def test_valid_domains_never_rewritten(self):
+        """Test real domains, including other providers', other TLDs' and IDNA ones, are kept."""
+        for domain in ('comcast.com', 'comcast.net', 'sbcglobal.com', 'sbcglobal.net', 'gmail.co',
+                       'yahoo.co', 'outlook.co', 'aol.co', 'gmail.com', 'example.co.uk',
+                       'bücher.de', 'example.xn--p1ai', 'пример.рф', 'xn--bcher-kva.de'):
+            assert normalize_email(f'jane@{domain}') == (f'jane@{domain}', None), domain
+        # A correction never lands on another entry of the table
+        targets = set(email_normalizer.DOMAIN_TYPOS.values())
+        assert not targets & set(email_normalizer.DOMAIN_TYPOS)
+
+    def test_utf8_local_part_accepted(self):
+        """Test internationalized local parts are kept, not rejected."""
+        assert normalize_email('José@Example.com') == ('josé@example.com', None)
+        assert normalize_email('jo\u00a0sé@example.com') == ('', 'rejected')
+
+    def test_invalid_addresses_rejected(self):
+        """Test syntax errors are rejected rather than passed through."""
+        for value in ('not-an-email', 'a@b', 'two@@example.com', 'a b@example.com',
+                      '.dot@example.com', 'x@-bad.com', 'a@example.com, b@example.com',
+                      'a@bü..de', 'a@example.xn--'):
+            assert normalize_email(value) == ('', 'rejected'), value
+
+    def test_blank(self):
+        """Test blanks stay blank without being counted as rejects."""
+        assert normalize_email('') == ('', None)
+        assert normalize_email('   ') == ('', None)
+
+    def test_domain_decisions_cached(self):
+        """Test each domain is checked once however many rows use it."""
+        normalize_domain.cache_clear()
+        for i in range(100):
+            normalize_email(f'user{i}@gmial.com')
+        info = normalize_domain.cache_info()
+        assert info.misses == 1 and info.hits == 99
+
+
+class TestEmailNormalizer:
+    """Test the row stage and its report."""
+
+    def test_rejects_move_to_import_note(self):
+        """Test invalid emails leave the email column, land in the note and are counted."""
+        normalizer = EmailNormalizer()
+        rows = [
+            {'Email': 'A@Gmial.com', 'Secondary Email': '', 'Add to Import Note': ''},
+            {'Email': 'oops', 'Secondary Email': 'ok@example.com', 'Add to Import Note': 'Notes: hi'},
+        ]
+        out = list(normalizer.wrap(rows))
+
+        assert out[0]['Email'] == 'a@gmail.com'
+        assert out[1]['Email'] == ''
+        assert out[1]['Add to Import Note'] == 'Notes: hi\n\nInvalid Email: oops'
+        assert normalizer.report() == {'corrected': 1, 'rejected': 1, 'rejected_samples': ['oops']}
+        json.dumps(normalizer.report())
+
+    def test_merge_caps_samples(self, monkeypatch):
+        """Test merged reports add counts but keep a bounded sample list."""
+        monkeypatch.setattr(email_normalizer, 'REJECT_SAMPLES', 2)
+        left, right = EmailNormalizer(), EmailNormalizer()
+        left.apply({'Email': 'bad1'})
+        right.apply({'Email': 'bad2', 'Secondary Email': 'bad3'})
+        left.merge(right)
+        assert left.stats['rejected'] == 3
+        assert left.rejected == ['bad1', 'bad2']
+
+    def test_dedupe_links_typo_domains(self):
+        """Test duplicate matching treats a typo domain like the real one."""
+        assert email_key('Jane@gmial.com') == email_key('jane@gmail.com')
+
+
+class TestConversion:
+    """Test normalization inside conversions."""
+
+    def test_cli_normalizes_and_can_be_disabled(self, tmp_path, monkeypatch):
+        """Test the CLI fixes emails by default and --keep-emails leaves them alone."""
+        for name in fub_to_sierra._CLI_SETTINGS:
+            monkeypatch.setattr(fub_to_sierra, name, getattr(fub_to_sierra, name))
+        export = tmp_path / 'export.csv'
+        export.write_text('First Name,Email\nAnn,Ann@Gmial.com\n')
+
+        fub_to_sierra.cli([str(export), '-o', str(tmp_path / 'fixed')])
+        assert 'ann@gmail.com' in (tmp_path / 'fixed' / 'export-sierra.csv').read_text()
+
+        fub_to_sierra.cli([str(export), '-o', str(tmp_path / 'kept'), '--keep-emails'])
+        assert 'Ann@Gmial.com' in (tmp_path / 'kept' / 'export-sierra.csv').read_text()
+
+    def test_upload_reports_email_fixes(self, client, tmp_path, column_mapping):
+        """Test /upload returns email counts with the quality report."""
+        export = tmp_path / 'contacts.csv'
+        export.write_text('First Name,Email\nAnn,ann@gmial.com\nBob,bob at example\n')
+        with open(export, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'contacts.csv'),
+                'column_mapping': json.dumps(column_mapping),
+            }, content_type='multipart/form-data')
+        data = response.get_json()
+        assert data['success'] is True
+        assert data['quality']['emails']['corrected'] == 1
+        assert data['quality']['emails']['rejected_samples'] == ['bob at example']
+        assert data['preview'][0]['Email'] == 'ann@gmail.com'
@@ -0,0 +1,69 @@
+"""
+Tests for the HTTP load-test harness
+Ensures mixed traffic runs cleanly against a live server and reports latency percentiles
+"""
+
+import json
+import os
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from web_app import loadtest
+
+
+@pytest.fixture
+def live_server(app):
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    thread.join()
+
+
+class TestLoadTest:
+    """Test the load generator and its report."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        assert loadtest.percentile(values, 50) == 50
+        assert loadtest.percentile(values, 99) == 99
+        assert loadtest.percentile([7], 95) == 7
+        assert loadtest.percentile([], 50) is None
+
+    def test_mixed_traffic(self, live_server, tmp_path):
+        """Test every request type succeeds and the report covers it."""
+        exports = [(rows, loadtest.make_export(tmp_path / f'{rows}.csv', rows).read_bytes())
+                   for rows in (5, 50)]
+        with loadtest.RssSampler(os.getpid()) as sampler:
+            results = loadtest.run_load(live_server, exports, users=3, total_requests=40)
+        report = loadtest.summarize(results, 1.0, sampler.samples)
+
+        assert report['total_requests'] == 40
+        assert report['error_rate'] == 0
+        assert {'detect_columns', 'download'} <= set(report['requests'])
+        assert any(label.startswith('upload ') for label in report['requests'])
+        for stats in report['requests'].values():
+            assert stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms'] <= stats['max_ms']
+        assert all(rss['peak'] >= rss['start'] > 0 for rss in report['worker_rss_mb'].values())
+
+    def test_download_zip_after_payment(self, live_server, tmp_path):
+        """Test a virtual user's session carries through upload, payment and ZIP download."""
+        data = loadtest.make_export(tmp_path / 'export.csv', 10).read_bytes()
+        user = loadtest.VirtualUser(live_server, [(10, data)], loadtest.random.Random(1))
+        assert user.run_one('upload')[3]
+        label, status, _, ok = user.run_one('download_zip')
+        assert (label, status, ok) == ('download_zip', 200, True)
+
+    def test_main_against_running_server(self, live_server, tmp_path, capsys):
+        """Test the command line tests a given URL and writes a JSON report."""
+        report_path = tmp_path / 'report.json'
+        assert loadtest.main(['--url', live_server, '-n', '10', '-u', '2', '--sizes', '20',
+                              '--json', str(report_path)]) == 0
+        report = json.loads(report_path.read_text())
+        assert report['total_requests'] == 10
+        assert report['error_rate'] == 0
+        assert 'p99 ms' in capsys.readouterr().out
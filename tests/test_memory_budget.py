@@ -0,0 +1,160 @@
+"""
+Tests for the conversion memory budget
+Ensures estimates drive the streaming fallback and streaming output matches in-memory output
+"""
+
+import json
+import logging
+import tracemalloc
+
+import fub_to_sierra
+import web_app.app as web_app
+from lead_dedup import DiskKeyIndex, dedupe_rows
+from memory_budget import (BASE_BYTES, DEDUPE_ROW_BYTES, DEDUPE_SPILL_ROW_BYTES, ROW_LOG_BYTES,
+                           MemoryPlan, PeakTracker, estimate_peak_bytes)
+
+DUPES_CSV = ("First Name,Last Name,Email,Phone,Tags\n"
+             "John,Doe,john@example.com,5551234567,buyer\n"
+             "Johnny,Doe,JOHN@example.com,,seller\n"
+             "Jane,Smith,jane@example.com,5559876543,buyer\n"
+             "J,Smith,,(555) 987-6543,hot\n"
+             "Bob,Jones,bob@example.com,,\n")
+
+
+def upload(client, csv_file, column_mapping, dedupe=False):
+    with open(csv_file, 'rb') as f:
+        return client.post('/upload', data={
+            'file': (f, csv_file.name),
+            'column_mapping': json.dumps(column_mapping),
+            'dedupe_leads': 'true' if dedupe else 'false',
+        }, content_type='multipart/form-data').get_json()
+
+
+class TestEstimate:
+    """Test peak estimates and the streaming decision."""
+
+    def test_estimate_per_row_costs(self, tmp_path):
+        """Test row logs and dedup each add their per-row cost."""
+        path = tmp_path / 'export.csv'
+        path.write_text("Email\n")
+        assert estimate_peak_bytes(path, 1000, row_logs=False) == BASE_BYTES
+        assert estimate_peak_bytes(path, 1000) == BASE_BYTES + 1000 * ROW_LOG_BYTES
+        assert estimate_peak_bytes(path, 1000, dedupe=True, row_logs=False) == \
+            BASE_BYTES + 1000 * DEDUPE_ROW_BYTES
+        assert estimate_peak_bytes(path, 1000, dedupe=True, row_logs=False, spill=True) == \
+            BASE_BYTES + 1000 * DEDUPE_SPILL_ROW_BYTES
+
+    def test_plan_switches_to_streaming_over_budget(self, tmp_path):
+        """Test the row scan feeds the estimate and only an exceeded budget streams."""
+        path = tmp_path / 'export.csv'
+        path.write_text(DUPES_CSV)
+        plan = MemoryPlan(path, None, dedupe=True)
+        assert plan.rows == 5
+        assert not plan.streaming
+        assert not MemoryPlan(path, plan.estimate).streaming
+        tight = MemoryPlan(path, plan.estimate - 1, dedupe=True)
+        assert tight.streaming
+        assert tight.streaming_estimate < tight.estimate
+        assert tight.streaming_estimate == BASE_BYTES + 5 * DEDUPE_SPILL_ROW_BYTES
+        assert 'streaming mode' in tight.summary_line()
+
+
+class TestPeakTracker:
+    """Test tracemalloc peak measurement."""
+
+    def test_measures_block_peak(self):
+        """Test a temporary allocation shows up in the peak and tracing is stopped after."""
+        with PeakTracker() as tracker:
+            data = bytearray(4 * 1024 * 1024)
+            del data
+        assert tracker.peak >= 4 * 1024 * 1024
+        assert not tracemalloc.is_tracing()
+        assert 'Measured peak allocation: 4.' in tracker.summary_line()
+
+    def test_nested_tracker_is_skipped(self):
+        """Test a tracker entered while another measures leaves tracing to the first."""
+        with PeakTracker() as outer:
+            with PeakTracker() as inner:
+                assert tracemalloc.is_tracing()
+            assert tracemalloc.is_tracing()
+        assert inner.peak is None
+        assert outer.peak is not None
+        assert not tracemalloc.is_tracing()
+        with PeakTracker() as again:
+            pass
+        assert again.peak is not None
+
+    def test_disabled(self):
+        """Test a disabled tracker does not trace."""
+        with PeakTracker(enabled=False) as tracker:
+            assert not tracemalloc.is_tracing()
+        assert tracker.peak is None
+
+
+class TestSpilledDedupe:
+    """Test dedup with its key index on disk."""
+
+    def test_disk_key_index(self, tmp_path):
+        """Test setdefault keeps the first index and the file is removed on close."""
+        index = DiskKeyIndex(tmp_path)
+        assert index.setdefault(hash('e:a@x.com'), 0) == 0
+        assert index.setdefault(hash('e:a@x.com'), 5) == 0
+        assert index.setdefault(-1, 7) == 7
+        index.close()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_spill_matches_in_memory(self):
+        """Test spilled and in-memory dedup produce the same leads."""
+        rows = [{'Email': f'p{i % 7}@x.com', 'Phone': f'555000{i % 5:04d}', 'Tags': str(i)}
+                for i in range(40)]
+        in_memory, spilled = {}, {}
+        assert list(dedupe_rows(lambda: iter(rows), in_memory)) == \
+            list(dedupe_rows(lambda: iter(rows), spilled, spill=True))
+        assert in_memory == spilled
+
+
+class TestStreamingFallback:
+    """Test the conversion entry points under a tight budget."""
+
+    def test_upload_streams_over_budget(self, client, tmp_path, column_mapping, monkeypatch):
+        """Test an over-budget upload drops the row log but converts identically."""
+        csv_file = tmp_path / 'dupes.csv'
+        csv_file.write_text(DUPES_CSV)
+        normal = upload(client, csv_file, column_mapping, dedupe=True)
+        monkeypatch.setattr(web_app, 'MEMORY_BUDGET_BYTES', 1)
+        streamed = upload(client, csv_file, column_mapping, dedupe=True)
+
+        assert streamed['success'] is True
+        assert streamed['preview'] == normal['preview']
+        assert streamed['total_rows'] == normal['total_rows'] == 3
+        assert any(line.startswith('Row 1:') for line in normal['logs'])
+        assert not any(line.startswith('Row ') for line in streamed['logs'])
+        assert any('streaming mode' in line for line in streamed['logs'])
+
+    def test_upload_traces_memory(self, client, sample_csv_file, column_mapping, monkeypatch, caplog):
+        """Test TRACE_MEMORY logs the measured peak beside the estimate."""
+        monkeypatch.setattr(web_app, 'TRACE_MEMORY', True)
+        with caplog.at_level(logging.INFO):
+            assert upload(client, sample_csv_file, column_mapping)['success'] is True
+        assert any('Measured peak allocation' in r.getMessage() and 'estimated' in r.getMessage()
+                   for r in caplog.records)
+        assert not tracemalloc.is_tracing()
+
+    def test_cli_dedupe_spills_over_budget(self, tmp_path, monkeypatch, capsys):
+        """Test the CLI spills dedup keys when over budget and writes the same chunks."""
+        export = tmp_path / 'dupes.csv'
+        export.write_text(DUPES_CSV)
+        for name in fub_to_sierra._CLI_SETTINGS:
+            monkeypatch.setattr(fub_to_sierra, name, getattr(fub_to_sierra, name))
+        fub_to_sierra.DEDUPE_LEADS = True
+        fub_to_sierra.VERBOSE = False
+        outputs = []
+        for budget in (None, 1):
+            fub_to_sierra.OUTPUT_DIR = tmp_path / str(budget)
+            fub_to_sierra.OUTPUT_DIR.mkdir()
+            fub_to_sierra.MEMORY_BUDGET = budget
+            files, total = fub_to_sierra.process_file_with_chunks(export)
+            assert total == 3
+            outputs.append((fub_to_sierra.OUTPUT_DIR / files[0][0]).read_bytes())
+        assert outputs[0] == outputs[1]
+        assert 'streaming mode' in capsys.readouterr().out
@@ -0,0 +1,81 @@
+"""
+Tests for streaming multi-file merge
+Ensures exports with differing headers combine into full Sierra chunks
+"""
+
+import csv
+
+import pytest
+import fub_to_sierra
+from chunk_writer import ChunkWriter
+from export_merge import resolve_header_mapping
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+class TestChunkWriter:
+    """Test the rotating streaming writer."""
+
+    def test_rotates_at_max_rows(self, tmp_path):
+        """Test chunks fill to max_rows before a new file starts."""
+        with ChunkWriter(tmp_path, 'out', ['A'], max_rows=2) as writer:
+            writer.write_rows({'A': str(i)} for i in range(5))
+
+        assert writer.files == [('out-sierra-chunk1.csv', 2),
+                                ('out-sierra-chunk2.csv', 2),
+                                ('out-sierra-chunk3.csv', 1)]
+        assert [r['A'] for r in read_csv(tmp_path / 'out-sierra-chunk3.csv')] == ['4']
+
+    def test_single_chunk_uses_plain_name(self, tmp_path):
+        """Test a file under the limit keeps the non-chunked name."""
+        with ChunkWriter(tmp_path, 'out', ['A'], max_rows=5, prefix='abc_') as writer:
+            writer.write({'A': '1'})
+
+        assert writer.files == [('out-sierra.csv', 1)]
+        assert (tmp_path / 'abc_out-sierra.csv').exists()
+        assert not (tmp_path / 'abc_out-sierra-chunk1.csv').exists()
+
+    def test_rejects_non_positive_chunk_size(self, tmp_path):
+        """Test a zero chunk size is refused up front."""
+        with pytest.raises(ValueError):
+            ChunkWriter(tmp_path, 'out', ['A'], max_rows=0)
+
+
+class TestHeaderMapping:
+    """Test per-file header reconciliation."""
+
+    def test_aliases_and_case_differences_resolve(self):
+        """Test alternate spellings map to the same internal keys."""
+        mapping, unused = resolve_header_mapping(
+            ['first name', 'E-mail Address', 'Mobile', 'Favorite Color'],
+            {'first_name': 'First Name', 'email': 'Email', 'phone': 'Phone'},
+        )
+        assert mapping == {'first_name': 'first name', 'email': 'E-mail Address', 'phone': 'Mobile'}
+        assert unused == ['Favorite Color']
+
+
+class TestMergeFiles:
+    """Test merging several exports through the CLI."""
+
+    def test_merge_produces_full_continuous_chunks(self, tmp_path, monkeypatch):
+        """Test rows from all files fill chunks back to back."""
+        monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', tmp_path)
+        monkeypatch.setattr(fub_to_sierra, 'SIERRA_MAX_ROWS', 4)
+
+        agent_a = tmp_path / 'agent_a.csv'
+        agent_a.write_text("First Name,Last Name,Email\n"
+                           + "".join(f"A{i},Doe,a{i}@example.com\n" for i in range(3)))
+        agent_b = tmp_path / 'agent_b.csv'
+        agent_b.write_text("Email Address,First Name,Phone Number\n"
+                           + "".join(f"b{i}@example.com,B{i},555123456{i}\n" for i in range(3)))
+
+        files, total = fub_to_sierra.merge_files_with_chunks([agent_a, agent_b])
+
+        assert total == 6
+        assert files == [('merged-sierra-chunk1.csv', 4), ('merged-sierra-chunk2.csv', 2)]
+        rows = read_csv(tmp_path / 'merged-sierra-chunk1.csv')
+        assert rows[3]['Email'] == 'b0@example.com'
+        assert rows[3]['Phone'] == '(555) 123-4560'
@@ -0,0 +1,147 @@
+"""
+Tests for the memory-mapped reader and record pre-scan
+Ensures mapped parsing, record counts and range splits match csv.DictReader
+"""
+
+import csv
+import io
+
+import pytest
+import fub_to_sierra
+import mmap_reader
+from export_reader import estimate_row_count, open_export
+from mmap_reader import MappedCsvReader, count_range_records, count_records, split_ranges
+
+
+CSV_TEXT = ('First Name,Email,Notes\r\n'
+            + ''.join(f'P{i},p{i}@example.com,"Said ""hi""\r\ncall {i}"\r\n' for i in range(40))
+            + 'Short\r\n'
+            + 'Long,x@example.com,note,extra\r\n')
+
+
+def dict_reader_rows(text):
+    return list(csv.DictReader(io.StringIO(text, newline='')))
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    """Use tiny blocks so records and quotes straddle block boundaries."""
+    monkeypatch.setattr(mmap_reader, 'MAP_BLOCK_BYTES', 64)
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / 'export.csv'
+    path.write_bytes(CSV_TEXT.encode('utf-8-sig'))
+    return path
+
+
+class TestPreScan:
+    """Test the quote-aware record scan."""
+
+    def test_count_records_ignores_quoted_newlines(self, export):
+        """Test multi-line notes count as one record."""
+        assert count_records(export) == 42
+        assert estimate_row_count(export) == 42
+
+    def test_count_without_trailing_newline_and_empty(self, tmp_path):
+        """Test the last unterminated record counts and empty files give 0."""
+        path = tmp_path / 'export.csv'
+        path.write_bytes(b'A\n1\n"2\n"')
+        assert count_records(path) == 2
+        path.write_bytes(b'')
+        assert count_records(path) == 0
+
+    def test_blank_lines_not_counted(self, tmp_path):
+        """Test blank lines are skipped like the readers skip them, quoted blanks are not."""
+        text = 'A,B\n\n1,x\r\n\r\n\n2,"y\n\n"\n""\n\n3,z'
+        path = tmp_path / 'export.csv'
+        path.write_bytes(text.encode('utf-8'))
+        assert count_records(path) == len(dict_reader_rows(text)) == 4
+        assert sum(count_range_records(path, split_ranges(path, 3))) == 4
+
+    def test_split_ranges_cover_all_records(self, export):
+        """Test ranges are contiguous and their counts add up."""
+        ranges = split_ranges(export, 4)
+        assert len(ranges) == 4
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert ranges[-1][1] == export.stat().st_size
+        assert sum(count_range_records(export, ranges)) == 42
+
+
+class TestMappedCsvReader:
+    """Test mapped parsing against csv.DictReader."""
+
+    def test_matches_dict_reader(self, export):
+        """Test BOM, CRLF, quoted newlines, short and long rows parse identically."""
+        with MappedCsvReader(export) as reader:
+            rows = list(reader)
+            assert reader.progress() == 1.0
+        assert reader.fieldnames == ['First Name', 'Email', 'Notes']
+        assert rows == dict_reader_rows(CSV_TEXT)
+
+    def test_ranges_read_back_the_whole_file(self, export):
+        """Test reading each range in turn yields every row exactly once."""
+        rows = []
+        for start, end in split_ranges(export, 5):
+            with MappedCsvReader(export, start, end) as reader:
+                rows.extend(reader)
+        assert rows == dict_reader_rows(CSV_TEXT)
+
+    def test_utf16_falls_back_to_text_io(self, tmp_path):
+        """Test encodings that cannot be mapped still open through open_export."""
+        path = tmp_path / 'export.csv'
+        path.write_bytes(CSV_TEXT.encode('utf-16'))
+        with pytest.raises(ValueError):
+            MappedCsvReader(path)
+        with open_export(path) as reader:
+            assert list(reader) == dict_reader_rows(CSV_TEXT)
+
+
+class TestParallelConversion:
+    """Test range-split conversion through the CLI."""
+
+    def test_parallel_matches_sequential(self, tmp_path, monkeypatch):
+        """Test worker ranges join into the same chunk files as a single pass."""
+        export = tmp_path / 'export.csv'
+        export.write_text(CSV_TEXT.split('Short')[0], encoding='utf-8', newline='')
+        monkeypatch.setattr(fub_to_sierra, 'SIERRA_MAX_ROWS', 10)
+        monkeypatch.setattr(fub_to_sierra, 'VERBOSE', False)
+        outputs = {}
+        for mode in ('sequential', 'parallel'):
+            out = tmp_path / mode
+            out.mkdir()
+            monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', out)
+            if mode == 'parallel':
+                assert fub_to_sierra.can_convert_in_parallel(export)
+                files, total = fub_to_sierra.process_file_parallel(export, 3)
+            else:
+                files, total = fub_to_sierra.process_file_with_chunks(export)
+            outputs[mode] = (files, total, {p.name: p.read_bytes() for p in out.iterdir()})
+
+        assert outputs['parallel'] == outputs['sequential']
+        assert outputs['parallel'][1] == 40
+
+    def test_parallel_matches_sequential_with_blank_lines(self, tmp_path, monkeypatch):
+        """Test blank lines do not shift the chunk each worker's rows land in."""
+        lines = ['First Name,Email'] + [f'P{i},p{i}@example.com' for i in range(40)]
+        for i in (35, 22, 9, 4):
+            lines.insert(i, '')
+        export = tmp_path / 'export.csv'
+        export.write_text('\n'.join(lines) + '\n\n', encoding='utf-8')
+        monkeypatch.setattr(fub_to_sierra, 'SIERRA_MAX_ROWS', 10)
+        monkeypatch.setattr(fub_to_sierra, 'VERBOSE', False)
+        assert estimate_row_count(export) == 40
+        outputs = {}
+        for mode in ('sequential', 'parallel'):
+            out = tmp_path / mode
+            out.mkdir()
+            monkeypatch.setattr(fub_to_sierra, 'OUTPUT_DIR', out)
+            if mode == 'parallel':
+                files, total = fub_to_sierra.process_file_parallel(export, 3)
+            else:
+                files, total = fub_to_sierra.process_file_with_chunks(export)
+            outputs[mode] = (files, total, {p.name: p.read_bytes() for p in out.iterdir()})
+
+        assert outputs['parallel'] == outputs['sequential']
+        assert [rows for _, rows in outputs['parallel'][0]] == [10, 10, 10, 10]
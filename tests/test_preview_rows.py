@@ -0,0 +1,89 @@
+"""
+Tests for paged preview rows
+Ensures the scrolling preview can fetch any page of a multi-file conversion
+"""
+
+import json
+
+import row_pager
+import web_app.app as web_app
+
+
+def upload(client, csv_file, column_mapping, **form):
+    with open(csv_file, 'rb') as f:
+        response = client.post('/upload', data={
+            'file': (f, csv_file.name),
+            'column_mapping': json.dumps(column_mapping),
+            **form,
+        }, content_type='multipart/form-data')
+    return response.get_json()
+
+
+def first_names(result):
+    column = result['columns'].index('First Name')
+    return [row[column] for row in result['rows']]
+
+
+class TestPreviewRows:
+    """Test the /preview_rows endpoint."""
+
+    def test_pages_span_chunk_files(self, client, large_csv_file, column_mapping, monkeypatch):
+        """Test pages match the source rows, including across the chunk boundary."""
+        monkeypatch.setattr(row_pager, 'INDEX_STRIDE', 7)
+        data = upload(client, large_csv_file, column_mapping)
+        assert data['success'] is True
+        assert data['preview_rows'] == 6000
+
+        for offset in (0, 123, 4990, 5995):
+            result = client.get(f'/preview_rows?offset={offset}&limit=10').get_json()
+            assert result['success'] is True
+            assert result['total_rows'] == 6000
+            expected = [f'Person{i}' for i in range(offset, min(offset + 10, 6000))]
+            assert first_names(result) == expected
+
+    def test_partitioned_pages_follow_file_order(self, client, tmp_path, column_mapping):
+        """Test the upload preview is page 0 and pages cover every row of a partitioned upload."""
+        csv_file = tmp_path / 'agents.csv'
+        csv_file.write_text('First Name,Source\n' + ''.join(
+            f'P{i},{"Zillow" if i % 2 else "Facebook"}\n' for i in range(300)))
+        data = upload(client, csv_file, column_mapping, partition_by='Lead Source')
+        assert len(data['files']) == 2
+
+        pages = [client.get(f'/preview_rows?offset={offset}&limit=100').get_json()
+                 for offset in (0, 100, 200)]
+        assert [row['First Name'] for row in data['preview']] == first_names(pages[0])
+        names = [name for page in pages for name in first_names(page)]
+        assert sorted(names) == sorted(f'P{i}' for i in range(300))
+        assert names[:3] == ['P0', 'P2', 'P4']
+
+    def test_limit_clamped(self, client, large_csv_file, column_mapping):
+        """Test oversized limits and offsets past the end are clamped."""
+        upload(client, large_csv_file, column_mapping)
+        result = client.get('/preview_rows?offset=0&limit=100000').get_json()
+        assert len(result['rows']) == web_app.PREVIEW_PAGE_MAX_ROWS
+
+        result = client.get('/preview_rows?offset=9000&limit=10').get_json()
+        assert result['success'] is True and result['rows'] == []
+
+    def test_no_conversion(self, client):
+        """Test 404 when the session has no converted files."""
+        response = client.get('/preview_rows')
+        assert response.status_code == 404
+        assert response.get_json()['success'] is False
+
+
+class TestRowPager:
+    """Test reading pages straight from chunk files."""
+
+    def test_index_cached_per_file_version(self, tmp_path, monkeypatch):
+        """Test the position index is reused until the file changes."""
+        monkeypatch.setattr(row_pager, 'INDEX_STRIDE', 2)
+        path = tmp_path / 'chunk.csv'
+        path.write_text('Name\n' + '\n'.join(f'row{i}' for i in range(9)) + '\n')
+
+        assert row_pager._file_index(path) is row_pager._file_index(path)
+        assert [row['Name'] for row in row_pager.read_page([(path, 9)], 5, 3)] == ['row5', 'row6', 'row7']
+
+        path.write_text('Name\nonly\n')
+        assert len(row_pager._file_index(path)) == 1
+        assert row_pager.read_page([(path, 1)], 0, 5) == [{'Name': 'only'}]
@@ -0,0 +1,124 @@
+"""
+Tests for the compact row store
+Ensures rows round-trip, write the same CSV as DictWriter and take far less memory
+"""
+
+import csv
+import io
+import tracemalloc
+
+import pytest
+import fub_to_sierra
+from lead_dedup import dedupe_rows
+from row_store import RowStore
+
+COLS = fub_to_sierra.SIERRA_COLS
+
+
+def make_rows(count):
+    rows = []
+    for i in range(count):
+        row = dict.fromkeys(COLS, '')
+        row.update({
+            'First Name': f'First{i}', 'Last Name': f'Last{i}', 'Full Name': f'First{i} Last{i}',
+            'Email': f'person{i}@example.com', 'Phone': f'512555{i:04d}',
+            'Street Address': f'{i} Main St', 'City': ['Austin', 'Dallas', 'Houston'][i % 3],
+            'State': 'TX', 'Zip Code': f'7870{i % 10}', 'Lead Source': ['Zillow', 'Website'][i % 2],
+            'Assigned Agent': ['Ann Agent', 'Bob Agent'][i % 2], 'Tags': 'Buyer',
+            'Add to Import Note': f'Imported from FUB; stage Lead; note {i}',
+        })
+        rows.append(row)
+    return rows
+
+
+class TestRowStore:
+    """Test storing and reading back rows."""
+
+    def test_round_trip(self):
+        """Test rows come back as equal dicts by index and by iteration."""
+        rows = make_rows(50)
+        rows[3]['Email'] = 'zoë@exämple.com'
+        store = RowStore(COLS)
+        store.extend(rows)
+        assert len(store) == 50
+        assert store[3] == rows[3]
+        assert store[-1] == rows[-1]
+        assert list(store) == rows
+        with pytest.raises(IndexError):
+            store[50]
+
+    def test_missing_and_extra_keys(self):
+        """Test missing columns read back blank and unknown keys are dropped."""
+        store = RowStore(COLS)
+        store.append({'First Name': 'Jane', 'Phone': None, 'Not A Column': 'x'})
+        row = store[0]
+        assert list(row) == COLS
+        assert row['First Name'] == 'Jane'
+        assert row['Phone'] == ''
+
+    def test_write_csv_matches_dict_writer(self, tmp_path):
+        """Test write_csv produces the same bytes as csv.DictWriter."""
+        rows = make_rows(20)
+        rows[0]['Add to Import Note'] = 'line one\nline "two", quoted'
+        expected = io.StringIO()
+        writer = csv.DictWriter(expected, fieldnames=COLS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+        store = RowStore(COLS)
+        store.extend(rows)
+        output = tmp_path / 'out.csv'
+        assert store.write_csv(output) == 20
+        assert output.read_bytes() == expected.getvalue().encode('utf-8')
+
+    def test_clear(self):
+        """Test clearing empties the store and it can be refilled."""
+        store = RowStore(COLS)
+        store.extend(make_rows(5))
+        store.clear()
+        assert len(store) == 0
+        store.append({'City': 'Austin'})
+        assert store[0]['City'] == 'Austin'
+
+    def test_memory_smaller_than_dicts(self):
+        """Test a store takes several times less memory than a list of dicts."""
+        rows = make_rows(2000)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        # Fresh strings, as a CSV reader would create for every row
+        as_dicts = [{col: value.encode().decode() for col, value in row.items()} for row in rows]
+        dict_bytes = tracemalloc.get_traced_memory()[0] - before
+        del as_dicts
+
+        before = tracemalloc.get_traced_memory()[0]
+        store = RowStore(COLS)
+        store.extend(rows)
+        store_bytes = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        assert store_bytes * 3 < dict_bytes
+
+
+class TestConvertedRows:
+    """Test the converters and dedup buffer using the store."""
+
+    def test_convert_returns_store(self, sample_csv_file, tmp_path):
+        """Test a whole-file conversion is held in a store and written from it."""
+        rows = fub_to_sierra.convert_fub_to_sierra(sample_csv_file, None)
+        assert isinstance(rows, RowStore)
+        output = tmp_path / 'out.csv'
+        fub_to_sierra.write_sierra_csv(output, rows)
+        with open(output, encoding='utf-8', newline='') as f:
+            assert list(csv.DictReader(f)) == list(rows)
+
+    def test_dedupe_buffers_in_store(self):
+        """Test duplicate groups still merge when buffered in the store."""
+        rows = make_rows(6)
+        rows[4]['Email'] = rows[1]['Email']
+        rows[4]['Tags'] = 'Seller'
+        merged = list(dedupe_rows(lambda: iter(rows)))
+        assert len(merged) == 5
+        group = [row for row in merged if row['First Name'] == 'First1'][0]
+        assert group['Tags'] == 'Buyer; Seller'
+        assert group['Secondary Phone'] == rows[4]['Phone']
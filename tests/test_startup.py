@@ -0,0 +1,56 @@
+"""
+Tests for web app cold-start cost
+Fails if time to first request regresses or heavy modules load at import
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Seconds from interpreter start of the import to the first /health response.
+# Generous for slow CI machines; override with FUB_STARTUP_BUDGET.
+STARTUP_BUDGET_SECONDS = float(os.getenv('FUB_STARTUP_BUDGET', '2.0'))
+
+# Modules that must only be imported when a request needs them
+LAZY_MODULES = ('stripe', 'pandas', 'sqlite3', 'xml.etree.ElementTree')
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import web_app.app as web_app
+status = web_app.app.test_client().get('/health').status_code
+print(json.dumps({
+    'seconds': time.perf_counter() - started,
+    'status': status,
+    'startup_seconds': web_app.app.config['STARTUP_SECONDS'],
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def cold_start(tmp_path):
+    """Import the app and serve one request in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), str(ROOT / 'src')]))
+    result = subprocess.run([sys.executable, '-c', _PROBE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+class TestColdStart:
+    """Test the import-time budget of the web app."""
+
+    def test_time_to_first_request(self, tmp_path):
+        """Test the app imports and answers its first request within the budget."""
+        # Best of two runs, so one slow run on a busy machine does not fail the build
+        runs = [cold_start(tmp_path) for _ in range(2)]
+        assert all(run['status'] == 200 for run in runs)
+        assert min(run['seconds'] for run in runs) < STARTUP_BUDGET_SECONDS
+        assert all(0 < run['startup_seconds'] <= run['seconds'] for run in runs)
+
+    def test_heavy_modules_load_lazily(self, tmp_path):
+        """Test optional heavy modules are not imported at startup."""
+        assert cold_start(tmp_path)['loaded'] == []
@@ -0,0 +1,115 @@
+"""
+Tests for fingerprinted static assets and response compression
+Ensures hashed URLs are immutable and gzip/brotli variants round-trip
+"""
+
+import gzip
+import json
+import re
+from pathlib import Path
+
+import pytest
+import static_assets
+from static_assets import AssetManifest, fingerprinted_name
+
+
+def asset_urls(html):
+    return re.findall(r'(?:href|src)="(/static/[^"]+)"', html)
+
+
+class TestAssetManifest:
+    """Test content-hashed naming."""
+
+    def test_names_follow_content(self, tmp_path):
+        """Test the hashed name changes when the file does and old names stop matching."""
+        (tmp_path / 'css').mkdir()
+        css = tmp_path / 'css' / 'site.css'
+        css.write_text('body { color: red; }')
+        manifest = AssetManifest(tmp_path).build()
+        first = manifest.url_name('css/site.css')
+        assert re.fullmatch(r'css/site\.[0-9a-f]{10}\.css', first)
+        assert manifest.lookup(first)[1] is True
+
+        css.write_text('body { color: blue; }' * 10)
+        second = manifest.url_name('css/site.css')
+        assert second != first
+        asset, fingerprinted = manifest.lookup('css/site.css')
+        assert asset.variants[None] == css.read_bytes() and not fingerprinted
+
+    def test_missing_and_escaping_paths(self, tmp_path):
+        """Test unknown files and paths outside the folder are not found."""
+        (tmp_path / 'static').mkdir()
+        (tmp_path / 'secret.txt').write_text('secret')
+        manifest = AssetManifest(tmp_path / 'static').build()
+        assert manifest.lookup('nope.css') == (None, False)
+        assert manifest.lookup('../secret.txt') == (None, False)
+        assert manifest.url_name('nope.css') == 'nope.css'
+
+    def test_fingerprinted_name(self):
+        """Test the hash goes before the extension."""
+        assert fingerprinted_name('js/app.js', 'abc') == 'js/app.abc.js'
+        assert fingerprinted_name('LICENSE', 'abc') == 'LICENSE.abc'
+
+
+class TestStaticRoutes:
+    """Test serving static files through the app."""
+
+    def test_pages_link_fingerprinted_assets(self, client):
+        """Test templates reference hashed CSS and JS that are cached for a year."""
+        urls = asset_urls(client.get('/').get_data(as_text=True))
+        assert any(re.search(r'/static/js/app\.[0-9a-f]{10}\.js$', url) for url in urls)
+        assert any(re.search(r'/static/css/styles\.[0-9a-f]{10}\.css$', url) for url in urls)
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert 'immutable' in response.headers['Cache-Control']
+            assert 'max-age=31536000' in response.headers['Cache-Control']
+
+    def test_gzip_variant(self, client, app):
+        """Test gzip is served when accepted and decompresses to the file."""
+        expected = (Path(app.root_path) / 'static' / 'js' / 'app.js').read_bytes()
+        response = client.get('/static/js/app.js', headers={'Accept-Encoding': 'gzip, deflate'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert 'no-cache' in response.headers['Cache-Control']
+        assert gzip.decompress(response.data) == expected
+
+        plain = client.get('/static/js/app.js')
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.data == expected
+        assert plain.headers['ETag'] != response.headers['ETag']
+
+        repeat = client.get('/static/js/app.js', headers={'If-None-Match': plain.headers['ETag']})
+        assert repeat.status_code == 304
+
+    @pytest.mark.skipif(static_assets.brotli is None, reason='brotli not installed')
+    def test_brotli_preferred(self, client, app):
+        """Test br is chosen over gzip when both are accepted."""
+        expected = (Path(app.root_path) / 'static' / 'css' / 'styles.css').read_bytes()
+        response = client.get('/static/css/styles.css', headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert static_assets.brotli.decompress(response.data) == expected
+
+    def test_unknown_asset_404(self, client):
+        """Test a missing static file returns 404."""
+        assert client.get('/static/js/missing.1234567890.js').status_code == 404
+
+
+class TestJsonCompression:
+    """Test on-the-fly compression of JSON responses."""
+
+    def test_upload_response_gzipped(self, client, sample_csv_file, column_mapping):
+        """Test the upload response (logs and preview) is gzipped when accepted."""
+        with open(sample_csv_file, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'test_contacts.csv'),
+                'column_mapping': json.dumps(column_mapping),
+            }, content_type='multipart/form-data', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.data))['success'] is True
+
+    def test_small_json_untouched(self, client):
+        """Test responses under the size threshold are sent uncompressed."""
+        health = client.get('/health', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in health.headers
+        assert health.get_json()['status'] == 'healthy'
@@ -0,0 +1,88 @@
+"""
+Tests for charset detection and streaming transcoding
+Ensures Excel re-saved exports (cp1252, UTF-16) convert instead of bouncing
+"""
+
+import io
+import json
+
+from transcode import decode_sample, detect_encoding, open_text
+
+
+CSV_TEXT = "First Name,Last Name,Email,City\nJosé,Muñoz,jose@example.com,San José\n"
+
+
+class TestDetectEncoding:
+    """Test encoding detection from the first block."""
+
+    def test_plain_ascii_is_utf8(self):
+        """Test ASCII content is read as UTF-8."""
+        assert detect_encoding(b"First Name,Email\n") == 'utf-8'
+
+    def test_utf8_bom(self):
+        """Test Excel's 'CSV UTF-8' BOM is recognised."""
+        assert detect_encoding(CSV_TEXT.encode('utf-8-sig')) == 'utf-8-sig'
+
+    def test_utf16_with_and_without_bom(self):
+        """Test UTF-16 is spotted by BOM or by its NUL byte pattern."""
+        assert detect_encoding(CSV_TEXT.encode('utf-16')) == 'utf-16'
+        assert detect_encoding(CSV_TEXT.encode('utf-16-le')) == 'utf-16-le'
+
+    def test_cp1252(self):
+        """Test bytes that are invalid UTF-8 fall back to cp1252."""
+        assert detect_encoding(CSV_TEXT.encode('cp1252')) == 'cp1252'
+
+    def test_utf8_character_split_at_block_end(self):
+        """Test a multi-byte character cut by the block boundary is tolerated."""
+        assert detect_encoding("abcé".encode('utf-8')[:-1]) == 'utf-8'
+
+
+class TestStreamingDecode:
+    """Test the streaming text reader."""
+
+    def test_open_text_transcodes_utf16(self, tmp_path):
+        """Test a UTF-16 file reads back as the original text."""
+        path = tmp_path / 'export.csv'
+        path.write_bytes(CSV_TEXT.encode('utf-16'))
+        text, encoding = open_text(path)
+        with text:
+            assert text.read() == CSV_TEXT
+        assert encoding == 'utf-16'
+
+    def test_late_cp1252_byte_does_not_abort_utf8_stream(self):
+        """Test a cp1252 byte after the sniffed block decodes instead of raising."""
+        data = b"Name\n" + b"a\n" * 40000 + "Caf\xe9\n".encode('latin-1')
+        text, encoding = open_text(io.BufferedReader(io.BytesIO(data)))
+        assert encoding == 'utf-8'
+        assert text.read().endswith("Café\n")
+
+    def test_decode_sample_drops_partial_last_line(self):
+        """Test an incomplete trailing line is not validated as a row."""
+        text, _ = decode_sample(b"a,b\n1,2\n3,")
+        assert text == "a,b\n1,2\n"
+
+
+class TestUploadEncodings:
+    """Test non-UTF-8 uploads through the Flask routes."""
+
+    def test_upload_cp1252_file(self, client, column_mapping):
+        """Test a cp1252 export converts and keeps accented names."""
+        data = {
+            'file': (io.BytesIO(CSV_TEXT.encode('cp1252')), 'export.csv'),
+            'column_mapping': json.dumps(column_mapping),
+        }
+        response = client.post('/upload', data=data, content_type='multipart/form-data')
+
+        json_data = response.get_json()
+        assert json_data['success'] is True
+        assert json_data['preview'][0]['Full Name'] == 'José Muñoz'
+        assert any('cp1252' in line for line in json_data['logs'])
+
+    def test_detect_columns_utf16_file(self, client):
+        """Test column detection reads a UTF-16 export."""
+        data = {'file': (io.BytesIO(CSV_TEXT.encode('utf-16')), 'export.csv')}
+        response = client.post('/detect_columns', data=data, content_type='multipart/form-data')
+
+        json_data = response.get_json()
+        assert json_data['success'] is True
+        assert json_data['columns'] == ['First Name', 'Last Name', 'Email', 'City']
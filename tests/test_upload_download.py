@@ -208,6 +208,82 @@ class TestFileDownload:
         assert original_filename in content_disp or 'sierra' in content_disp
 
 
+class TestDownloadValidators:
+    """Test conditional, ranged and offloaded downloads."""
+    
+    def upload(self, client, sample_csv_file, column_mapping):
+        with open(sample_csv_file, 'rb') as f:
+            data = {
+                'file': (f, 'test_contacts.csv'),
+                'column_mapping': json.dumps(column_mapping)
+            }
+            response = client.post('/upload', data=data, content_type='multipart/form-data')
+        return response.get_json()['files'][0]['path']
+    
+    def test_etag_and_not_modified(self, client, sample_csv_file, column_mapping):
+        """Test a repeat request with If-None-Match gets 304 and no body."""
+        file_path = self.upload(client, sample_csv_file, column_mapping)
+        first = client.get(f'/download/{file_path}')
+        etag = first.headers['ETag']
+        assert etag
+        
+        repeat = client.get(f'/download/{file_path}', headers={'If-None-Match': etag})
+        assert repeat.status_code == 304
+        assert repeat.data == b''
+    
+    def test_range_request(self, client, sample_csv_file, column_mapping):
+        """Test a byte range returns 206 with just those bytes."""
+        file_path = self.upload(client, sample_csv_file, column_mapping)
+        full = client.get(f'/download/{file_path}').data
+        
+        partial = client.get(f'/download/{file_path}', headers={'Range': 'bytes=0-9'})
+        assert partial.status_code == 206
+        assert partial.data == full[:10]
+        assert partial.headers['Content-Range'] == f'bytes 0-9/{len(full)}'
+    
+    def test_zip_is_cached_and_resumable(self, client, sample_csv_file, column_mapping):
+        """Test the ZIP is built once, keeps its ETag and serves ranges."""
+        self.upload(client, sample_csv_file, column_mapping)
+        with client.session_transaction() as sess:
+            sess['payment_completed'] = True
+        
+        first = client.get('/download_zip')
+        assert first.status_code == 200
+        assert first.data[:2] == b'PK'
+        second = client.get('/download_zip')
+        assert second.headers['ETag'] == first.headers['ETag']
+        
+        tail = client.get('/download_zip', headers={
+            'Range': 'bytes=10-',
+            'If-Range': first.headers['ETag'],
+        })
+        assert tail.status_code == 206
+        assert tail.data == first.data[10:]
+    
+    def test_path_traversal_rejected(self, client, app):
+        """Test paths outside the downloads folder return 404."""
+        secret = Path(app.config['DOWNLOAD_FOLDER']).parent / 'secret.csv'
+        secret.write_text('secret')
+        try:
+            response = client.get(f'/download/../{secret.name}')
+            assert response.status_code == 404
+        finally:
+            secret.unlink()
+    
+    def test_accel_redirect_offload(self, client, app, sample_csv_file, column_mapping, monkeypatch):
+        """Test an nginx prefix returns X-Accel-Redirect instead of the file body."""
+        import web_app.app as web_app
+        monkeypatch.setattr(web_app, 'DOWNLOAD_ACCEL_PREFIX', '/protected/')
+        monkeypatch.setitem(app.config, 'USE_X_SENDFILE', True)
+        file_path = self.upload(client, sample_csv_file, column_mapping)
+        
+        response = client.get(f'/download/{file_path}')
+        assert response.status_code == 200
+        assert response.headers['X-Accel-Redirect'] == f'/protected/{file_path}'
+        assert 'X-Sendfile' not in response.headers
+        assert response.data == b''
+
+
 class TestSessionIsolation:
     """Test that users can only access their own files."""
     
@@ -0,0 +1,132 @@
+"""
+Tests for the watch-folder daemon
+Ensures only finished files are picked up and nothing is converted twice
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from folder_watcher import STATE_FILENAME, FolderWatcher, is_candidate
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir()
+    return input_dir, tmp_path / 'archive'
+
+
+def make_watcher(dirs, convert, executor):
+    input_dir, archive_dir = dirs
+    return FolderWatcher(input_dir, archive_dir, convert, executor, log=lambda msg: None)
+
+
+def run_polls(watcher, times):
+    for now in times:
+        watcher.poll_once(now)
+    watcher.collect(wait=True)
+
+
+class TestScan:
+    """Test detection of completed files."""
+
+    def test_candidates(self):
+        """Test partial downloads, temp names and hidden files are skipped."""
+        assert is_candidate('export.csv')
+        assert is_candidate('EXPORT.XLSX')
+        assert not is_candidate('export.csv.part')
+        assert not is_candidate('.export.csv')
+        assert not is_candidate('notes.txt')
+
+    def test_file_must_settle(self, dirs):
+        """Test a file is ready only after its size and mtime hold for the settle time."""
+        watcher = make_watcher(dirs, None, None)
+        export = dirs[0] / 'export.csv'
+        export.write_text('First Name\nJohn\n')
+
+        assert watcher.scan(now=0) == []
+        assert watcher.scan(now=1) == []
+        assert watcher.scan(now=2) == [export]
+
+    def test_growing_file_restarts_settle(self, dirs):
+        """Test a file still being written is not picked up."""
+        watcher = make_watcher(dirs, None, None)
+        export = dirs[0] / 'export.csv'
+        export.write_text('First Name\n')
+        watcher.scan(now=0)
+        with open(export, 'a') as f:
+            f.write('John\n' * 100)
+
+        assert watcher.scan(now=5) == []
+        assert watcher.scan(now=7) == [export]
+
+
+class TestConversion:
+    """Test conversion, archiving and restart safety."""
+
+    def test_converts_and_archives(self, dirs):
+        """Test settled files are converted, archived and recorded in the state file."""
+        input_dir, archive_dir = dirs
+        (input_dir / 'export.csv').write_text('First Name\nJohn\n')
+        converted = []
+
+        def convert(path):
+            converted.append(path.name)
+            return [('export-sierra.csv', 1)], 1
+
+        with ThreadPoolExecutor(1) as pool:
+            run_polls(make_watcher(dirs, convert, pool), [0, 3])
+
+        assert converted == ['export.csv']
+        assert not (input_dir / 'export.csv').exists()
+        assert (archive_dir / 'export.csv').exists()
+        state = json.loads((archive_dir / STATE_FILENAME).read_text())['processed']
+        assert [entry['outputs'] for entry in state.values()] == [['export-sierra.csv']]
+
+    def test_restart_does_not_reconvert(self, dirs):
+        """Test a file already in the state file is archived without converting it again."""
+        input_dir, archive_dir = dirs
+        export = input_dir / 'export.csv'
+        export.write_text('First Name\nJohn\n')
+        with ThreadPoolExecutor(1) as pool:
+            run_polls(make_watcher(dirs, lambda p: ([], 1), pool), [0, 3])
+
+        # Same file put back (e.g. crash before the archive move), new watcher process
+        (archive_dir / 'export.csv').rename(export)
+        calls = []
+        with ThreadPoolExecutor(1) as pool:
+            run_polls(make_watcher(dirs, lambda p: calls.append(p), pool), [0, 3])
+
+        assert calls == []
+        assert not export.exists()
+
+    def test_failed_file_moves_aside(self, dirs):
+        """Test a conversion error moves the input to failed/ instead of retrying it."""
+        input_dir, archive_dir = dirs
+        (input_dir / 'broken.csv').write_text('junk')
+
+        def convert(path):
+            raise ValueError('bad export')
+
+        with ThreadPoolExecutor(1) as pool:
+            run_polls(make_watcher(dirs, convert, pool), [0, 3])
+
+        assert (archive_dir / 'failed' / 'broken.csv').exists()
+        state = json.loads((archive_dir / STATE_FILENAME).read_text())['processed']
+        assert list(state.values())[0]['error'] == 'bad export'
+
+    def test_pending_is_bounded(self, dirs):
+        """Test no more than max_pending files are queued at once."""
+        input_dir, _ = dirs
+        for i in range(5):
+            (input_dir / f'export{i}.csv').write_text('First Name\nJohn\n')
+
+        with ThreadPoolExecutor(1) as pool:
+            watcher = make_watcher(dirs, lambda p: ([], 1), pool)
+            watcher.poll_once(0)
+            watcher.poll_once(3)
+            assert len(watcher.pending) == 2
+            watcher.collect(wait=True)
+        assert len(os.listdir(input_dir)) == 3
@@ -0,0 +1,155 @@
+"""
+Tests for Stripe webhook handling
+Ensures signed events are logged once, acknowledged fast and handled later
+"""
+
+import hashlib
+import hmac
+import json
+import runpy
+import time
+from pathlib import Path
+
+import pytest
+import web_app.app as web_app
+import webhook_queue
+from webhook_queue import WebhookEventLog, WebhookProcessor
+
+
+SECRET = 'whsec_test_secret'
+FIXTURE = Path(__file__).parent / 'test_data' / 'stripe_checkout_completed.json'
+
+
+def signed_headers(payload, secret=SECRET, timestamp=None):
+    """Sign a payload the way Stripe does (HMAC-SHA256 over 'timestamp.payload')."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(secret.encode('utf-8'), f'{timestamp}.{payload}'.encode('utf-8'),
+                         hashlib.sha256).hexdigest()
+    return {'Stripe-Signature': f't={timestamp},v1={signature}', 'Content-Type': 'application/json'}
+
+
+@pytest.fixture
+def payload():
+    return FIXTURE.read_text()
+
+
+@pytest.fixture
+def webhook(monkeypatch, tmp_path):
+    """Use a temporary event log and record handled events instead of starting a thread."""
+    handled = []
+    event_log = WebhookEventLog(tmp_path / 'events.db')
+    processor = WebhookProcessor(event_log, {
+        'checkout.session.completed': lambda event: handled.append(event['id']),
+    })
+    enqueued = []
+    monkeypatch.setattr(processor, 'enqueue', enqueued.append)
+    monkeypatch.setattr(web_app, 'STRIPE_WEBHOOK_SECRET', SECRET)
+    monkeypatch.setattr(web_app, 'webhook_events', event_log)
+    monkeypatch.setattr(web_app, 'webhook_processor', processor)
+    return event_log, processor, enqueued, handled
+
+
+class TestWebhookEndpoint:
+    """Test the /webhook acknowledgement path."""
+
+    def test_event_acknowledged_then_processed(self, client, payload, webhook):
+        """Test the endpoint only logs and enqueues; the processor handles it later."""
+        event_log, processor, enqueued, handled = webhook
+        response = client.post('/webhook', data=payload, headers=signed_headers(payload))
+        assert response.status_code == 200
+        assert response.get_json() == {'success': True}
+        assert enqueued == ['evt_test_checkout_completed']
+        assert handled == []
+        assert event_log.status('evt_test_checkout_completed') == ('queued', 0)
+
+        assert processor.drain() == 1
+        assert handled == ['evt_test_checkout_completed']
+        assert event_log.status('evt_test_checkout_completed') == ('done', 1)
+
+    def test_redelivery_is_not_handled_twice(self, client, payload, webhook):
+        """Test a Stripe retry of a logged event is acknowledged as a duplicate."""
+        event_log, processor, enqueued, handled = webhook
+        client.post('/webhook', data=payload, headers=signed_headers(payload))
+        processor.drain()
+        response = client.post('/webhook', data=payload, headers=signed_headers(payload))
+        assert response.status_code == 200
+        assert response.get_json()['duplicate'] is True
+        assert processor.drain() == 0
+        assert enqueued == ['evt_test_checkout_completed']
+        assert handled == ['evt_test_checkout_completed']
+
+    def test_bad_signature_rejected(self, client, payload, webhook):
+        """Test events signed with another secret or too long ago are refused and not logged."""
+        event_log, _, enqueued, _ = webhook
+        response = client.post('/webhook', data=payload, headers=signed_headers(payload, secret='whsec_other'))
+        assert response.status_code == 400
+        stale = signed_headers(payload, timestamp=int(time.time()) - 3600)
+        assert client.post('/webhook', data=payload, headers=stale).status_code == 400
+        assert enqueued == []
+        assert event_log.status('evt_test_checkout_completed') is None
+
+    def test_checkout_handler_runs_on_processor_thread(self, client, payload, monkeypatch, tmp_path):
+        """Test the real processor thread handles an enqueued checkout event."""
+        event_log = WebhookEventLog(tmp_path / 'events.db')
+        processor = WebhookProcessor(event_log, web_app.webhook_processor.handlers)
+        monkeypatch.setattr(web_app, 'STRIPE_WEBHOOK_SECRET', SECRET)
+        monkeypatch.setattr(web_app, 'webhook_events', event_log)
+        monkeypatch.setattr(web_app, 'webhook_processor', processor)
+
+        client.post('/webhook', data=payload, headers=signed_headers(payload))
+        deadline = time.monotonic() + 5
+        while event_log.status('evt_test_checkout_completed')[0] != 'done':
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+
+class TestWebhookProcessor:
+    """Test deferred processing and retries."""
+
+    def test_failed_event_retried_then_given_up(self, tmp_path, monkeypatch):
+        """Test a failing handler is retried up to MAX_ATTEMPTS and then left as failed."""
+        monkeypatch.setattr(webhook_queue, 'RETRY_DELAY', 0)
+        errors = []
+        event_log = WebhookEventLog(tmp_path / 'events.db')
+        processor = WebhookProcessor(event_log, {'boom': lambda event: 1 / 0}, log=errors.append)
+        event_log.record('evt_1', 'boom', json.dumps({'id': 'evt_1'}))
+
+        assert processor.drain() == webhook_queue.MAX_ATTEMPTS
+        assert event_log.status('evt_1') == ('failed', webhook_queue.MAX_ATTEMPTS)
+        assert len(errors) == webhook_queue.MAX_ATTEMPTS
+
+    def test_failed_event_waits_for_retry_delay(self, tmp_path):
+        """Test a failure is not retried immediately."""
+        event_log = WebhookEventLog(tmp_path / 'events.db')
+        processor = WebhookProcessor(event_log, {'boom': lambda event: 1 / 0}, log=lambda msg: None)
+        event_log.record('evt_1', 'boom', '{}')
+        assert processor.drain() == 1
+        assert event_log.status('evt_1') == ('queued', 1)
+
+    def test_unhandled_types_are_marked_done(self, tmp_path):
+        """Test events without a handler are acknowledged in the log."""
+        event_log = WebhookEventLog(tmp_path / 'events.db')
+        processor = WebhookProcessor(event_log, {})
+        event_log.record('evt_2', 'customer.created', '{}')
+        assert processor.process('evt_2') == 'evt_2'
+        assert event_log.status('evt_2') == ('done', 1)
+
+    def test_worker_start_sweeps_leftover_events(self, tmp_path, monkeypatch):
+        """Test the gunicorn post_fork hook starts a processor that handles old events unprompted."""
+        event_log = WebhookEventLog(tmp_path / 'events.db')
+        handled = []
+        processor = WebhookProcessor(event_log, {'left': lambda event: handled.append(event['id'])},
+                                     poll_interval=0.01)
+        monkeypatch.setattr(web_app, 'webhook_processor', processor)
+        event_log.record('evt_old', 'left', json.dumps({'id': 'evt_old'}))
+
+        hooks = runpy.run_path(str(Path(__file__).parent.parent / 'gunicorn.conf.py'))
+        hooks['post_fork'](None, None)
+        deadline = time.monotonic() + 5
+        while event_log.status('evt_old')[0] != 'done':
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert handled == ['evt_old']
+        thread = processor._thread
+        processor.start()
+        assert processor._thread is thread
@@ -0,0 +1,133 @@
+"""
+Tests for streaming .xlsx input support
+Ensures Excel re-saved exports feed the same conversion as CSV files
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+import fub_to_sierra
+from xlsx_reader import XlsxDictReader, XlsxReader, column_index
+
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>"""
+
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+          xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+  <sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Type="worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+SHARED_STRINGS = """<?xml version="1.0" encoding="UTF-8"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+  <si><t>First Name</t></si><si><t>Last Name</t></si><si><t>Email</t></si>
+  <si><t>Phone</t></si><si><t>Created Date</t></si>
+  <si><t>John</t></si><si><r><t>Do</t></r><r><t>e</t></r></si><si><t>john@example.com</t></si>
+</sst>"""
+
+STYLES = """<?xml version="1.0" encoding="UTF-8"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+  <cellXfs count="2"><xf numFmtId="0"/><xf numFmtId="14"/></cellXfs>
+</styleSheet>"""
+
+SHEET = """<?xml version="1.0" encoding="UTF-8"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+  <sheetData>
+    <row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c>
+      <c r="C1" t="s"><v>2</v></c><c r="D1" t="s"><v>3</v></c><c r="E1" t="s"><v>4</v></c></row>
+    <row r="2"><c r="A2" t="s"><v>5</v></c><c r="B2" t="s"><v>6</v></c>
+      <c r="C2" t="s"><v>7</v></c><c r="D2"><v>5551234567</v></c><c r="E2" s="1"><v>45292</v></c></row>
+    <row r="3"><c r="A3" t="inlineStr"><is><t>Jane</t></is></c><c r="D3"><v>5559876543.0</v></c></row>
+    <row r="5"></row>
+  </sheetData>
+</worksheet>"""
+
+
+def build_xlsx():
+    """Return bytes of a minimal FUB-style workbook."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES)
+        zf.writestr('xl/workbook.xml', WORKBOOK)
+        zf.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        zf.writestr('xl/sharedStrings.xml', SHARED_STRINGS)
+        zf.writestr('xl/styles.xml', STYLES)
+        zf.writestr('xl/worksheets/sheet1.xml', SHEET)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def xlsx_file(tmp_path):
+    path = tmp_path / 'export.xlsx'
+    path.write_bytes(build_xlsx())
+    return path
+
+
+class TestXlsxReader:
+    """Test row extraction from the zipped sheet XML."""
+
+    def test_column_index(self):
+        """Test cell references map to zero-based columns."""
+        assert column_index('A1') == 0
+        assert column_index('AB12') == 27
+
+    def test_rows_resolve_strings_numbers_and_dates(self, xlsx_file):
+        """Test shared, rich and inline strings, numbers and date serials."""
+        with XlsxReader(xlsx_file) as reader:
+            rows = list(reader)
+        assert rows[1] == ['John', 'Doe', 'john@example.com', '5551234567', '2024-01-01']
+        assert rows[2] == ['Jane', '', '', '5559876543']
+
+    def test_dict_reader_pads_and_skips_blank_rows(self, xlsx_file):
+        """Test the DictReader look-alike matches csv.DictReader output shape."""
+        reader = XlsxDictReader(xlsx_file)
+        rows = list(reader)
+        reader.close()
+        assert reader.fieldnames == ['First Name', 'Last Name', 'Email', 'Phone', 'Created Date']
+        assert len(rows) == 2
+        assert rows[1]['Email'] == ''
+
+
+class TestXlsxConversion:
+    """Test .xlsx through the CLI and the upload route."""
+
+    def test_cli_converts_xlsx(self, xlsx_file):
+        """Test the CLI conversion reads workbooks like CSV files."""
+        rows = fub_to_sierra.convert_fub_to_sierra(xlsx_file, None)
+        assert rows[0]['Full Name'] == 'John Doe'
+        assert rows[1]['Phone'] == '(555) 987-6543'
+
+    def test_upload_xlsx(self, client, column_mapping):
+        """Test /upload accepts and converts an .xlsx export."""
+        data = {
+            'file': (io.BytesIO(build_xlsx()), 'export.xlsx'),
+            'column_mapping': json.dumps(column_mapping),
+        }
+        response = client.post('/upload', data=data, content_type='multipart/form-data')
+
+        json_data = response.get_json()
+        assert json_data['success'] is True
+        assert json_data['total_rows'] == 2
+        assert json_data['files'][0]['filename'] == 'export-sierra.csv'
+
+    def test_detect_columns_xlsx(self, client):
+        """Test column detection reads the workbook header row."""
+        data = {'file': (io.BytesIO(build_xlsx()), 'export.xlsx')}
+        response = client.post('/detect_columns', data=data, content_type='multipart/form-data')
+        assert response.get_json()['columns'][:3] == ['First Name', 'Last Name', 'Email']
+
+    def test_upload_rejects_corrupt_xlsx(self, client):
+        """Test a non-zip file with .xlsx extension fails validation cleanly."""
+        data = {'file': (io.BytesIO(b'not a workbook'), 'export.xlsx'), 'column_mapping': '{}'}
+        response = client.post('/upload', data=data, content_type='multipart/form-data')
+        json_data = response.get_json()
+        assert json_data['success'] is False
+        assert 'Invalid Excel file' in json_data['error']
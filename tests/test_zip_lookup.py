@@ -0,0 +1,127 @@
+"""
+Tests for offline ZIP code enrichment
+Ensures the compact index round-trips and fills missing cities and states
+"""
+
+import csv
+import json
+import pickle
+from pathlib import Path
+
+import pytest
+import fub_to_sierra
+import web_app.app as web_app
+from zip_lookup import ZipEnricher, ZipIndex, build_index, read_source, zip_key
+
+SAMPLE = Path(__file__).parent / 'test_data' / 'zip_sample.csv'
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = tmp_path / 'zip_index.bin'
+    build_index(read_source(SAMPLE), path)
+    return path
+
+
+class TestZipIndex:
+    """Test building and searching the index file."""
+
+    def test_lookup(self, index_path):
+        """Test known ZIPs resolve and unknown ones do not."""
+        index = ZipIndex(index_path)
+        assert len(index) == 5
+        assert index.lookup('78701') == ('Austin', 'TX', 'Travis')
+        assert index.lookup('90210-1234') == ('Beverly Hills', 'CA', 'Los Angeles')
+        assert index.lookup('2134') == ('Allston', 'MA', 'Suffolk')
+        assert index.lookup('99999') is None
+        assert index.lookup('not a zip') is None
+
+    def test_strings_stored_once(self, index_path):
+        """Test repeated names share one copy in the file."""
+        assert index_path.read_bytes().count(b'TX') == 1
+
+    def test_geonames_source(self, tmp_path):
+        """Test a GeoNames dump is read and the first place of a ZIP wins."""
+        source = tmp_path / 'US.txt'
+        source.write_text('US\t78701\tAustin\tTexas\tTX\tTravis\t453\t\t\t30.27\t-97.74\t4\n'
+                          'US\t78701\tOther\tTexas\tTX\tTravis\t453\t\t\t30.27\t-97.74\t4\n')
+        build_index(read_source(source), tmp_path / 'index.bin')
+        assert ZipIndex(tmp_path / 'index.bin').lookup('78701') == ('Austin', 'TX', 'Travis')
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test a file without the index header is refused."""
+        path = tmp_path / 'bogus.bin'
+        path.write_bytes(b'x' * 64)
+        with pytest.raises(ValueError):
+            ZipIndex(path)
+
+    def test_zip_key(self):
+        """Test ZIP+4 and dropped leading zeros map to the same key."""
+        assert zip_key('02134-0001') == zip_key('2134') == 2134
+        assert zip_key('12') is None
+
+
+class TestZipEnricher:
+    """Test the row stage."""
+
+    def test_fills_blanks_only(self, index_path):
+        """Test only empty location fields are filled and the summary is rebuilt."""
+        enricher = ZipEnricher(ZipIndex(index_path), fub_to_sierra.rebuild_short_summary)
+        row = {'Lead Source': 'Zillow', 'City': '', 'State': 'tx', 'Zip Code': '75201',
+               'Short Summary': 'Source: Zillow | Location: tx'}
+        enricher.apply(row)
+        assert (row['City'], row['State']) == ('Dallas', 'tx')
+        assert row['Short Summary'] == 'Source: Zillow | Location: Dallas, tx'
+
+        complete = {'City': 'Austin', 'State': 'TX', 'Zip Code': '99999'}
+        assert enricher.apply(dict(complete)) == complete
+        enricher.apply({'City': '', 'State': '', 'Zip Code': '99999'})
+        assert enricher.stats == {'filled': 1, 'unknown': 1}
+
+    def test_pickles_without_index(self, index_path):
+        """Test worker results carry counts but not the mapped index."""
+        enricher = ZipEnricher(ZipIndex(index_path), fub_to_sierra.rebuild_short_summary)
+        enricher.stats['filled'] = 3
+        copy = pickle.loads(pickle.dumps(enricher))
+        assert copy.stats['filled'] == 3 and copy.index is None
+
+
+class TestConversion:
+    """Test enrichment inside conversions."""
+
+    def test_cli(self, tmp_path, index_path, monkeypatch):
+        """Test --enrich-zips fills the output and a missing index is a usage error."""
+        for name in fub_to_sierra._CLI_SETTINGS:
+            monkeypatch.setattr(fub_to_sierra, name, getattr(fub_to_sierra, name))
+        export = tmp_path / 'export.csv'
+        export.write_text('First Name,Zip,Source\nAnn,10001,Zillow\n')
+        out = tmp_path / 'out'
+
+        code = fub_to_sierra.cli([str(export), '-o', str(out), '--enrich-zips',
+                                  '--zip-index', str(index_path)])
+        assert code == fub_to_sierra.EXIT_OK
+        with open(out / 'export-sierra.csv', newline='') as f:
+            row = next(csv.DictReader(f))
+        assert (row['City'], row['State']) == ('New York', 'NY')
+        assert row['Short Summary'] == 'Source: Zillow | Location: New York, NY'
+
+        code = fub_to_sierra.cli([str(export), '-o', str(out), '--enrich-zips',
+                                  '--zip-index', str(tmp_path / 'missing.bin')])
+        assert code == fub_to_sierra.EXIT_USAGE
+
+    def test_upload(self, client, tmp_path, index_path, column_mapping, monkeypatch):
+        """Test the web option fills the preview and reports counts."""
+        monkeypatch.setattr(web_app, 'ZIP_INDEX_PATH', index_path)
+        assert b'optEnrichZips' in client.get('/').data
+        export = tmp_path / 'contacts.csv'
+        export.write_text('First Name,Zip\nAnn,78701\n')
+        with open(export, 'rb') as f:
+            response = client.post('/upload', data={
+                'file': (f, 'contacts.csv'),
+                'column_mapping': json.dumps({**column_mapping, 'zip': 'Zip'}),
+                'enrich_zips': 'true',
+            }, content_type='multipart/form-data')
+        data = response.get_json()
+        assert data['success'] is True
+        assert data['preview'][0]['City'] == 'Austin'
+        assert data['quality']['zips'] == {'filled': 1, 'unknown': 0}
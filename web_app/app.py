@@ -5,25 +5,52 @@ Provides a browser-based UI for converting Follow Up Boss exports to Sierra Inte
 Includes Stripe payment integration.
 """
 
+import time
+
+# Start of the import-time budget, logged as the startup time at the end of this module
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import sys
 import csv
+import hashlib
 import re
+import tempfile
 import uuid
 import zipfile
-import io
-import time
 import logging
+from functools import wraps
 from pathlib import Path
 from textwrap import shorten
-from flask import Flask, render_template, request, jsonify, send_file, session
-from werkzeug.utils import secure_filename
+from flask import Flask, abort, g, render_template, request, jsonify, send_file, session
+from urllib.parse import quote
+from werkzeug.utils import safe_join, secure_filename
 from dotenv import load_dotenv
 from logging.handlers import RotatingFileHandler
 
+# Shared conversion engine modules live alongside the CLI in src/
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from address_standardizer import AddressStandardizer
+from admission import AdmissionController, AdmissionRejected, SharedBudget
+from static_assets import AssetManifest, choose_encoding, compress
+from lead_dedup import dedupe_rows
+from memory_budget import MemoryPlan, PeakTracker
+from row_pager import read_page
+from chunk_writer import PARTITION_COLUMNS, open_chunk_writer
+from data_profile import DataProfile
+from email_normalizer import EmailNormalizer
+from export_reader import is_supported_export, is_xlsx, open_export
+from transcode import SNIFF_BYTES, decode_sample
+from webhook_queue import WebhookEventLog, WebhookProcessor
+from xlsx_reader import XlsxDictReader
+from zip_lookup import ZipEnricher, open_index
+
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
+# Static files are served by serve_static() below, with fingerprinted names
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['UPLOAD_FOLDER'] = Path(__file__).parent / 'uploads'
 app.config['DOWNLOAD_FOLDER'] = Path(__file__).parent / 'downloads'
@@ -41,16 +68,68 @@ if not app.debug:
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
     app.logger.setLevel(logging.INFO)
-    app.logger.info('FUB Converter startup')
 
 # Payment link configuration
 PAYMENT_LINK = os.getenv('PAYMENT_LINK')
 STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
 
+# SQLite log of received Stripe events, shared by all workers; keep it
+# outside uploads/ and downloads/, which are cleaned up hourly
+WEBHOOK_EVENT_DB = os.getenv('WEBHOOK_EVENT_DB', str(Path(__file__).parent / 'webhook_events.db'))
+
+# Offline ZIP index (built with src/zip_lookup.py) for the "fill city and
+# state from ZIP" option; the option is hidden when the file is missing
+ZIP_INDEX_PATH = Path(os.getenv('ZIP_INDEX_PATH', Path(__file__).parent.parent / 'data' / 'zip_index.bin'))
+
+# Download offload: with DOWNLOAD_ACCEL_PREFIX set (e.g. '/protected-downloads/'),
+# downloads return an X-Accel-Redirect to that internal nginx location; with
+# USE_X_SENDFILE=true an Apache/lighttpd X-Sendfile header. Either way the
+# front server streams the bytes instead of a gunicorn thread.
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX')
+app.config['USE_X_SENDFILE'] = (
+    bool(DOWNLOAD_ACCEL_PREFIX) or os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+)
+
 # Ensure folders exist
 app.config['UPLOAD_FOLDER'].mkdir(exist_ok=True)
 app.config['DOWNLOAD_FOLDER'].mkdir(exist_ok=True)
 
+# Admission control: the upload size and a row estimate of every conversion
+# in flight count against a per-process budget and a budget shared by all
+# gunicorn workers through the ADMISSION_STATE_PATH file on the same host.
+# Work that does not fit waits up to ADMISSION_QUEUE_SECONDS, then gets 503
+# with Retry-After. Rows are estimated at ESTIMATED_ROW_BYTES per row.
+ESTIMATED_ROW_BYTES = 200
+admission = AdmissionController(
+    max_bytes=int(os.getenv('ADMISSION_MAX_BYTES', 100 * 1024 * 1024)),
+    max_rows=int(os.getenv('ADMISSION_MAX_ROWS', 500000)),
+    shared=SharedBudget(
+        os.getenv('ADMISSION_STATE_PATH', Path(tempfile.gettempdir()) / 'fub_converter_admission.json'),
+        max_bytes=int(os.getenv('ADMISSION_GLOBAL_MAX_BYTES', 200 * 1024 * 1024)),
+        max_rows=int(os.getenv('ADMISSION_GLOBAL_MAX_ROWS', 1000000)),
+    ),
+    queue_seconds=float(os.getenv('ADMISSION_QUEUE_SECONDS', 5)),
+    retry_after=int(os.getenv('ADMISSION_RETRY_AFTER', 15)),
+)
+
+# Memory budget of one conversion: uploads whose estimated peak (from a
+# row-count scan of the saved file) is over MEMORY_BUDGET_MB are converted
+# in streaming mode, without the per-row log and with dedup keys on disk.
+# With TRACE_MEMORY (on by default under FLASK_DEBUG) every upload's
+# measured peak allocation is logged next to its estimate.
+MEMORY_BUDGET_BYTES = int(float(os.getenv('MEMORY_BUDGET_MB', 64)) * 1024 * 1024)
+TRACE_MEMORY = os.getenv('TRACE_MEMORY', os.getenv('FLASK_DEBUG', 'false')).lower() == 'true'
+
+# Static assets get content-hashed URLs and are cached by browsers for a
+# year; hashing and gzip/brotli compression happen once at import
+STATIC_FOLDER = Path(__file__).parent / 'static'
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+static_assets = AssetManifest(STATIC_FOLDER).build()
+
+# JSON responses at least this large are compressed for clients that accept it
+JSON_COMPRESS_MIN_BYTES = 1024
+JSON_COMPRESS_LEVELS = {'gzip': 6, 'br': 5}
+
 # Sierra CRM output columns (fixed format)
 SIERRA_COLS = [
     'First Name',
@@ -146,6 +225,14 @@ DEFAULT_FUB_COLS = {
 
 SIERRA_MAX_ROWS = 5000
 
+# Converted rows returned with /upload to demonstrate the output format
+PREVIEW_ROWS = 100
+
+# Further preview rows are fetched from /preview_rows as the table scrolls:
+# at most PREVIEW_PAGE_MAX_ROWS per request, PREVIEW_MAX_ROWS in total
+PREVIEW_PAGE_MAX_ROWS = 500
+PREVIEW_MAX_ROWS = 50000
+
 
 def validate_csv_file(file_content):
     """
@@ -187,6 +274,41 @@ def validate_csv_file(file_content):
         return False, f"Invalid CSV format: {str(e)}"
 
 
+def read_upload_sample(file):
+    """
+    Decode the first block of an uploaded file for validation.
+    The encoding is detected from that block; the stream is left rewound.
+    Returns (text, encoding).
+    """
+    file.stream.seek(0)
+    sample = file.stream.read(SNIFF_BYTES + 1)
+    file.stream.seek(0)
+    return decode_sample(sample[:SNIFF_BYTES], final=len(sample) <= SNIFF_BYTES)
+
+
+def validate_xlsx_file(stream):
+    """
+    Validate that an uploaded workbook has a header row and a data row.
+    Only the start of the first sheet is parsed; the stream is left rewound.
+    Returns (is_valid, error_message, columns).
+    """
+    try:
+        stream.seek(0)
+        reader = XlsxDictReader(stream)
+        try:
+            headers = reader.fieldnames
+            if not headers or all(not h.strip() for h in headers):
+                return False, "Excel sheet has no header row", []
+            if next(iter(reader), None) is None:
+                return False, "Excel sheet has headers but no data rows", []
+            return True, None, headers
+        finally:
+            reader.close()
+            stream.seek(0)
+    except Exception as e:
+        return False, f"Invalid Excel file: {str(e)}", []
+
+
 def normalize_phone(phone_str):
     """Extract digits from phone string and format as (XXX) XXX-XXXX."""
     if not phone_str:
@@ -237,6 +359,10 @@ def build_short_summary(row, fub_cols):
     return shorten(summary, width=128, placeholder='...')
 
 
+# Sierra columns build_short_summary reads when ZIP enrichment rebuilds the summary
+SIERRA_SUMMARY_COLS = {'source': 'Lead Source', 'city': 'City', 'state': 'State'}
+
+
 def build_import_note(row, fub_cols):
     """
     Combine search criteria, notes, and all additional fields into import note field.
@@ -385,16 +511,11 @@ def convert_row(fub_row, fub_cols):
     }
 
 
-def convert_csv(input_path, fub_cols, log_callback=None):
-    """Convert FUB CSV to Sierra format with logging."""
-    sierra_rows = []
-    
-    with open(input_path, 'r', encoding='utf-8-sig') as infile:
-        reader = csv.DictReader(infile)
-        
+def iter_converted_rows(input_path, fub_cols, log_callback=None, encoding=None):
+    """Stream Sierra rows from a FUB export (CSV or .xlsx), logging each row."""
+    with open_export(input_path, encoding=encoding) as reader:
         for row_num, fub_row in enumerate(reader, 1):
             sierra_row = convert_row(fub_row, fub_cols)
-            sierra_rows.append(sierra_row)
             
             if log_callback:
                 # Show all non-empty fields from the row
@@ -416,16 +537,8 @@ def convert_csv(input_path, fub_cols, log_callback=None):
                     log_callback(f"Row {row_num}: {preview}")
                 else:
                     log_callback(f"Row {row_num}: Empty row")
-    
-    return sierra_rows
-
-
-def write_sierra_csv(output_path, sierra_rows):
-    """Write Sierra rows to CSV file."""
-    with open(output_path, 'w', encoding='utf-8', newline='') as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=SIERRA_COLS)
-        writer.writeheader()
-        writer.writerows(sierra_rows)
+            
+            yield sierra_row
 
 
 def cleanup_session_files(session_id):
@@ -511,6 +624,8 @@ def index():
     return render_template('index.html', 
                          default_fub_cols=DEFAULT_FUB_COLS,
                          sierra_cols=SIERRA_COLS,
+                         partition_columns=PARTITION_COLUMNS,
+                         zip_enrichment=ZIP_INDEX_PATH.is_file(),
                          payment_link=PAYMENT_LINK)
 
 
@@ -532,6 +647,57 @@ def refund_policy():
     return render_template('refund-policy.html')
 
 
+@app.route('/static/<path:filename>', endpoint='static')
+def serve_static(filename):
+    """
+    Serve a static file, precompressed when the client accepts it.
+    Fingerprinted names are immutable; plain names are revalidated.
+    """
+    asset, fingerprinted = static_assets.lookup(filename)
+    if asset is None:
+        abort(404)
+    
+    encoding = choose_encoding(request.accept_encodings.quality, asset.variants)
+    response = app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    response.set_etag(f"{asset.digest}-{encoding}" if encoding else asset.digest)
+    if fingerprinted:
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """Make url_for('static', filename=...) point at the fingerprinted file."""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = static_assets.url_name(values['filename'])
+
+
+@app.after_request
+def compress_json(response):
+    """Compress large JSON responses (upload logs and previews) for clients that accept it."""
+    if (response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or response.content_encoding
+            or not 200 <= response.status_code < 300):
+        return response
+    data = response.get_data()
+    if len(data) < JSON_COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings.quality, JSON_COMPRESS_LEVELS)
+    if encoding:
+        response.set_data(compress(data, encoding, JSON_COMPRESS_LEVELS[encoding]))
+        response.content_encoding = encoding
+    return response
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     """Handle 404 errors."""
@@ -551,7 +717,49 @@ def request_entity_too_large(error):
     return render_template('error_413.html'), 413
 
 
+def admission_controlled(view):
+    """
+    Run a conversion view only once its cost fits the admission budget.
+    The cost is known from Content-Length before any of the body is read.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        nbytes = request.content_length or 0
+        try:
+            ticket = admission.admit(nbytes, nbytes // ESTIMATED_ROW_BYTES)
+        except AdmissionRejected as e:
+            app.logger.warning(f'Conversion rejected, {admission.in_flight()[0]} in flight')
+            response = jsonify({'success': False, 'error': 'The converter is busy right now. Please try again in a moment.'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        with ticket:
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def memory_traced(view):
+    """
+    With TRACE_MEMORY, measure a conversion view's peak allocation and log
+    it beside the estimate the view stored in g.memory_plan.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not TRACE_MEMORY:
+            return view(*args, **kwargs)
+        with PeakTracker() as tracker:
+            response = view(*args, **kwargs)
+        if tracker.peak is not None:
+            app.logger.info(f"{request.path}: {tracker.summary_line(g.get('memory_plan'))}")
+        else:
+            app.logger.info(f"{request.path}: memory not traced, another request was being measured")
+        return response
+    return wrapper
+
+
 @app.route('/upload', methods=['POST'])
+@admission_controlled
+@memory_traced
 def upload_file():
     """Handle file upload and conversion."""
     try:
@@ -563,24 +771,19 @@ def upload_file():
             return jsonify({'success': False, 'error': 'No file selected'})
         
         # Validate file extension
-        if not file.filename.lower().endswith('.csv'):
-            return jsonify({'success': False, 'error': 'File must be a CSV file (with .csv extension)'})
-        
-        # Read and validate file content
-        file.seek(0)
-        try:
-            file_content = file.read().decode('utf-8-sig')
-        except UnicodeDecodeError:
-            return jsonify({'success': False, 'error': 'File encoding is not valid UTF-8. Please save your CSV as UTF-8 encoded.'})
+        if not is_supported_export(file.filename):
+            return jsonify({'success': False, 'error': 'File must be a CSV file (with .csv extension) or an Excel .xlsx file'})
         
-        # Validate CSV structure
-        is_valid, error_msg = validate_csv_file(file_content)
+        if is_xlsx(file.filename):
+            encoding = 'xlsx'
+            is_valid, error_msg, _ = validate_xlsx_file(file.stream)
+        else:
+            # Detect encoding and validate CSV structure from the first block only
+            file_sample, encoding = read_upload_sample(file)
+            is_valid, error_msg = validate_csv_file(file_sample)
         if not is_valid:
             return jsonify({'success': False, 'error': error_msg})
         
-        # Reset file pointer for later processing
-        file.seek(0)
-        
         # Get column mapping from request
         column_mapping = request.form.get('column_mapping', '{}')
         import json
@@ -589,6 +792,11 @@ def upload_file():
         except json.JSONDecodeError:
             return jsonify({'success': False, 'error': 'Invalid column mapping data'})
         
+        # Check the options before saving, so a rejected request leaves no upload behind
+        partition_by = request.form.get('partition_by') or None
+        if partition_by and partition_by not in PARTITION_COLUMNS:
+            return jsonify({'success': False, 'error': f'Cannot split files by {partition_by}'})
+        
         # Save uploaded file
         filename = secure_filename(file.filename)
         session_id = str(uuid.uuid4())
@@ -601,6 +809,10 @@ def upload_file():
             logs.append(msg)
         
         logs.append(f"Processing: {filename}")
+        if encoding == 'xlsx':
+            logs.append("Reading Excel workbook (first sheet)")
+        elif encoding not in ('utf-8', 'utf-8-sig'):
+            logs.append(f"Detected encoding: {encoding} (converted to UTF-8)")
         logs.append("=" * 60)
         
         # Log selected columns
@@ -611,48 +823,83 @@ def upload_file():
             logs.append(f"  • {col}")
         logs.append("=" * 60)
         
-        sierra_rows = convert_csv(upload_path, fub_cols, log_message)
-        total_rows = len(sierra_rows)
-        
-        logs.append("=" * 60)
-        logs.append(f"Total rows processed: {total_rows}")
+        row_encoding = None if encoding == 'xlsx' else encoding
+        dedupe = request.form.get('dedupe_leads') == 'true'
         
-        # Generate preview (first 100 rows to show format)
-        preview_rows = sierra_rows[:100] if len(sierra_rows) > 100 else sierra_rows
-        preview_data = preview_rows  # Show full data to demonstrate format
+        # Large uploads skip the per-row log and spill dedup keys to disk
+        # rather than outgrow the worker's memory
+        plan = g.memory_plan = MemoryPlan(upload_path, MEMORY_BUDGET_BYTES, dedupe=dedupe)
+        row_log = None if plan.streaming else log_message
+        if plan.streaming:
+            logs.append(plan.summary_line())
         
-        # Split into chunks if needed
-        num_chunks = (total_rows + SIERRA_MAX_ROWS - 1) // SIERRA_MAX_ROWS
-        output_files = []
+        # Optionally consolidate rows that share an email or phone
+        # (two passes over the saved upload; only the first one is logged)
+        if dedupe:
+            passes = iter([row_log, None])
+            dedupe_stats = {}
+            sierra_rows = dedupe_rows(
+                lambda: iter_converted_rows(upload_path, fub_cols, next(passes), row_encoding),
+                dedupe_stats, spill=plan.streaming)
+        else:
+            sierra_rows = iter_converted_rows(upload_path, fub_cols, row_log, row_encoding)
         
+        # Stream rows into chunk files; nothing is kept in memory
         base_name = Path(filename).stem
+        balance = request.form.get('balance_chunks') == 'true'
+        expected_rows = plan.rows if balance and not partition_by else None
         
-        if num_chunks == 1:
-            output_filename = f"{base_name}-sierra.csv"
-            output_path = app.config['DOWNLOAD_FOLDER'] / f"{session_id}_{output_filename}"
-            write_sierra_csv(output_path, sierra_rows)
-            output_files.append({
-                'filename': output_filename,
-                'path': f"{session_id}_{output_filename}",
-                'rows': total_rows
-            })
-            logs.append(f"Created: {output_filename} ({total_rows} rows)")
-        else:
-            logs.append(f"Splitting into {num_chunks} chunks (Sierra max: {SIERRA_MAX_ROWS} rows/file)")
-            for chunk_num in range(num_chunks):
-                start_idx = chunk_num * SIERRA_MAX_ROWS
-                end_idx = min(start_idx + SIERRA_MAX_ROWS, total_rows)
-                chunk_rows = sierra_rows[start_idx:end_idx]
-                
-                output_filename = f"{base_name}-sierra-chunk{chunk_num + 1}.csv"
-                output_path = app.config['DOWNLOAD_FOLDER'] / f"{session_id}_{output_filename}"
-                write_sierra_csv(output_path, chunk_rows)
-                output_files.append({
-                    'filename': output_filename,
-                    'path': f"{session_id}_{output_filename}",
-                    'rows': len(chunk_rows)
-                })
-                logs.append(f"Created: {output_filename} ({len(chunk_rows)} rows)")
+        # Row stages: optional ZIP enrichment and address standardization,
+        # quality profile, email normalization (after the profile, so rejected
+        # emails count as invalid rather than missing)
+        zips = None
+        if request.form.get('enrich_zips') == 'true':
+            try:
+                zips = ZipEnricher(open_index(ZIP_INDEX_PATH),
+                                   lambda row: build_short_summary(row, SIERRA_SUMMARY_COLS))
+            except (OSError, ValueError):
+                logs.append("ZIP enrichment skipped: no ZIP index installed")
+        addresses = AddressStandardizer() if request.form.get('standardize_addresses') == 'true' else None
+        emails = EmailNormalizer()
+        profile = DataProfile(SIERRA_COLS)
+        stages = [stage for stage in (zips, addresses, profile, emails) if stage]
+        for stage in stages:
+            sierra_rows = stage.wrap(sierra_rows)
+        
+        with open_chunk_writer(app.config['DOWNLOAD_FOLDER'], base_name, SIERRA_COLS,
+                               SIERRA_MAX_ROWS, prefix=f"{session_id}_", balance=balance,
+                               expected_rows=expected_rows, partition_by=partition_by,
+                               write_behind=True) as writer:
+            writer.write_rows(sierra_rows)
+        
+        # The first preview page is read back from the written files, like
+        # every later /preview_rows page, so partitioned uploads page in
+        # one consistent (file) order
+        total_rows = writer.total_rows
+        preview_data = read_page([(app.config['DOWNLOAD_FOLDER'] / f"{session_id}_{name}", rows)
+                                  for name, rows in writer.files], 0, PREVIEW_ROWS)
+        if dedupe:
+            logs.append(f"Merged {dedupe_stats['merged_rows']} duplicate rows "
+                        f"({dedupe_stats['input_rows']} rows → {dedupe_stats['output_rows']} leads)")
+        
+        logs.append("=" * 60)
+        logs.append(f"Total rows processed: {total_rows}")
+        for stage in stages:
+            logs.extend(stage.summary_lines())
+        
+        output_files = [{
+            'filename': output_filename,
+            'path': f"{session_id}_{output_filename}",
+            'rows': row_count
+        } for output_filename, row_count in writer.files]
+        
+        if partition_by:
+            logs.append(f"Split by {partition_by} into {len(output_files)} files "
+                        f"(Sierra max: {SIERRA_MAX_ROWS} rows/file)")
+        elif len(output_files) > 1:
+            logs.append(f"Split into {len(output_files)} chunks (Sierra max: {SIERRA_MAX_ROWS} rows/file)")
+        for file_info in output_files:
+            logs.append(f"Created: {file_info['filename']} ({file_info['rows']} rows)")
         
         logs.append("=" * 60)
         logs.append("✓ Conversion complete!")
@@ -674,6 +921,10 @@ def upload_file():
             'total_rows': total_rows,
             'preview': preview_data,
             'preview_note': f'Showing first {len(preview_data)} of {total_rows} rows - Preview demonstrates format only',
+            'preview_rows': min(total_rows, PREVIEW_MAX_ROWS),
+            'quality': {**profile.report(), 'emails': emails.report(),
+                        'zips': zips.report() if zips else None,
+                        'addresses': addresses.report() if addresses else None},
             'session_id': session_id  # Send back for client-side tracking
         })
     
@@ -688,9 +939,33 @@ def upload_file():
         })
 
 
+def handle_checkout_completed(event):
+    """Record a successful Stripe checkout (runs on the webhook processor thread)."""
+    checkout_session = event['data']['object']
+    session_id = checkout_session.get('id')
+    customer_email = (checkout_session.get('customer_details') or {}).get('email', 'Unknown')
+    amount = (checkout_session.get('amount_total') or 0) / 100
+    
+    app.logger.info(f"Payment successful: session {session_id}, customer {customer_email}, amount ${amount:.2f}")
+    
+    # Here you could:
+    # - Send confirmation email
+    # - Mark files as paid for download
+
+
+webhook_events = WebhookEventLog(WEBHOOK_EVENT_DB)
+webhook_processor = WebhookProcessor(webhook_events, {
+    'checkout.session.completed': handle_checkout_completed,
+}, log=app.logger.error)
+
+
 @app.route('/webhook', methods=['POST'])
 def stripe_webhook():
-    """Handle Stripe webhook for payment confirmation."""
+    """
+    Handle Stripe webhooks: verify, log by event id and acknowledge at once.
+    Handling happens on the webhook processor thread, and redelivered
+    events are acknowledged without being handled again.
+    """
     import stripe
     
     payload = request.get_data(as_text=True)
@@ -706,51 +981,98 @@ def stripe_webhook():
         event = stripe.Webhook.construct_event(
             payload, sig_header, STRIPE_WEBHOOK_SECRET
         )
-        
-        # Handle successful payment
-        if event['type'] == 'checkout.session.completed':
-            checkout_session = event['data']['object']
-            session_id = checkout_session.get('id')
-            customer_email = checkout_session.get('customer_details', {}).get('email', 'Unknown')
-            amount = checkout_session.get('amount_total', 0) / 100
-            
-            print(f"✅ Payment successful!")
-            print(f"   Session ID: {session_id}")
-            print(f"   Customer: {customer_email}")
-            print(f"   Amount: ${amount:.2f}")
-            
-            # Here you could:
-            # - Store payment record in database
-            # - Send confirmation email
-            # - Mark files as paid for download
-        
-        return jsonify({'success': True}), 200
-    
     except stripe.error.SignatureVerificationError as e:
-        print(f"⚠️ Webhook signature verification failed: {str(e)}")
+        app.logger.warning(f"Webhook signature verification failed: {str(e)}")
         return jsonify({'error': 'Invalid signature'}), 400
+    except ValueError as e:
+        app.logger.warning(f"Webhook payload is not valid JSON: {str(e)}")
+        return jsonify({'error': 'Invalid payload'}), 400
+    
+    try:
+        if not webhook_events.record(event['id'], event['type'], payload):
+            return jsonify({'success': True, 'duplicate': True}), 200
+        webhook_processor.enqueue(event['id'])
+        return jsonify({'success': True}), 200
     except Exception as e:
-        print(f"❌ Webhook error: {str(e)}")
-        return jsonify({'error': str(e)}), 400
+        # Not logged, so let Stripe retry the delivery
+        app.logger.error(f"Webhook event could not be recorded: {str(e)}")
+        return jsonify({'error': 'Webhook could not be recorded'}), 500
+
+
+def file_etag(file_path):
+    """
+    Strong ETag for a download. Output files are written once under a
+    unique session name and never modified, so name, inode, size and
+    mtime pin down the exact bytes without hashing the content.
+    """
+    stat = file_path.stat()
+    identity = f"{file_path.name}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.blake2b(identity.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def send_download(file_path, download_name, mimetype):
+    """
+    Send a file from the downloads folder as an attachment.
+    Answers If-None-Match with 304 and Range/If-Range with 206 partial
+    content. Full responses go through the server's wsgi.file_wrapper, which
+    gunicorn serves with sendfile(); with an offload configured only headers
+    are sent and the front server streams the file.
+    """
+    offload = app.config['USE_X_SENDFILE']
+    response = send_file(
+        file_path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        # The front server handles validators itself when it sends the file
+        conditional=not offload,
+        etag=file_etag(file_path),
+    )
+    response.cache_control.private = True
+    if offload and DOWNLOAD_ACCEL_PREFIX:
+        # nginx takes an internal URI rather than a filesystem path
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = (
+            f"{DOWNLOAD_ACCEL_PREFIX.rstrip('/')}/{quote(file_path.name)}"
+        )
+    return response
+
+
+def build_session_zip(session_id, conversion_files):
+    """
+    Return the path of the ZIP of a conversion's files, building it on first
+    use. The ZIP is cached next to the CSVs (and removed with them), so
+    repeat and resumed downloads get the same bytes and ETag.
+    """
+    zip_path = app.config['DOWNLOAD_FOLDER'] / f"{session_id}_sierra_converted.zip"
+    if zip_path.exists():
+        return zip_path
+    
+    # Build under a temporary name so concurrent requests never see a partial ZIP
+    tmp_path = zip_path.with_name(f"{zip_path.name}.{uuid.uuid4().hex}.tmp")
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for file_info in conversion_files:
+            file_path = app.config['DOWNLOAD_FOLDER'] / file_info['path']
+            if file_path.exists():
+                # Add file to ZIP with clean name (no session ID)
+                zf.write(file_path, file_info['filename'])
+    os.replace(tmp_path, zip_path)
+    return zip_path
 
 
 @app.route('/download/<path:filename>')
 def download_file(filename):
     """Download a converted file."""
     try:
-        file_path = app.config['DOWNLOAD_FOLDER'] / filename
-        if not file_path.exists():
+        # safe_join rejects paths that would escape the downloads folder
+        joined = safe_join(str(app.config['DOWNLOAD_FOLDER']), filename)
+        if joined is None or not Path(joined).is_file():
             return jsonify({'error': 'File not found'}), 404
         
         # Get original filename (without session ID prefix)
         original_name = '_'.join(filename.split('_')[1:])
         
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=original_name,
-            mimetype='text/csv'
-        )
+        return send_download(Path(joined), original_name, 'text/csv')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -770,31 +1092,48 @@ def download_zip():
         if not conversion_files:
             return jsonify({'error': 'No files to download'}), 404
         
-        # Create ZIP file in memory
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file_info in conversion_files:
-                file_path = app.config['DOWNLOAD_FOLDER'] / file_info['path']
-                if file_path.exists():
-                    # Add file to ZIP with clean name (no session ID)
-                    zf.write(file_path, file_info['filename'])
-        
-        memory_file.seek(0)
+        # Build the ZIP once and serve it like any other download
+        zip_path = build_session_zip(session_id, conversion_files)
         
         # Generate ZIP filename
         zip_name = f"sierra_converted_{session_id}.zip"
         
-        return send_file(
-            memory_file,
-            as_attachment=True,
-            download_name=zip_name,
-            mimetype='application/zip'
-        )
+        return send_download(zip_path, zip_name, 'application/zip')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/preview_rows')
+def preview_rows():
+    """
+    Return a page of converted rows from the current conversion for the
+    scrolling preview table, as arrays in SIERRA_COLS order.
+    """
+    conversion_files = session.get('conversion_files', [])
+    if not conversion_files:
+        return jsonify({'success': False, 'error': 'No converted data to preview'}), 404
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', PREVIEW_ROWS, type=int), 0), PREVIEW_PAGE_MAX_ROWS)
+    total_rows = min(sum(f['rows'] for f in conversion_files), PREVIEW_MAX_ROWS)
+    limit = max(min(limit, total_rows - offset), 0)
+    
+    try:
+        files = [(app.config['DOWNLOAD_FOLDER'] / f['path'], f['rows']) for f in conversion_files]
+        rows = read_page(files, offset, limit) if limit else []
+    except OSError:
+        return jsonify({'success': False, 'error': 'Converted files are no longer available'}), 410
+    
+    return jsonify({
+        'success': True,
+        'offset': offset,
+        'total_rows': total_rows,
+        'columns': SIERRA_COLS,
+        'rows': [[row.get(col) or '' for col in SIERRA_COLS] for row in rows],
+    })
+
+
 @app.route('/verify_payment')
 def verify_payment():
     """Check if payment has been completed for this session."""
@@ -854,25 +1193,24 @@ def detect_columns():
             return jsonify({'success': False, 'error': 'No file selected'})
         
         # Validate file extension
-        if not file.filename.lower().endswith('.csv'):
-            return jsonify({'success': False, 'error': 'File must be a CSV file (with .csv extension)'})
-        
-        # Read and validate file content
-        file.seek(0)
-        try:
-            content = file.read().decode('utf-8-sig')
-        except UnicodeDecodeError:
-            return jsonify({'success': False, 'error': 'File encoding is not valid UTF-8. Please save your CSV as UTF-8 encoded.'})
-        
-        file.seek(0)
+        if not is_supported_export(file.filename):
+            return jsonify({'success': False, 'error': 'File must be a CSV file (with .csv extension) or an Excel .xlsx file'})
         
-        # Validate CSV structure
-        is_valid, error_msg = validate_csv_file(content)
-        if not is_valid:
-            return jsonify({'success': False, 'error': error_msg})
-        
-        reader = csv.DictReader(content.splitlines())
-        detected_columns = list(reader.fieldnames)
+        if is_xlsx(file.filename):
+            is_valid, error_msg, detected_columns = validate_xlsx_file(file.stream)
+            if not is_valid:
+                return jsonify({'success': False, 'error': error_msg})
+        else:
+            # Only the header block is needed, whatever the file's encoding
+            content, _ = read_upload_sample(file)
+            
+            # Validate CSV structure
+            is_valid, error_msg = validate_csv_file(content)
+            if not is_valid:
+                return jsonify({'success': False, 'error': error_msg})
+            
+            reader = csv.DictReader(content.splitlines())
+            detected_columns = list(reader.fieldnames)
         
         # Filter out None and empty column names
         detected_columns = [col for col in detected_columns if col and col.strip()]
@@ -898,7 +1236,14 @@ def detect_columns():
         })
 
 
+# Heavy optional modules (stripe for webhooks, sqlite3 for the webhook log,
+# ElementTree for .xlsx uploads) are imported on first use, not above.
+app.config['STARTUP_SECONDS'] = time.perf_counter() - _IMPORT_STARTED
+app.logger.info(f"FUB Converter startup in {app.config['STARTUP_SECONDS'] * 1000:.0f} ms")
+
+
 if __name__ == '__main__':
     # For development only - use gunicorn for production
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+    webhook_processor.start()
     app.run(debug=debug_mode, host='0.0.0.0', port=5001)
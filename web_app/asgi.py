@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+ASGI Entry Point for FUB to Sierra CSV Converter
+Serves the Flask app from an asyncio server so slow uploads and downloads
+no longer hold a worker thread for the whole transfer. Request bodies are
+spooled to disk while they arrive, the Flask view (parsing and conversion)
+runs on a thread pool once the body is complete, and file responses are
+streamed back from disk block by block.
+
+Run with any ASGI server, e.g.:
+    uvicorn web_app.asgi:application --workers 2
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.wsgi import FileWrapper
+
+from web_app.app import app as flask_app, webhook_processor
+
+# Threads running Flask views; conversions are CPU-bound, so keep this near
+# the number of cores rather than the number of open connections
+APP_THREADS = int(os.getenv('ASGI_APP_THREADS', '4'))
+
+# Bodies up to this size are kept in memory, larger ones go to a temp file
+SPOOL_MEMORY_BYTES = 64 * 1024
+
+# Received body bytes buffered before each write to the spool file
+SPOOL_WRITE_BYTES = 1024 * 1024
+
+# Bytes read from disk per body message when streaming a file response
+STREAM_BLOCK_BYTES = 256 * 1024
+
+_app_pool = ThreadPoolExecutor(max_workers=APP_THREADS, thread_name_prefix='fub-app')
+
+
+class StreamedFile(FileWrapper):
+    """wsgi.file_wrapper marker: the ASGI side reads the file itself, off the app threads."""
+
+
+def build_environ(scope, body, body_size):
+    """Translate an ASGI HTTP scope and spooled body into a WSGI environ."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(body_size),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.file_wrapper': StreamedFile,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+    for raw_name, raw_value in scope['headers']:
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name != 'CONTENT_TYPE':
+            name = f"HTTP_{name}"
+        if name in environ:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f"{environ[name]}{separator}{value}"
+        environ[name] = value
+    return environ
+
+
+async def spool_body(receive, limit, loop):
+    """
+    Read the request body into a file object while it arrives.
+    Returns (body, size), or (None, 0) if the client went away. Reading
+    stops once the body passes limit; size then tells Flask to answer 413.
+    """
+    body = io.BytesIO()
+    size = 0
+    pending = []
+    pending_bytes = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None, 0
+        chunk = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        size += len(chunk)
+        pending.append(chunk)
+        pending_bytes += len(chunk)
+
+        if isinstance(body, io.BytesIO) and size > SPOOL_MEMORY_BYTES:
+            # Too big to keep in memory: move to an anonymous file in uploads/
+            disk = await loop.run_in_executor(
+                None, lambda: tempfile.TemporaryFile(dir=flask_app.config['UPLOAD_FOLDER']))
+            await loop.run_in_executor(None, disk.write, body.getvalue())
+            body.close()
+            body = disk
+        if limit is not None and size > limit:
+            break
+        if pending_bytes >= SPOOL_WRITE_BYTES or not more_body:
+            data = b''.join(pending)
+            pending, pending_bytes = [], 0
+            if isinstance(body, io.BytesIO):
+                body.write(data)
+            else:
+                await loop.run_in_executor(None, body.write, data)
+
+    body.seek(0)
+    return body, size
+
+
+def _no_write(data):
+    raise RuntimeError('write() is not supported; return an iterable body')
+
+
+def call_app(environ):
+    """Run the Flask app for one request; returns (status, headers, body iterable)."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+        return _no_write
+
+    body = flask_app(environ, start_response)
+    return response['status'], response['headers'], body
+
+
+async def send_body(send, body, loop):
+    """Send a response body without blocking the loop on disk reads."""
+    if isinstance(body, (list, tuple)):
+        for chunk in body:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        return
+
+    if isinstance(body, StreamedFile):
+        read = lambda: body.file.read(STREAM_BLOCK_BYTES)
+    else:
+        # Other iterables (byte ranges, generators) may read files too
+        chunks = iter(body)
+        read = lambda: next(chunks, b'')
+    try:
+        while True:
+            block = await loop.run_in_executor(None, read)
+            if not block:
+                break
+            await send({'type': 'http.response.body', 'body': block, 'more_body': True})
+    finally:
+        if hasattr(body, 'close'):
+            await loop.run_in_executor(None, body.close)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            webhook_processor.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _app_pool.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI callable wrapping the Flask app."""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    loop = asyncio.get_running_loop()
+    body, size = await spool_body(receive, flask_app.config.get('MAX_CONTENT_LENGTH'), loop)
+    if body is None:
+        return
+    try:
+        environ = build_environ(scope, body, size)
+        status, headers, response_body = await loop.run_in_executor(_app_pool, call_app, environ)
+    finally:
+        await loop.run_in_executor(None, body.close)
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+    await send_body(send, response_body, loop)
+    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
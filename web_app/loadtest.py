@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Test for FUB to Sierra CSV Converter
+Starts the web app under gunicorn on localhost (same flags as railway.toml)
+and drives it with concurrent virtual users mixing column detection,
+uploads of several sizes, chunk downloads and ZIP downloads. Reports p50,
+p95 and p99 latency and error rates per request type, plus the resident
+memory of every gunicorn worker, to size instances and catch concurrency
+regressions.
+
+    python web_app/loadtest.py --workers 4 --threads 2 --users 16 --duration 60
+    python web_app/loadtest.py --url http://127.0.0.1:5001 --requests 500
+
+Only the standard library is used; gunicorn must be installed to start the
+server (it is in requirements.txt). Worker memory is read from /proc, so it
+is reported on Linux only.
+"""
+
+import argparse
+import contextlib
+import csv
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Server settings, matching the railway.toml start command
+DEFAULT_WORKERS = 4
+DEFAULT_THREADS = 2
+SERVER_TIMEOUT = 120
+
+# Seconds to wait for a started server to answer /health
+STARTUP_TIMEOUT = 30
+
+# Relative frequency of each request type ('upload' includes the sizes below)
+TRAFFIC_MIX = {
+    'detect_columns': 3,
+    'upload': 4,
+    'download': 4,
+    'download_zip': 1,
+}
+
+# Rows in the generated exports; each upload picks one at random
+UPLOAD_SIZES = (100, 2000, 20000)
+
+# Seconds a request may take before it counts as an error
+REQUEST_TIMEOUT = 300
+
+# Seconds between worker memory samples
+RSS_SAMPLE_INTERVAL = 0.5
+
+# Percentiles reported for every request type
+PERCENTILES = (50, 95, 99)
+
+FUB_HEADERS = ['First Name', 'Last Name', 'Email', 'Phone', 'Source', 'Assigned To',
+               'Street', 'City', 'State', 'Zip', 'Tags', 'Notes']
+
+COLUMN_MAPPING = {
+    'first_name': 'First Name', 'last_name': 'Last Name', 'email': 'Email', 'phone': 'Phone',
+    'source': 'Source', 'assigned_to': 'Assigned To', 'street': 'Street', 'city': 'City',
+    'state': 'State', 'zip': 'Zip', 'tags': 'Tags', 'notes': 'Notes',
+}
+
+
+# ========== TEST DATA ==========
+
+def make_export(path, rows, seed=0):
+    """Write a FUB-style CSV export with the given number of rows."""
+    rng = random.Random(seed)
+    cities = [('Austin', 'TX', '78701'), ('Dallas', 'TX', '75201'), ('Denver', 'CO', '80202'),
+              ('Miami', 'FL', '33101'), ('Seattle', 'WA', '98101')]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FUB_HEADERS)
+        for i in range(rows):
+            city, state, zip_code = rng.choice(cities)
+            writer.writerow([
+                f'First{i}', f'Last{i}', f'lead{i}@example.com',
+                f'({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+                rng.choice(['Zillow', 'Website', 'Referral', 'Facebook']),
+                rng.choice(['Sarah Johnson', 'Mike Chen', '']),
+                f'{rng.randint(1, 9999)} Main Street', city, state, zip_code,
+                rng.choice(['Buyer', 'Seller; Hot Lead', '']), f'Imported lead {i}',
+            ])
+    return path
+
+
+def encode_multipart(fields, files):
+    """
+    Encode form fields and (name, filename, bytes) files as multipart/form-data.
+    Returns (body, content_type).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n'.encode('utf-8'))
+    for name, filename, data in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                     f'filename="{filename}"\r\nContent-Type: text/csv\r\n\r\n'.encode('utf-8'))
+        parts.append(data)
+        parts.append(b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+# ========== VIRTUAL USERS ==========
+
+class VirtualUser:
+    """
+    One browser session: its own cookie jar, and the files of its last
+    conversion so downloads hit real output.
+    """
+
+    def __init__(self, base_url, exports, rng):
+        self.base_url = base_url.rstrip('/')
+        self.exports = exports
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.files = []
+
+    def request(self, path, body=None, content_type=None):
+        """Send a request and return (status, body bytes); HTTP errors are returned, not raised."""
+        req = urllib.request.Request(self.base_url + path, data=body)
+        if content_type:
+            req.add_header('Content-Type', content_type)
+        try:
+            with self.opener.open(req, timeout=REQUEST_TIMEOUT) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def choose(self):
+        """Pick the next request type; downloads need a finished upload first."""
+        names = list(TRAFFIC_MIX)
+        name = self.rng.choices(names, weights=[TRAFFIC_MIX[n] for n in names])[0]
+        if name.startswith('download') and not self.files:
+            return 'upload'
+        return name
+
+    def run_one(self, name):
+        """
+        Perform one request of the given type.
+        Returns (label, status, seconds, ok); label includes the upload size.
+        """
+        label = name
+        if name in ('detect_columns', 'upload'):
+            rows, data = self.rng.choice(self.exports)
+            fields = {}
+            if name == 'upload':
+                label = f'upload {rows} rows'
+                fields['column_mapping'] = json.dumps(COLUMN_MAPPING)
+            args = encode_multipart(fields, [('file', f'export_{rows}.csv', data)])
+            path = f'/{name}'
+        elif name == 'download':
+            path, args = '/download/' + self.rng.choice(self.files), ()
+        else:
+            path, args = '/download_zip', ()
+
+        started = time.perf_counter()
+        try:
+            if name == 'download_zip':
+                # Payment is simulated outside the timed request
+                self.request('/mark_payment_complete?payment_success=true')
+                started = time.perf_counter()
+            status, body = self.request(path, *args)
+        except (OSError, urllib.error.URLError):
+            return label, 0, time.perf_counter() - started, False
+        elapsed = time.perf_counter() - started
+
+        ok = 200 <= status < 300
+        if ok and name in ('detect_columns', 'upload'):
+            result = json.loads(body)
+            ok = bool(result.get('success'))
+            if ok and name == 'upload':
+                self.files = [f['path'] for f in result.get('files', [])]
+        return label, status, elapsed, ok
+
+
+# ========== SERVER ==========
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(base_url, process=None, timeout=STARTUP_TIMEOUT):
+    """Poll /health until the server answers; raise RuntimeError if it never does."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + '/health', timeout=2):
+                return
+        except (OSError, urllib.error.URLError):
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not answer within {timeout}s")
+
+
+def start_gunicorn(port, workers, threads, work_dir):
+    """
+    Start gunicorn from the repository root (so gunicorn.conf.py applies),
+    keeping its admission state file under work_dir.
+    """
+    env = dict(os.environ, ADMISSION_STATE_PATH=str(Path(work_dir) / 'admission.json'))
+    command = [sys.executable, '-m', 'gunicorn', f'--workers={workers}', f'--threads={threads}',
+               f'--timeout={SERVER_TIMEOUT}', f'--bind=127.0.0.1:{port}', 'web_app.app:app']
+    return subprocess.Popen(command, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def child_pids(parent_pid):
+    """Return the pids of a process's children (Linux /proc)."""
+    pids = []
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / 'stat').read_text()
+        except OSError:
+            continue
+        # Fields after the parenthesized command name: state, ppid, ...
+        fields = stat[stat.rfind(')') + 2:].split()
+        if int(fields[1]) == parent_pid:
+            pids.append(int(entry.name))
+    return sorted(pids)
+
+
+def rss_bytes(pid):
+    """Return a process's resident set size, or None if it cannot be read."""
+    try:
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """
+    Background thread recording the first, peak and last RSS of each
+    worker of a server process (or of the process itself if it has none).
+    """
+
+    def __init__(self, server_pid, interval=RSS_SAMPLE_INTERVAL):
+        self.server_pid = server_pid
+        self.interval = interval
+        self.samples = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def sample(self):
+        for pid in child_pids(self.server_pid) or [self.server_pid]:
+            rss = rss_bytes(pid)
+            if rss is None:
+                continue
+            first, peak, _ = self.samples.get(pid, (rss, rss, rss))
+            self.samples[pid] = (first, max(peak, rss), rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        return False
+
+
+# ========== RUN AND REPORT ==========
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load(base_url, exports, users, duration=None, total_requests=None, seed=0):
+    """
+    Drive the server with concurrent virtual users until duration seconds
+    have passed or total_requests requests have been made.
+    Returns a list of (label, status, seconds, ok) results.
+    """
+    results = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+    remaining = [total_requests]
+
+    def take_turn():
+        with lock:
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+        return deadline is None or time.monotonic() < deadline
+
+    def user_loop(user):
+        while take_turn():
+            result = user.run_one(user.choose())
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=user_loop,
+                                args=(VirtualUser(base_url, exports, random.Random(seed + i)),))
+               for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(results, elapsed, rss_samples=None):
+    """Build a JSON-serializable report from run_load() results."""
+    by_label = {}
+    for label, status, seconds, ok in results:
+        by_label.setdefault(label, []).append((status, seconds, ok))
+
+    requests = {}
+    for label in sorted(by_label):
+        entries = by_label[label]
+        latencies = sorted(seconds for _, seconds, _ in entries)
+        errors = sum(1 for _, _, ok in entries if not ok)
+        statuses = {}
+        for status, _, _ in entries:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        requests[label] = {
+            'count': len(entries),
+            'errors': errors,
+            'error_rate': errors / len(entries),
+            'statuses': statuses,
+            **{f'p{pct}_ms': round(percentile(latencies, pct) * 1000, 1) for pct in PERCENTILES},
+            'max_ms': round(latencies[-1] * 1000, 1),
+        }
+
+    total_errors = sum(r['errors'] for r in requests.values())
+    return {
+        'requests': requests,
+        'total_requests': len(results),
+        'error_rate': total_errors / len(results) if results else 0.0,
+        'elapsed_seconds': round(elapsed, 2),
+        'requests_per_second': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'worker_rss_mb': {
+            str(pid): {name: round(value / (1024 * 1024), 1)
+                       for name, value in zip(('start', 'peak', 'end'), samples)}
+            for pid, samples in sorted((rss_samples or {}).items())
+        },
+    }
+
+
+def print_report(report, file=None):
+    """Print a report as aligned tables."""
+    header = f"{'request':<20}{'count':>7}{'errors':>8}" + ''.join(
+        f"{f'p{pct} ms':>10}" for pct in PERCENTILES) + f"{'max ms':>10}"
+    print(header, file=file)
+    print('-' * len(header), file=file)
+    for label, r in report['requests'].items():
+        print(f"{label:<20}{r['count']:>7}{r['error_rate']:>8.1%}" + ''.join(
+            f"{r[f'p{pct}_ms']:>10.1f}" for pct in PERCENTILES) + f"{r['max_ms']:>10.1f}", file=file)
+    print(f"\n{report['total_requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['requests_per_second']}/s), {report['error_rate']:.1%} errors", file=file)
+    if report['worker_rss_mb']:
+        print("\nWorker RSS (MB): " + ', '.join(
+            f"pid {pid} {rss['start']} -> peak {rss['peak']} (end {rss['end']})"
+            for pid, rss in report['worker_rss_mb'].items()), file=file)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='loadtest.py',
+        description="Load-test the converter under gunicorn with mixed concurrent traffic.")
+    parser.add_argument('--url',
+                        help="test an already running server instead of starting gunicorn")
+    parser.add_argument('--server-pid', type=int,
+                        help="with --url, the server (e.g. gunicorn master) pid whose workers' RSS to sample")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"gunicorn workers (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help=f"gunicorn threads per worker (default: {DEFAULT_THREADS})")
+    parser.add_argument('-u', '--users', type=int, default=8,
+                        help="concurrent virtual users (default: 8)")
+    parser.add_argument('-d', '--duration', type=float, default=30,
+                        help="seconds to run (default: 30)")
+    parser.add_argument('-n', '--requests', type=int,
+                        help="stop after this many requests instead of after --duration")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(UPLOAD_SIZES),
+                        help=f"rows in the uploaded exports (default: {' '.join(map(str, UPLOAD_SIZES))})")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for data and traffic")
+    parser.add_argument('--json', type=Path, help="also write the report as JSON to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.users < 1 or any(size < 1 for size in args.sizes):
+        build_arg_parser().error("--users and --sizes must be at least 1")
+
+    with tempfile.TemporaryDirectory(prefix='fub_loadtest_') as work_dir:
+        exports = []
+        for i, rows in enumerate(args.sizes):
+            path = make_export(Path(work_dir) / f'export_{rows}.csv', rows, args.seed + i)
+            exports.append((rows, path.read_bytes()))
+
+        server = None
+        base_url, server_pid = args.url, args.server_pid
+        if not base_url:
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            server = start_gunicorn(port, args.workers, args.threads, work_dir)
+            server_pid = server.pid
+        try:
+            wait_until_up(base_url, server)
+            print(f"Load testing {base_url} with {args.users} users "
+                  f"({f'{args.requests} requests' if args.requests else f'{args.duration:g}s'})")
+            sampler = RssSampler(server_pid) if server_pid and Path('/proc').is_dir() else None
+            started = time.perf_counter()
+            with sampler or contextlib.nullcontext():
+                results = run_load(base_url, exports, args.users,
+                                   None if args.requests else args.duration, args.requests, args.seed)
+            report = summarize(results, time.perf_counter() - started,
+                               sampler.samples if sampler else None)
+        except RuntimeError as e:
+            print(f"✗ {e}", file=sys.stderr)
+            return 1
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print()
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -166,8 +166,9 @@ fileInput.addEventListener('change', (e) => {
 
 async function handleFileSelect(file) {
     // Validate file extension
-    if (!file.name.toLowerCase().endsWith('.csv')) {
-        showError('Please select a CSV file (with .csv extension)');
+    const fileName = file.name.toLowerCase();
+    if (!fileName.endsWith('.csv') && !fileName.endsWith('.xlsx')) {
+        showError('Please select a CSV file (with .csv extension) or an Excel .xlsx file');
         return;
     }
 
@@ -325,6 +326,12 @@ async function processConversion() {
         const formData = new FormData();
         formData.append('file', currentFile);
         formData.append('column_mapping', JSON.stringify(columnMapping));
+        formData.append('dedupe_leads', document.getElementById('optDedupeLeads').checked);
+        formData.append('balance_chunks', document.getElementById('optBalanceChunks').checked);
+        formData.append('standardize_addresses', document.getElementById('optStandardizeAddresses').checked);
+        const enrichZips = document.getElementById('optEnrichZips');
+        formData.append('enrich_zips', Boolean(enrichZips && enrichZips.checked));
+        formData.append('partition_by', document.getElementById('optPartitionBy').value);
 
         const response = await fetch('/upload', {
             method: 'POST',
@@ -339,7 +346,7 @@ async function processConversion() {
             }
 
             if (result.preview && result.preview.length > 0) {
-                displayPreview(result.preview, result.preview_note, result.total_rows);
+                displayPreview(result.preview, result.preview_note, result.total_rows, result.preview_rows);
             }
 
             convertedFiles = result.files;
@@ -378,76 +385,236 @@ function addConsoleLog(message, type = 'info') {
     consoleOutput.scrollTop = consoleOutput.scrollHeight;
 }
 
-function displayPreview(previewData, note, totalRows) {
+// Rows per /preview_rows request (matches the rows sent with /upload) and
+// pages kept in memory while scrolling
+const PREVIEW_PAGE_SIZE = 100;
+const PREVIEW_MAX_CACHED_PAGES = 50;
+// Assumed row height until a rendered row can be measured
+const PREVIEW_ROW_HEIGHT = 45;
+// Extra rows rendered above and below the visible ones
+const PREVIEW_OVERSCAN = 10;
+// Widest a column gets when widths are fixed after the first render
+const PREVIEW_MAX_COLUMN_WIDTH = 320;
+
+// Pages of converted rows (arrays in `columns` order), shared by the
+// inline and modal preview tables and fetched from the server on demand
+class PreviewRowSource {
+    constructor(columns, totalRows, firstRows, onPageLoaded) {
+        this.columns = columns;
+        this.totalRows = totalRows;
+        this.onPageLoaded = onPageLoaded;
+        this.pages = new Map();
+        this.pending = new Set();
+        if (firstRows.length >= Math.min(PREVIEW_PAGE_SIZE, totalRows)) {
+            this.pages.set(0, firstRows.slice(0, PREVIEW_PAGE_SIZE));
+        }
+    }
+
+    getRow(index) {
+        const pageIndex = Math.floor(index / PREVIEW_PAGE_SIZE);
+        const page = this.pages.get(pageIndex);
+        if (!page) {
+            this.loadPage(pageIndex);
+            return null;
+        }
+        // Re-insert so the Map's order doubles as least-recently-used order
+        this.pages.delete(pageIndex);
+        this.pages.set(pageIndex, page);
+        return page[index % PREVIEW_PAGE_SIZE] || null;
+    }
+
+    async loadPage(pageIndex) {
+        if (this.pending.has(pageIndex)) return;
+        this.pending.add(pageIndex);
+        try {
+            const offset = pageIndex * PREVIEW_PAGE_SIZE;
+            const response = await fetch(`/preview_rows?offset=${offset}&limit=${PREVIEW_PAGE_SIZE}`);
+            const result = await response.json();
+            if (!result.success) return;
+
+            const order = this.columns.map(col => result.columns.indexOf(col));
+            this.pages.set(pageIndex, result.rows.map(row => order.map(i => (i >= 0 ? row[i] : ''))));
+            while (this.pages.size > PREVIEW_MAX_CACHED_PAGES) {
+                this.pages.delete(this.pages.keys().next().value);
+            }
+            this.onPageLoaded();
+        } catch (error) {
+            console.error('Error loading preview rows:', error);
+        } finally {
+            this.pending.delete(pageIndex);
+        }
+    }
+}
+
+// Preview table that only keeps the rows in view (plus overscan) in the DOM;
+// spacer rows above and below stand in for the rest
+class VirtualPreviewTable {
+    constructor(table, scrollContainer) {
+        this.table = table;
+        this.scrollContainer = scrollContainer;
+        this.source = null;
+        this.frame = null;
+
+        scrollContainer.addEventListener('scroll', () => this.scheduleRender(), { passive: true });
+        window.addEventListener('resize', () => this.scheduleRender());
+
+        // Disable copy/paste/cut on preview tables
+        table.addEventListener('copy', e => e.preventDefault());
+        table.addEventListener('cut', e => e.preventDefault());
+        table.addEventListener('contextmenu', e => e.preventDefault());
+        table.style.userSelect = 'none';
+        table.style.webkitUserSelect = 'none';
+        table.style.msUserSelect = 'none';
+    }
+
+    clear() {
+        this.source = null;
+        this.table.innerHTML = '';
+        this.table.classList.remove('virtual');
+        this.table.style.tableLayout = '';
+        this.table.style.width = '';
+    }
+
+    setSource(source) {
+        this.clear();
+        this.source = source;
+        this.rowHeight = PREVIEW_ROW_HEIGHT;
+        this.table.classList.add('virtual');
+
+        const thead = document.createElement('thead');
+        const headerRow = document.createElement('tr');
+        source.columns.forEach(col => {
+            const th = document.createElement('th');
+            th.textContent = col;
+            headerRow.appendChild(th);
+        });
+        thead.appendChild(headerRow);
+        this.table.appendChild(thead);
+
+        this.tbody = document.createElement('tbody');
+        this.topSpacer = this.createSpacer();
+        this.bottomSpacer = this.createSpacer();
+        this.tbody.appendChild(this.topSpacer);
+        this.tbody.appendChild(this.bottomSpacer);
+        this.table.appendChild(this.tbody);
+
+        this.render();
+        this.fixColumnWidths();
+        makeColumnsResizable(this.table);
+    }
+
+    createSpacer() {
+        const tr = document.createElement('tr');
+        tr.className = 'preview-spacer';
+        const td = document.createElement('td');
+        td.colSpan = this.source.columns.length;
+        tr.appendChild(td);
+        return tr;
+    }
+
+    // Freeze the widths the first rows produced so columns don't jump while scrolling
+    fixColumnWidths() {
+        const headers = this.table.querySelectorAll('th');
+        if (!headers.length || !headers[0].offsetWidth) return;
+        headers.forEach(th => {
+            th.style.width = Math.min(th.offsetWidth, PREVIEW_MAX_COLUMN_WIDTH) + 'px';
+        });
+        this.table.style.tableLayout = 'fixed';
+        syncFixedTableWidth(this.table);
+    }
+
+    scheduleRender() {
+        if (this.frame || !this.source) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+
+    render() {
+        if (!this.source) return;
+        if (this.table.style.tableLayout !== 'fixed') this.fixColumnWidths();
+        const total = this.source.totalRows;
+
+        // Visible window in table pixels; the modal table may be zoomed with a CSS transform
+        const bodyRect = this.tbody.getBoundingClientRect();
+        const viewRect = this.scrollContainer.getBoundingClientRect();
+        const scale = this.tbody.offsetHeight ? bodyRect.height / this.tbody.offsetHeight : 1;
+        const top = Math.max((viewRect.top - bodyRect.top) / scale, 0);
+        const height = viewRect.height / scale;
+        const first = Math.min(Math.max(Math.floor(top / this.rowHeight) - PREVIEW_OVERSCAN, 0), total);
+        const last = Math.min(Math.ceil((top + height) / this.rowHeight) + PREVIEW_OVERSCAN, total);
+
+        while (this.topSpacer.nextSibling !== this.bottomSpacer) {
+            this.tbody.removeChild(this.topSpacer.nextSibling);
+        }
+        const fragment = document.createDocumentFragment();
+        for (let index = first; index < last; index++) {
+            const row = this.source.getRow(index);
+            const tr = document.createElement('tr');
+            if (!row) tr.className = 'preview-row-loading';
+            this.source.columns.forEach((col, i) => {
+                const td = document.createElement('td');
+                td.textContent = row ? row[i] : (i === 0 ? 'Loading…' : '');
+                tr.appendChild(td);
+            });
+            fragment.appendChild(tr);
+        }
+        this.tbody.insertBefore(fragment, this.bottomSpacer);
+        this.topSpacer.firstChild.style.height = (first * this.rowHeight) + 'px';
+        this.bottomSpacer.firstChild.style.height = ((total - last) * this.rowHeight) + 'px';
+
+        // Use the real row height once a row has been laid out
+        const rendered = this.topSpacer.nextSibling;
+        if (rendered !== this.bottomSpacer && rendered.offsetHeight && rendered.offsetHeight !== this.rowHeight) {
+            this.rowHeight = rendered.offsetHeight;
+            this.scheduleRender();
+        }
+    }
+}
+
+const previewTables = [
+    [previewTableInline, previewTableInline && previewTableInline.closest('.preview-table-wrapper')],
+    [previewTable, document.getElementById('modalScrollContainer')],
+].filter(([table, container]) => table && container)
+ .map(([table, container]) => new VirtualPreviewTable(table, container));
+
+function displayPreview(previewData, note, totalRows, previewRows) {
     if (!previewData || previewData.length === 0) return;
 
     // Update preview headers with dynamic row counts
-    const previewCount = previewData.length;
+    const previewCount = previewRows || previewData.length;
     const totalRowsText = totalRows ? ` out of ${totalRows.toLocaleString()} Total` : '';
     
     // Update inline preview header
     const inlineHeader = document.querySelector('#previewSection h2');
     if (inlineHeader) {
-        inlineHeader.innerHTML = `Data Preview (First ${previewCount} Rows${totalRowsText})`;
+        inlineHeader.innerHTML = `Data Preview (First ${previewCount.toLocaleString()} Rows${totalRowsText})`;
     }
     
     // Update modal preview header
     const modalHeader = document.querySelector('#previewModal h2');
     if (modalHeader) {
-        modalHeader.innerHTML = `👁️ Data Preview (First ${previewCount} Rows${totalRowsText})`;
+        modalHeader.innerHTML = `👁️ Data Preview (First ${previewCount.toLocaleString()} Rows${totalRowsText})`;
     }
     
     // Update modal subtitle
     const modalSubtitle = document.querySelector('#previewModal h2 + p');
     if (modalSubtitle) {
-        modalSubtitle.textContent = `Showing first ${previewCount} rows of your converted Sierra CRM data`;
+        modalSubtitle.textContent = `Scroll through the first ${previewCount.toLocaleString()} rows of your converted Sierra CRM data`;
     }
 
-    // Populate both inline preview and modal preview
-    [previewTableInline, previewTable].forEach(table => {
-        if (!table) return;
-        
-        table.innerHTML = '';
-
-        const thead = document.createElement('thead');
-        const headerRow = document.createElement('tr');
-        const columns = Object.keys(previewData[0]);
-        
-        columns.forEach(col => {
-            const th = document.createElement('th');
-            th.textContent = col;
-            headerRow.appendChild(th);
-        });
-        thead.appendChild(headerRow);
-        table.appendChild(thead);
-
-        const tbody = document.createElement('tbody');
-        previewData.forEach((row) => {
-            const tr = document.createElement('tr');
-            columns.forEach(col => {
-                const td = document.createElement('td');
-                td.textContent = row[col] || '';
-                tr.appendChild(td);
-            });
-            tbody.appendChild(tr);
-        });
-        table.appendChild(tbody);
-        
-        // Disable copy/paste/cut on preview tables
-        table.addEventListener('copy', e => e.preventDefault());
-        table.addEventListener('cut', e => e.preventDefault());
-        table.addEventListener('contextmenu', e => e.preventDefault());
-        table.style.userSelect = 'none';
-        table.style.webkitUserSelect = 'none';
-        table.style.msUserSelect = 'none';
-        
-        // Make columns resizable
-        makeColumnsResizable(table);
-    });
+    // Populate both inline preview and modal preview from one row source
+    const columns = Object.keys(previewData[0]);
+    const firstRows = previewData.map(row => columns.map(col => row[col] || ''));
+    const source = new PreviewRowSource(columns, previewCount, firstRows,
+        () => previewTables.forEach(table => table.scheduleRender()));
+    previewTables.forEach(table => table.setSource(source));
 
     // Show the preview section
     previewSection.style.display = 'block';
     previewSection.classList.add('active');
+    previewTables.forEach(table => table.scheduleRender());
     
     // Ensure payment notice is visible in the preview section
     if (paymentNoticeInline) {
@@ -458,6 +625,16 @@ function displayPreview(previewData, note, totalRows) {
     previewSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
 }
 
+// Keep a fixed-layout table as wide as its columns
+function syncFixedTableWidth(table) {
+    if (table.style.tableLayout !== 'fixed') return;
+    let width = 0;
+    table.querySelectorAll('th').forEach(th => {
+        width += th.offsetWidth;
+    });
+    table.style.width = width + 'px';
+}
+
 // Make table columns resizable
 function makeColumnsResizable(table) {
     const headers = table.querySelectorAll('th');
@@ -495,6 +672,7 @@ function makeColumnsResizable(table) {
             if (width >= 50) {
                 th.style.width = width + 'px';
                 th.style.minWidth = width + 'px';
+                syncFixedTableWidth(table);
             }
         }
         
@@ -707,8 +885,7 @@ function resetToInitialState() {
         paymentCard.style.display = 'none';
     }
     consoleOutput.innerHTML = '';
-    previewTable.innerHTML = '';
-    previewTableInline.innerHTML = '';
+    previewTables.forEach(table => table.clear());
     downloadFiles.innerHTML = '';
     
     currentFile = null;
@@ -740,6 +917,7 @@ if (openFullPreviewBtn) {
             }, 10);
             currentZoom = 1.0;
             updateZoom();
+            previewTables.forEach(table => table.scheduleRender());
         }
     });
 }
@@ -852,6 +1030,14 @@ function updateZoom() {
     if (zoomLevelSpan) {
         zoomLevelSpan.textContent = `${Math.round(currentZoom * 100)}%`;
     }
+    // Zooming changes how many rows fit in view
+    previewTables.forEach(table => table.scheduleRender());
+}
+
+if (previewTableContainer) {
+    previewTableContainer.addEventListener('transitionend', () => {
+        previewTables.forEach(table => table.scheduleRender());
+    });
 }
 
 // Close modal when clicking outside